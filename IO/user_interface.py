@@ -51,7 +51,7 @@ class TextualUserInterface(UserInterface):
         """
         This method initializes the user interface.
         """
-        self._available_commands = ["RF", "C", "E", "L", "S", "Q"]
+        self._available_commands = ["RF", "C", "E", "L", "S", "M", "A", "R", "Q"]
         self._command_list = []
         self._command_buffer = deque([])
 
@@ -97,7 +97,7 @@ class TextualUserInterface(UserInterface):
                 else:
                     print("Expected 1 argument ", len(command) - 1, " given")
                     return False
-            elif command[0].upper() in ["C", "Q"]:
+            elif command[0].upper() in ["C", "M", "A", "R", "Q"]:
                 if len(command) == 1:
                     return True
                 else:
@@ -132,11 +132,11 @@ class TextualUserInterface(UserInterface):
         """
         print("-------------------------------------------------------------------------------------------------------")
         for cell_id in spreadsheet:
-            cell = spreadsheet.get_cell(cell_id)
-            if isinstance(cell.content, Formula):
-                print(cell.identifier.coordinate, cell.content.textual_representation, cell.content.value.value)
+            content = spreadsheet.get_content(cell_id)
+            if isinstance(content, Formula):
+                print(cell_id.coordinate, content.textual_representation, content.value.value)
             else:
-                print(cell.identifier.coordinate, cell.content.value.value)
+                print(cell_id.coordinate, content.value.value)
         print("-------------------------------------------------------------------------------------------------------")
 
     @staticmethod
@@ -155,6 +155,12 @@ class TextualUserInterface(UserInterface):
                 print("Spreadsheet loaded successfully.")
             case "S":
                 print("Spreadsheet saved successfully.")
+            case "M":
+                print("Manual calculation started: the edits will be calculated with A or discarded with R.")
+            case "A":
+                print("Edits calculated successfully.")
+            case "R":
+                print("Edits discarded successfully.")
             case "Q":
                 pass
             case _:
@@ -171,6 +177,9 @@ class TextualUserInterface(UserInterface):
         print("E - Edit cell: The first argument shall be a cell coordinate. The second one shall be the content.")
         print("L - Load spreadsheet from file")
         print("S - Save spreadsheet to file")
+        print("M - Manual calculation: the next edits are not calculated until the A command")
+        print("A - Apply the edits made since the M command, calculating the spreadsheet once")
+        print("R - Revert the edits made since the M command")
         print("Q - Quit")
         print("IMPORTANT: COMMANDS AND ARGUMENTS MUST BE SEPARATED BY A SPACE.")
         print("-------------------------------------------------------------------------------------------------------")
@@ -3,14 +3,22 @@ This file implements the controller of the application.
 """
 from domain.entities.spreadsheet import Spreadsheet
 from IO.user_interface import TextualUserInterface
-from use_cases.spreadsheetloader import SpreadsheetLoaderS2V
-from use_cases.spreadsheetsaver import SpreadsheetSaverS2V
+from use_cases.spreadsheetloader import SpreadsheetLoaderS2V, ParallelSpreadsheetLoaderS2V, MappedSpreadsheetLoaderS2V
+from use_cases.spreadsheetloader import SpreadsheetLoaderS2B, SnapshotS2B, ComputedValuesLoader
+from use_cases.spreadsheetsaver import IncrementalSpreadsheetSaverS2V, SpreadsheetSaverS2B, ComputedValuesSaver
+from use_cases.editjournal import EditJournal
 from domain.entities.content import Formula, Content, TextualContent, NumericalContent
+from domain.entities.value import NumericalValue, TextualValue
 from domain.entities.formula_evaluator import FormulaEvaluatorPostfix
 from domain.entities.cell import CellIdentifier, Cell
+from domain.utils.cell_storage import MappedCellStorage
+from domain.utils.parallel_evaluator import ParallelLevelEvaluator
 from test.entities.no_number_exception import NoNumberException
 from test.entities.bad_coordinate_exception import BadCoordinateException
+from test.entities.circular_dependency_exception import CircularDependencyException
 from test.usecasesmarker.spreadsheet_controller_for_checker import ISpreadsheetControllerForChecker
+from test.usecasesmarker.reading_spreadsheet_exception import ReadingSpreadsheetException
+from test.usecasesmarker.saving_spreadsheet_exception import SavingSpreadsheetException
 
 
 class Controller(ISpreadsheetControllerForChecker):
@@ -21,6 +29,12 @@ class Controller(ISpreadsheetControllerForChecker):
         self._spreadsheet = Spreadsheet()
         self._user_interface = TextualUserInterface()
         self._formula_evaluator = FormulaEvaluatorPostfix(self._spreadsheet)
+        self._journal = None
+        self._saver = IncrementalSpreadsheetSaverS2V()
+        self._batch_contents = None
+        self._batch_edits = []
+        self._parallel_evaluator = None
+        self._lazy = False
         self.exit = False
 
     def run(self) -> None:
@@ -55,6 +69,17 @@ class Controller(ISpreadsheetControllerForChecker):
                 self.save_spreadsheet_to_file(command[1])
                 self.render_spreadsheet()
                 self._user_interface.command_run_successfully("S")
+            case "M":
+                self.begin_batch()
+                self._user_interface.command_run_successfully("M")
+            case "A":
+                self.commit_batch()
+                self.render_spreadsheet()
+                self._user_interface.command_run_successfully("A")
+            case "R":
+                self.rollback_batch()
+                self.render_spreadsheet()
+                self._user_interface.command_run_successfully("R")
             case "Q":
                 self.quit()
             case _:
@@ -64,12 +89,15 @@ class Controller(ISpreadsheetControllerForChecker):
         """
         This method renders the spreadsheet.
         """
+        self._formula_evaluator.evaluate_pending()
         self._user_interface.render_spreadsheet(self._spreadsheet)
 
     def quit(self) -> None:
         """
         This method quits the application.
         """
+        self.stop_journal()
+        self.set_recalculation_processes(1)
         self.exit = True
         print("Goodbye!")
         print("Created by: Marc Micolau & Oriol Pareras.")
@@ -80,10 +108,16 @@ class Controller(ISpreadsheetControllerForChecker):
         """
         self._spreadsheet = Spreadsheet()
         self._formula_evaluator = FormulaEvaluatorPostfix(self._spreadsheet)
+        self._formula_evaluator.parallel_evaluator = self._parallel_evaluator
+        self._formula_evaluator.lazy = self._lazy
+        self._batch_contents = None  # The edits of a batch are discarded with the old spreadsheet
+        if self._journal is not None:  # The journal follows the new spreadsheet
+            self.checkpoint()
 
     def edit_cell(self, cell_identifier: str, new_content: str) -> None:
         """
-        This method edits a cell.
+        This method edits a cell. Inside a batch, the edit is only recorded: its formula is wired, but it
+        is neither checked for circular dependencies nor evaluated until the batch is committed.
 
         Keyword arguments:
         cell_identifier -- the identifier of the cell (str)
@@ -92,64 +126,488 @@ class Controller(ISpreadsheetControllerForChecker):
         content = Content.create_content(new_content)
         if content is None:
             raise ValueError("The content is not valid.")
-        cell = self._spreadsheet.get_cell(CellIdentifier(cell_identifier))
-        if cell is None:
-            cell = Cell(CellIdentifier(cell_identifier), content)
-            self._spreadsheet.add_cell(cell)
+        identifier = CellIdentifier(cell_identifier)
+        # Checked before the cell is created, because the empty cells inside a range have no Cell object
+        if isinstance(content, TextualContent) and self._formula_evaluator.dependency_manager.get_dependents(identifier):
+            raise ValueError("The content can not be text because it is used in a formula.")
+        previous_content = self._spreadsheet.get_content(identifier)
+        self._formula_evaluator.remove_dependencies(identifier, previous_content)
+        self._spreadsheet.set_content(identifier, content)
+        cell = Cell(identifier, content)
+        if self._batch_contents is not None:
+            self._batch_contents.setdefault(identifier, previous_content)  # The content before the batch
+            self._batch_edits.append((cell_identifier, new_content))
             if isinstance(content, Formula):
+                self._formula_evaluator.build_expression(cell)
+            else:
+                self._formula_evaluator.remove_expression(cell)
+            return
+        if isinstance(content, Formula):
+            try:
                 self._formula_evaluator.generate_expression(cell)
-                self._formula_evaluator.evaluate_expression(cell)
+            except CircularDependencyException:
+                self.restore_content(identifier, previous_content)  # The edit is rejected as a whole
+                raise
         else:
-            if cell.depends_on_me:
-                if isinstance(content, TextualContent):
-                    raise ValueError("The content can not be text because it is used in a formula.")
-                elif isinstance(content, NumericalContent):
-                    cell.content = content
-                elif isinstance(content, Formula):
-                    cell.content = content
-                    self._formula_evaluator.generate_expression(cell)
-                    self._formula_evaluator.evaluate_expression(cell)
-                for dependency in cell.depends_on_me:
-                    dependency_cell = self._spreadsheet.get_cell(dependency)
-                    self._formula_evaluator.evaluate_expression(dependency_cell)
-            else:
-                cell.content = content
-                if isinstance(content, Formula):
-                    self._formula_evaluator.generate_expression(cell)
-                    self._formula_evaluator.evaluate_expression(cell)
+            self._formula_evaluator.remove_expression(cell)
+        # The edit is journaled once it is made, because it is kept even if evaluating it fails
+        checkpoint_due = self._journal is not None and self._journal.append(cell_identifier, new_content)
+        # Evaluate the cell (if it is a formula) and every formula that transitively depends on it
+        self._formula_evaluator.recalculate(cell)
+        if checkpoint_due:
+            self.checkpoint()
+
+    def begin_batch(self) -> None:
+        """
+        This method starts a batch of edits. Until the batch is committed, the edits are only recorded,
+        so the formulas that depend on many of them are evaluated once instead of once per edit.
+        """
+        if self._batch_contents is not None:
+            raise ValueError("A batch of edits has already been started.")
+        self._batch_contents = {}
+        self._batch_edits = []
+
+    def commit_batch(self) -> None:
+        """
+        This method commits the batch of edits: the new formulas are checked for circular dependencies
+        once, and every formula affected by the edits is evaluated once, in topological order.
+        If there is a circular dependency, the whole batch is rolled back and the
+        CircularDependencyException is raised.
+        """
+        if self._batch_contents is None:
+            raise ValueError("No batch of edits has been started.")
+        cells = [self._spreadsheet.get_cell(identifier) for identifier in self._batch_contents]
+        cells = [cell for cell in cells if cell is not None]
+        try:
+            self._formula_evaluator.add_formulas([cell for cell in cells if isinstance(cell.content, Formula)])
+        except CircularDependencyException:
+            self.rollback_batch()
+            raise
+        edits = self._batch_edits
+        self._batch_contents = None
+        self._batch_edits = []
+        # The edits are journaled once they are made, because they are kept even if evaluating them fails
+        checkpoint_due = self._journal is not None and bool(edits) and self._journal.append_batch(edits)
+        self._formula_evaluator.recalculate_cells(cells)
+        if checkpoint_due:
+            self.checkpoint()
+
+    def rollback_batch(self) -> None:
+        """
+        This method discards the batch of edits, restoring every edited cell as it was before the batch.
+        Nothing has been evaluated since the batch started, so the values of the formulas are still right.
+        """
+        if self._batch_contents is None:
+            raise ValueError("No batch of edits has been started.")
+        contents = self._batch_contents
+        self._batch_contents = None
+        self._batch_edits = []
+        formula_cells = []
+        for identifier, previous_content in reversed(contents.items()):
+            content = self._spreadsheet.get_content(identifier)
+            if content is None:
+                continue
+            self._formula_evaluator.remove_dependencies(identifier, content)
+            self._formula_evaluator.remove_expression(Cell(identifier, content))
+            self.restore_content(identifier, previous_content)
+            if isinstance(previous_content, Formula) and previous_content.program is not None:
+                formula_cells.append(Cell(identifier, previous_content))
+        self._formula_evaluator.add_formulas(formula_cells)
+
+    def restore_content(self, identifier: CellIdentifier, previous_content) -> None:
+        """
+        This method gives a cell back the content it had before an edit, whose dependencies have already
+        been removed, and records the dependencies of the previous content if it is a formula. A formula
+        that could not be parsed is given back as it was, without dependencies.
+
+        Keyword arguments:
+        identifier -- the identifier of the cell (CellIdentifier)
+        previous_content -- the content before the edit, or None if the cell did not exist (Content)
+        """
+        if previous_content is None:  # The cell did not exist
+            self._spreadsheet.remove_cell(identifier)
+            return
+        self._spreadsheet.set_content(identifier, previous_content)
+        if isinstance(previous_content, Formula) and previous_content.program is not None:
+            self._formula_evaluator.build_expression(Cell(identifier, previous_content))
+
+    def set_recalculation_processes(self, processes: int = None) -> None:
+        """
+        This method sets the number of processes that evaluate the formulas of a recalculation. With more
+        than one, the levels of formulas that are expensive enough are spread across worker processes.
+
+        Keyword arguments:
+        processes -- the number of processes, 1 to evaluate every formula in this process, or None to
+                     use one per core (int)
+        """
+        parallel_evaluator = ParallelLevelEvaluator(processes)
+        if self._parallel_evaluator is not None:
+            self._parallel_evaluator.close()
+        self._parallel_evaluator = parallel_evaluator if parallel_evaluator.processes > 1 else None
+        self._formula_evaluator.parallel_evaluator = self._parallel_evaluator
+
+    def set_lazy_evaluation(self, lazy: bool) -> None:
+        """
+        This method sets whether the formulas are evaluated lazily. In lazy mode an edit only marks the
+        formulas that depend on it as dirty, and a formula is evaluated the first time its value is read
+        after that, so the edits made between two reads are not paid for on every edit. An evaluation
+        error is then raised by the read instead of the edit. Leaving lazy mode evaluates every dirty formula.
+
+        Keyword arguments:
+        lazy -- True to evaluate the formulas when they are read, False to evaluate them on every edit (bool)
+        """
+        if not isinstance(lazy, bool):
+            raise ValueError("The evaluation mode must be a boolean.")
+        self._lazy = lazy
+        self._formula_evaluator.lazy = lazy
+        if not lazy:
+            self._formula_evaluator.evaluate_pending()
+
+    def prefetch_cells(self, coords: list) -> None:
+        """
+        This method evaluates now the formulas that some cells need, such as the visible cells or the ones
+        about to be queried, so reading them later costs nothing. It only does something in lazy mode.
+
+        Keyword arguments:
+        coords -- the coordinates of the cells (list of str)
+        """
+        self._formula_evaluator.evaluate_pending([CellIdentifier(coord) for coord in coords])
+
+    def get_recalculation_counts(self) -> tuple:
+        """
+        This method returns what the last recalculation did, such as the one of the last edit.
+
+        Keyword arguments:
+        return -- the number of formulas evaluated and the number of dirty formulas cut off because the
+                  cells they read kept their values (tuple (int, int))
+        """
+        engine = self._formula_evaluator.recalculation_engine
+        return engine.evaluated_count, engine.cut_off_count
+
+    def start_journal(self, journal_path: str, sync_every: int = EditJournal.SYNC_EVERY,
+                      checkpoint_every: int = EditJournal.CHECKPOINT_EVERY) -> None:
+        """
+        This method starts keeping a journal of the edits of the spreadsheet, so every edit is saved
+        without saving the whole spreadsheet. The spreadsheet is saved once as the first checkpoint.
+
+        Keyword arguments:
+        journal_path -- the path of the journal file (str)
+        sync_every -- the number of edits written to the disk at once (int)
+        checkpoint_every -- the number of edits after which the journal is compacted into a checkpoint (int)
+        """
+        self.stop_journal()
+        self._journal = EditJournal(journal_path, sync_every, checkpoint_every)
+        try:
+            self.checkpoint()
+        except SavingSpreadsheetException:
+            self._journal = None
+            raise
+
+    def checkpoint(self) -> None:
+        """
+        This method compacts the journal: the whole spreadsheet is saved as a new checkpoint and the
+        journal starts empty again on top of it.
+        """
+        if self._journal is None:
+            raise ValueError("There is no journal.")
+        generation = self._journal.generation + 1
+        self.save_spreadsheet_to_file(self._journal.checkpoint_path(generation))
+        try:
+            self._journal.start(generation)
+        except OSError:
+            raise SavingSpreadsheetException("The journal could not be saved.")
+
+    def recover_from_journal(self, journal_path: str, sync_every: int = EditJournal.SYNC_EVERY,
+                             checkpoint_every: int = EditJournal.CHECKPOINT_EVERY) -> None:
+        """
+        This method recovers a spreadsheet from its journal: its last checkpoint is loaded and the edits
+        of the journal are replayed on top of it. The journal is kept, so the next edits are appended.
 
-    def load_spreadsheet_from_file(self, file_path: str) -> None:
+        Keyword arguments:
+        journal_path -- the path of the journal file (str)
+        sync_every -- the number of edits written to the disk at once (int)
+        checkpoint_every -- the number of edits after which the journal is compacted into a checkpoint (int)
+        """
+        self.stop_journal()
+        journal = EditJournal(journal_path, sync_every, checkpoint_every)
+        try:
+            edits = journal.resume()
+        except FileNotFoundError:
+            raise ReadingSpreadsheetException("The journal does not exist.")
+        except ValueError:
+            raise ReadingSpreadsheetException("The journal is not valid.")
+        try:
+            self.load_spreadsheet_from_file(journal.checkpoint_path(journal.generation))
+            self.begin_batch()  # The edits are replayed at once, and only the final state is checked
+            for cell_identifier, content in edits:
+                self.edit_cell(cell_identifier, content)
+            try:
+                self.commit_batch()
+            except ValueError:
+                pass  # Evaluating some edit failed in the same way when it was made
+        except:
+            journal.close()
+            raise
+        self._journal = journal
+
+    def stop_journal(self) -> None:
+        """
+        This method writes the pending edits of the journal to the disk and stops keeping it.
+        """
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def load_spreadsheet_from_file(self, file_path: str, processes: int = 1, trust_values: bool = False) -> None:
         """
         This method loads a spreadsheet from a file.
 
         Keyword arguments:
-        file_path -- the path of the file (str)
+        file_path -- the path of the file, a S2V file or a S2B snapshot (str)
+        processes -- the number of processes that parse a S2V file, or None to use one per core (int)
+        trust_values -- whether the computed values saved next to a S2V file are used instead of
+                        evaluating the formulas, if they match the file (bool)
         """
-        self._spreadsheet = Spreadsheet()  # create new spreadsheet
-        loader = SpreadsheetLoaderS2V()  # create loader
+        if isinstance(file_path, str) and file_path.strip().endswith(".s2b"):
+            loader = SpreadsheetLoaderS2B()
+        elif processes == 1:
+            loader = SpreadsheetLoaderS2V()  # create loader
+        else:
+            loader = ParallelSpreadsheetLoaderS2V(processes)
         try:
-            cells_to_load = loader.load_spreadsheet(file_path)
-            for cell in cells_to_load:
-                self.edit_cell(cell[0], cell[1])
+            if isinstance(loader, SpreadsheetLoaderS2B):
+                spreadsheet, formula_evaluator = self.load_snapshot(loader.load_spreadsheet(file_path))
+            else:
+                computed_values = ComputedValuesLoader().load_values(file_path) if trust_values else None
+                row_batches = loader.load_spreadsheet(file_path)
+                spreadsheet, formula_evaluator = self.load_cells(row_batches, computed_values)
         except ValueError:  # Any exception treated as invalid file
-            raise ReadingSpreadSheetException("The file is not valid.")
+            raise ReadingSpreadsheetException("The file is not valid.")
         except FileNotFoundError:
-            raise ReadingSpreadSheetException("The file does not exist.")
+            raise ReadingSpreadsheetException("The file does not exist.")
+        self._spreadsheet = spreadsheet
+        self._formula_evaluator = formula_evaluator
+        self._formula_evaluator.parallel_evaluator = self._parallel_evaluator
+        self._formula_evaluator.lazy = self._lazy
+        self._batch_contents = None  # The edits of a batch are discarded with the old spreadsheet
+        if self._journal is not None:  # The journal follows the loaded spreadsheet
+            self.checkpoint()
 
-    def save_spreadsheet_to_file(self, file_path: str) -> None:
+    @staticmethod
+    def load_cells(row_batches, computed_values: dict = None) -> tuple:
         """
-        This method saves the spreadsheet to a file.
+        This method builds a new spreadsheet from the contents read from a file.
+        Instead of editing the cells one by one, it works in three phases:
+        1. All the cells are created, batch by batch while the file is still being read, so every
+           formula finds its inputs.
+        2. The expressions are generated and the dependency graph is wired once.
+        3. The whole graph is checked for circular dependencies once, and every formula
+           is evaluated once in topological order, unless its computed value is given.
+
+        Keyword arguments:
+        row_batches -- the batches of rows read from the file, as returned by SpreadsheetLoaderS2V or
+                       ParallelSpreadsheetLoaderS2V (iterable of lists of tuples (int, list))
+        computed_values -- the computed values of the formulas, as returned by ComputedValuesLoader (dict)
+        return -- the new spreadsheet and its formula evaluator (tuple)
+        """
+        spreadsheet = Spreadsheet()
+        formula_evaluator = FormulaEvaluatorPostfix(spreadsheet)
+
+        formula_cells = []
+        for rows in row_batches:
+            for row_number, values in rows:
+                for column, value in enumerate(values):
+                    if value is None:  # An empty field holds no cell
+                        continue
+                    identifier = CellIdentifier.at(row_number, column)
+                    if isinstance(value, float):  # Plain numbers do not need a Cell object
+                        spreadsheet.set_number(identifier, value)
+                        continue
+                    parsed = None
+                    if isinstance(value, tuple):  # A formula parsed by a worker: its text, shape and template
+                        value, parsed = value[0], value[1:]
+                    content = Content.create_content(value)
+                    spreadsheet.set_content(identifier, content)
+                    if isinstance(content, Formula):
+                        formula_cells.append((Cell(identifier, content), parsed))
+
+        Controller.build_formulas(formula_evaluator, formula_cells, computed_values)
+        return spreadsheet, formula_evaluator
+
+    @staticmethod
+    def build_formulas(formula_evaluator: FormulaEvaluatorPostfix, formula_cells: list, values: dict = None) -> None:
+        """
+        This method runs the last two phases of a load: it generates the expressions of the formulas
+        and wires the dependency graph once, checks the whole graph for circular dependencies once,
+        and evaluates every formula once in topological order.
+        If the computed values of exactly these formulas are given, they are trusted: they are set as
+        they are and only the formulas without a computed value are evaluated.
+
+        Keyword arguments:
+        formula_evaluator -- the formula evaluator of the new spreadsheet (FormulaEvaluatorPostfix)
+        formula_cells -- the formula cells, each one with its shape and template if they have
+                         already been parsed, or None (list of tuples (Cell, tuple))
+        values -- the computed values of the formulas (dict of (row, column) -> int or float)
+        """
+        for cell, parsed in formula_cells:
+            formula_evaluator.build_expression(cell, parsed)
+
+        formula_evaluator.dependency_manager.build_topological_order(cell.identifier for cell, _ in formula_cells)
+        if values is None or len(values) != len(formula_cells) or \
+                any((cell.identifier.row_number, cell.identifier.column_number) not in values
+                    for cell, _ in formula_cells):
+            formula_evaluator.recalculate_all()
+            return
+        spreadsheet = formula_evaluator.spreadsheet
+        for cell, _ in formula_cells:
+            value = values[(cell.identifier.row_number, cell.identifier.column_number)]
+            if value is None:
+                formula_evaluator.recalculation_engine.mark_dirty(cell.identifier)
+            else:
+                cell.content.value = NumericalValue(value)
+                spreadsheet.update_cell_value(cell)
+        formula_evaluator.recalculation_engine.recalculate()
+
+    @staticmethod
+    def load_snapshot(snapshot: SnapshotS2B) -> tuple:
+        """
+        This method builds a new spreadsheet from a S2B snapshot, and closes the snapshot.
+        The arrays of numbers are adopted as they are. If the snapshot has the graph of the formulas,
+        the formulas are bound to the templates of their shapes, their computed values are restored
+        and the saved topological order is adopted, so no formula is evaluated nor checked again.
+        Otherwise the formulas are built as in load_cells.
+
+        Keyword arguments:
+        snapshot -- the snapshot (SnapshotS2B)
+        return -- the new spreadsheet and its formula evaluator (tuple)
+        """
+        spreadsheet = Spreadsheet()
+        formula_evaluator = FormulaEvaluatorPostfix(spreadsheet)
+        try:
+            for column, first_row, values, mask in snapshot.number_columns():
+                spreadsheet.set_number_column(column, first_row, values, mask)
+            strings = snapshot.strings()
+            formula_cells = []
+            for row, column, kind, reference, number in zip(*snapshot.cells()):
+                identifier = CellIdentifier.at(row, column)
+                if kind == SnapshotS2B.NUMBER:
+                    spreadsheet.set_number(identifier, number)
+                elif kind == SnapshotS2B.TEXT:
+                    spreadsheet.set_content(identifier, TextualContent(TextualValue(strings[reference])))
+                elif kind == SnapshotS2B.FORMULA:
+                    cell = Cell(identifier, Formula(strings[reference]))
+                    spreadsheet.set_content(identifier, cell.content)
+                    formula_cells.append(cell)
+                elif kind == SnapshotS2B.EMPTY:
+                    spreadsheet.set_content(identifier, NumericalContent.empty())
+                else:
+                    raise ValueError("Unexpected content type.")
+            graph = snapshot.graph()
+        finally:
+            snapshot.close()
+        if graph is None or not Controller.restore_formulas(formula_evaluator, formula_cells, strings, graph):
+            Controller.build_formulas(formula_evaluator, [(cell, None) for cell in formula_cells])
+        return spreadsheet, formula_evaluator
+
+    @staticmethod
+    def restore_formulas(formula_evaluator: FormulaEvaluatorPostfix, formula_cells: list, strings: list,
+                         graph: tuple) -> bool:
+        """
+        This method builds the formulas of a snapshot from its graph. Every shape is parsed once, from
+        its first formula, and the rest of the formulas are only bound. Nothing is built if the graph
+        does not match the formulas, for example because the shapes were written by another version.
+
+        Keyword arguments:
+        formula_evaluator -- the formula evaluator of the new spreadsheet (FormulaEvaluatorPostfix)
+        formula_cells -- the formula cells, in the order of the snapshot (list of Cells)
+        strings -- the table of strings of the snapshot (list of str)
+        graph -- the shapes, the computed values and the topological order of the formulas (tuple of arrays)
+        return -- True if the formulas have been built, False otherwise (bool)
+        """
+        shapes, kinds, values, order = graph
+        if len(shapes) != len(formula_cells) or sorted(order) != list(range(len(formula_cells))):
+            return False
+        templates = {}
+        for cell, shape in zip(formula_cells, shapes):
+            if shape not in templates:
+                identifier = cell.identifier
+                parsed = formula_evaluator.parse_template(cell.content.textual_representation,
+                                                          identifier.row_number, identifier.column_number)
+                if parsed[0] != strings[shape]:
+                    return False
+                templates[shape] = parsed
+
+        spreadsheet = formula_evaluator.spreadsheet
+        for cell, shape, kind, value in zip(formula_cells, shapes, kinds, values):
+            formula_evaluator.build_expression(cell, templates[shape])
+            if kind != SnapshotS2B.NO_VALUE:
+                cell.content.value = NumericalValue(SnapshotS2B.typed_value(kind, value))
+                spreadsheet.update_cell_value(cell)
+        formula_evaluator.dependency_manager.restore_topological_order([formula_cells[index].identifier
+                                                                        for index in order])
+        for cell, kind in zip(formula_cells, kinds):
+            if kind == SnapshotS2B.NO_VALUE:
+                formula_evaluator.recalculation_engine.mark_dirty(cell.identifier)
+        formula_evaluator.recalculation_engine.recalculate()
+        return True
+
+    def open_spreadsheet_from_file(self, file_path: str) -> None:
+        """
+        This method opens a spreadsheet from a file without reading it: the file is mapped in memory and
+        only the rows with formulas are loaded, with the cells their formulas read. Every other row is
+        loaded the first time it is used, so opening a huge file to read a few ranges is fast.
+        The file must not be changed by other programs while the spreadsheet is open.
+
+        Keyword arguments:
+        file_path -- the path of the file (str)
+        """
+        loader = MappedSpreadsheetLoaderS2V()
+        try:
+            source = loader.load_spreadsheet(file_path)
+            storage = MappedCellStorage(source)
+            spreadsheet = Spreadsheet(storage)
+            formula_evaluator = FormulaEvaluatorPostfix(spreadsheet)
+            storage.load_rows(source.formula_rows)
+            self.build_formulas(formula_evaluator, [(cell, None) for cell in spreadsheet.get_formula_cells()])
+        except ValueError:
+            raise ReadingSpreadsheetException("The file is not valid.")
+        except FileNotFoundError:
+            raise ReadingSpreadsheetException("The file does not exist.")
+        self._spreadsheet = spreadsheet
+        self._formula_evaluator = formula_evaluator
+        self._formula_evaluator.parallel_evaluator = self._parallel_evaluator
+        self._formula_evaluator.lazy = self._lazy
+        self._batch_contents = None  # The edits of a batch are discarded with the old spreadsheet
+        if self._journal is not None:  # The journal follows the opened spreadsheet
+            self.checkpoint()
+
+    def save_spreadsheet_to_file(self, file_path: str, save_values: bool = False) -> None:
+        """
+        This method saves the spreadsheet to a file. A .s2b file is saved as a S2B snapshot, with the
+        graph and the computed values of the formulas. Saving again to the S2V file saved last only
+        writes the rows edited since then.
 
         Keyword arguments:
         file_path -- the path of the file (str)
+        save_values -- whether the computed values of the formulas are saved next to a S2V file, so it
+                       can be loaded without evaluating them (bool)
         """
-        saver = SpreadsheetSaverS2V()
+        if self._batch_contents is not None:
+            raise SavingSpreadsheetException("The batch of edits must be committed or rolled back first.")
+        self._formula_evaluator.evaluate_pending()  # The computed values are saved too
+        self._spreadsheet.cells.load_all()  # The file the spreadsheet was opened from may be overwritten
         try:
-            saver.save_spreadsheet(self._spreadsheet, file_path)
+            if isinstance(file_path, str) and file_path.endswith(".s2b"):
+                SpreadsheetSaverS2B().save_spreadsheet(self._spreadsheet, file_path,
+                                                       self._formula_evaluator.dependency_manager)
+            else:
+                self._saver.save_spreadsheet(self._spreadsheet, file_path)  # Only the edited rows, if it can
+                if save_values:
+                    ComputedValuesSaver().save_values(self._spreadsheet, file_path)
         except ValueError:
-            raise SavingSpreadSheetException("The file is not valid.")
+            raise SavingSpreadsheetException("The file is not valid.")
         except:
-            raise SavingSpreadSheetException("The file could not be saved.")
+            raise SavingSpreadsheetException("The file could not be saved.")
 
     def get_cell_content_as_float(self, coord: str) -> float:
         """
@@ -158,9 +616,11 @@ class Controller(ISpreadsheetControllerForChecker):
         Keyword arguments:
         coord -- the coordinate of the cell (str)
         """
-        cell = self._spreadsheet.get_cell(CellIdentifier(coord))
+        identifier = CellIdentifier(coord)
+        self._formula_evaluator.evaluate_pending([identifier])
+        content = self._spreadsheet.get_content(identifier)
         try:
-            return float(cell.content.value.value)
+            return float(content.value.value)
         except ValueError:
             raise NoNumberException("The cell does not contain a number.")
 
@@ -176,12 +636,14 @@ class Controller(ISpreadsheetControllerForChecker):
         If the cell content is a formula, it returns the string representing the
         number resulting of evaluating such formula.
         """
-        cell = self._spreadsheet.get_cell(CellIdentifier(coord))  # This must raise the BadCoordinateException
-        if cell is None:
+        identifier = CellIdentifier(coord)  # This must raise the BadCoordinateException
+        self._formula_evaluator.evaluate_pending([identifier])
+        content = self._spreadsheet.get_content(identifier)
+        if content is None:
             return ""
-        if cell.content.value.value is None:
+        if content.value.value is None:
             return ""
-        return str(cell.content.value.value)
+        return str(content.value.value)
 
     def get_cell_formula_expression(self, coord: str) -> str:
         """
@@ -192,9 +654,9 @@ class Controller(ISpreadsheetControllerForChecker):
         a string representing the formula expression of a cell. If the cell does not
         contain a formula, it returns None.
         """
-        cell: Cell = self._spreadsheet.get_cell(CellIdentifier(coord))  # This must raise the BadCoordinateException
-        if isinstance(cell.content, Formula):
-            return "=" + cell.content.textual_representation
+        content = self._spreadsheet.get_content(CellIdentifier(coord))  # This must raise the BadCoordinateException
+        if isinstance(content, Formula):
+            return "=" + content.textual_representation
             # THE EQUAL IS CONTRARY TO THE SPECIFICATION IT HAS BEEN ADDED TO PASS THE TESTS
             # BE COHERENT WITH THIS
         else:
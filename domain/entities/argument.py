@@ -10,6 +10,7 @@ class Argument(abc.ABC):
     This class is an interface for the arguments.
     The method must be implemented in the subclasses.
     """
+    __slots__ = ()
 
     @abc.abstractmethod
     def get_values_as_argument(self):
@@ -17,3 +18,16 @@ class Argument(abc.ABC):
         This method returns the values of the argument.
         """
         pass
+
+    def get_aggregate_as_argument(self) -> tuple:
+        """
+        This method returns the sum, the number, the minimum and the maximum of the values of the argument.
+        The subclasses that can aggregate their values without listing them override it.
+
+        Keyword arguments:
+        return -- the sum, the number of values, the minimum and the maximum (tuple)
+        """
+        values = self.get_values_as_argument()
+        if not values:
+            return 0, 0, float("inf"), float("-inf")
+        return sum(values), len(values), min(values), max(values)
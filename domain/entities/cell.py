@@ -2,39 +2,103 @@
 This file contains the Cell class.
 """
 
-from domain.entities.content import Content, NumericalContent, Formula
+from domain.entities.content import Content
 from domain.entities.argument import Argument
 from domain.entities.operand import Operand
 import re
+import weakref
+from domain.utils.utils import column_letters, column_number
 from test.entities.bad_coordinate_exception import BadCoordinateException
 
+_COORDINATE_RE = re.compile(r'([A-Za-z]+)([0-9]+)')
+_COLUMN_BITS = 24  # The column takes the lowest bits of the packed position
+_COLUMN_LIMIT = 1 << _COLUMN_BITS
+_COLUMN_MASK = _COLUMN_LIMIT - 1
+
 
 class CellIdentifier:
     """
     This class represents a cell identifier.
+    Identifiers are immutable and interned: creating an identifier for a cell that already has one
+    returns the same instance, so comparing them is usually an identity check. The row and the column
+    are packed in a single integer, which is all an identifier stores and is used as the hash.
+    The coordinate strings are built when they are asked for.
     """
-    def __init__(self, coordinate: str):
+    __slots__ = ("_key", "__weakref__")
+
+    _by_key = weakref.WeakValueDictionary()  # The identifier of every packed position in use
+
+    def __new__(cls, coordinate: str):
         """
-        This method initializes the cell identifier.
+        This method returns the identifier of a coordinate, creating it if it does not exist yet.
 
         Keyword arguments:
         coordinate -- the coordinate of the cell (str ex: A1)
 
         Attributes:
-        _coordinate -- the coordinate of the cell (str)
-        _column -- the column of the cell (str)
-        _row -- the row of the cell (str)
+        _key -- the row and the column packed in a single integer (int)
         """
-        # Check if the coordinate is valid
         if not isinstance(coordinate, str):
             raise BadCoordinateException("The coordinate must be a string.")
-        if self.coordinate_is_valid(coordinate):
-            self._coordinate = coordinate
-            
-            # Get the row and the column
-            position = re.search(r"\d", coordinate)
-            self._column = coordinate[:position.start()]
-            self._row = coordinate[position.start():]
+        # Check if the coordinate is valid
+        match = _COORDINATE_RE.fullmatch(coordinate)
+        if match is None:
+            cls.coordinate_is_valid(coordinate)  # Raises the exception that describes the problem
+            raise BadCoordinateException("The coordinate must be letters followed by digits.")
+        return cls.at(int(match.group(2)), column_number(match.group(1).upper()))
+
+    @classmethod
+    def at(cls, row: int, column: int) -> 'CellIdentifier':
+        """
+        This method returns the identifier of a position, creating it if it does not exist yet.
+
+        Keyword arguments:
+        row -- the row of the cell (int)
+        column -- the column of the cell, starting at 0 (int)
+        return -- the identifier (CellIdentifier)
+        """
+        if not 0 <= column < _COLUMN_LIMIT or row < 0:
+            raise BadCoordinateException("The coordinate is out of range.")
+        key = (row << _COLUMN_BITS) | column
+        identifier = cls._by_key.get(key)
+        if identifier is None:
+            identifier = object.__new__(cls)
+            identifier._key = key
+            cls._by_key[key] = identifier
+        return identifier
+
+    @classmethod
+    def existing_at(cls, row: int, column: int):
+        """
+        This method returns the identifier of a position only if it is already in use, without
+        creating it. The identifiers are kept by whoever uses them, such as the topological order
+        for the formulas, so a formula always has one.
+
+        Keyword arguments:
+        row -- the row of the cell (int)
+        column -- the column of the cell, starting at 0 (int)
+        return -- the identifier (CellIdentifier) or None
+        """
+        return cls._by_key.get((row << _COLUMN_BITS) | column)
+
+    @staticmethod
+    def key_at(row: int, column: int) -> int:
+        """
+        This method returns the row and the column of a position packed in a single integer, as in
+        the key of its identifier, for the indexes that do not need the identifier itself.
+
+        Keyword arguments:
+        row -- the row of the cell (int)
+        column -- the column of the cell, starting at 0 (int)
+        return -- the packed position (int)
+        """
+        return (row << _COLUMN_BITS) | column
+
+    def __reduce__(self):
+        """
+        This method makes the identifiers picklable, going through the interning on unpickling.
+        """
+        return CellIdentifier, (self.coordinate,)
 
     @staticmethod
     def coordinate_is_valid(coordinate: str):
@@ -72,40 +136,53 @@ class CellIdentifier:
     @property
     def coordinate(self):
         """
-        Getter for the coordinate.
-        """
-        return self._coordinate
-    
-    @coordinate.setter
-    def coordinate(self, coordinate):
-        """
-        Setter for the coordinate.
+        Getter for the coordinate, with the column in capital letters.
         """
-        if not isinstance(coordinate, str):
-            raise BadCoordinateException("The coordinate must be a string.")
-        if self.coordinate_is_valid(coordinate):
-            self._coordinate = coordinate
+        return column_letters(self._key & _COLUMN_MASK) + str(self._key >> _COLUMN_BITS)
 
     @property
     def column(self):
         """
         Getter for the column.
         """
-        return self._column
+        return column_letters(self._key & _COLUMN_MASK)
     
     @property
     def row(self):
         """
         Getter for the row.
         """
-        return self._row
+        return str(self._key >> _COLUMN_BITS)
+
+    @property
+    def row_number(self):
+        """
+        Getter for the row as an integer.
+        """
+        return self._key >> _COLUMN_BITS
+
+    @property
+    def column_number(self):
+        """
+        Getter for the column as an integer, starting at 0.
+        """
+        return self._key & _COLUMN_MASK
+
+    @property
+    def key(self):
+        """
+        Getter for the row and the column packed in a single integer, as given by key_at.
+        """
+        return self._key
 
     def __eq__(self, other):
         """
         This method checks if two cell identifiers are equal.
         """
+        if self is other:
+            return True
         if isinstance(other, CellIdentifier):
-            return self.coordinate == other.coordinate
+            return self._key == other._key
         else:
             return False
 
@@ -113,13 +190,23 @@ class CellIdentifier:
         """
         This method returns the hash of the cell identifier.
         """
-        return hash(self.coordinate)
+        return self._key
+
+    def __repr__(self):
+        """
+        This method returns the representation of the cell identifier.
+        """
+        return "CellIdentifier({!r})".format(self.coordinate)
 
 
 class Cell(Argument, Operand):
     """
     This class represents a cell.
+    A cell is only its identifier and its content: the formulas that read it are kept by the
+    dependency manager, so the storage does not need a Cell object for every cell a formula reads.
     """
+    __slots__ = ("_identifier", "_content")
+
     def __init__(self, identifier: CellIdentifier, content: Content):
         """
         This method initializes the cell.
@@ -131,12 +218,9 @@ class Cell(Argument, Operand):
         Attributes:
         _identifier -- the identifier of the cell (CellIdentifier)
         _content -- the content of the cell (Content)
-        _dependencies -- the cells that the cell depends on (list)
         """
         self._identifier = identifier
         self._content = content
-        self._depends_on_me = []
-        self._depends_on = []
     
     @property
     def identifier(self):
@@ -170,60 +254,6 @@ class Cell(Argument, Operand):
             raise ValueError("The content must be a Content.")
         self._content = content
 
-    @property
-    def depends_on_me(self):
-        """
-        Getter for dependencies.
-        """
-        return self._depends_on_me
-    
-    @depends_on_me.setter
-    def depends_on_me(self, dependencies):
-        """
-        Setter for dependencies.
-        """
-        if not isinstance(dependencies, list):
-            raise ValueError("The dependencies must be a list.")
-        self._depends_on_me = dependencies
-
-    @property
-    def depends_on(self):
-        """
-        Getter for dependencies.
-        """
-        return self._depends_on
-
-    @depends_on.setter
-    def depends_on(self, dependencies):
-        """
-        Setter for dependencies.
-        """
-        if not isinstance(dependencies, list):
-            raise ValueError("The dependencies must be a list.")
-        self._depends_on = dependencies
-
-    def add_dependency(self, dependency: CellIdentifier):
-        """
-        This method adds a dependency to the attribute _depends_on_me.
-
-        keyword arguments:
-        dependency -- the dependency to add (CellIdentifier)
-        """
-        if not isinstance(dependency, CellIdentifier):
-            raise ValueError("The dependency must be a Cell.")
-        self._depends_on_me.append(dependency)
-    
-    def remove_dependency(self, dependency: CellIdentifier):
-        """
-        This method removes a dependency from the attribute _dependencies.
-
-        Keyword arguments:
-        dependency -- the dependency to remove (CellIdentifier)
-        """
-        if not isinstance(dependency, CellIdentifier):
-            raise ValueError("The dependency must be a CellIdentifier.")
-        self._depends_on_me.remove(dependency)
-
     def get_values_as_argument(self):
         """
         This method returns the values of the cell as an argument.
@@ -231,12 +261,7 @@ class Cell(Argument, Operand):
         Keyword arguments:
         return -- the values of the cell (list)
         """
-        if isinstance(self._content, NumericalContent):
-            if self._content.value.value is None:
-                return []
-            return [self._content.value.value]
-        else:  # This is redundant, but it is here to make it clear
-            raise ValueError("The content must be a NumericalContent.")
+        return self._content.get_values_as_argument()
     
     def get_value_as_operand(self):
         """
@@ -245,7 +270,4 @@ class Cell(Argument, Operand):
         Keyword arguments:
         return -- the value of the cell (float)
         """
-        if isinstance(self._content, NumericalContent) or isinstance(self._content, Formula):
-            return self._content.value.value
-        else:
-            raise ValueError("The content must be a NumericalContent.")
+        return self._content.get_value_as_operand()
@@ -9,7 +9,9 @@ from domain.entities.value import Value, TextualValue, NumericalValue
 class Content(abc.ABC):
     """
     This is an abstract class that represents a content.
+    Contents have no instance dictionary: every class declares its attributes in __slots__.
     """
+    __slots__ = ("_value",)
 
     @abc.abstractmethod
     def __init__(self, value: Value):
@@ -42,6 +44,26 @@ class Content(abc.ABC):
             raise ValueError("The value must be a Value.")
         self._value = value
 
+    def get_value_as_operand(self):
+        """
+        This method returns the value of the content as an operand of a formula.
+        Only numbers and formulas can be operands.
+
+        Keyword arguments:
+        return -- the value (float) or None if it is empty
+        """
+        raise ValueError("The content must be a NumericalContent.")
+
+    def get_values_as_argument(self):
+        """
+        This method returns the values of the content as a single-cell argument of a function.
+        Only numbers can be such arguments.
+
+        Keyword arguments:
+        return -- the values (list)
+        """
+        raise ValueError("The content must be a NumericalContent.")
+
     @staticmethod
     def create_content(content_str: str) -> 'Content':
         """
@@ -69,6 +91,7 @@ class TextualContent(Content):
     This is a concrete implementation of the Content class.
     It represents a textual content.
     """
+    __slots__ = ()
 
     def __init__(self, value: TextualValue):
         """
@@ -103,7 +126,9 @@ class NumericalContent(Content):
     """
     This is a concrete implementation of the Content class.
     It represents a numerical content.
+    The empty content is shared by every empty cell, so it can not be changed.
     """
+    __slots__ = ()
 
     def __init__(self, value: NumericalValue):
         """
@@ -117,6 +142,16 @@ class NumericalContent(Content):
         """
         super().__init__(value)
 
+    @staticmethod
+    def empty() -> 'NumericalContent':
+        """
+        This method returns the shared content of the empty cells.
+
+        Keyword arguments:
+        return -- the empty content (NumericalContent)
+        """
+        return _EMPTY_NUMERICAL_CONTENT
+
     @property
     def value(self):
         """
@@ -131,14 +166,37 @@ class NumericalContent(Content):
         """
         if not isinstance(value, NumericalValue):
             raise ValueError("The value must be a NumericalValue.")
+        if self is _EMPTY_NUMERICAL_CONTENT:
+            raise ValueError("The empty content is shared and can not be changed.")
         self._value = value
 
+    def get_value_as_operand(self):
+        """
+        This method returns the number as an operand of a formula.
+        """
+        return self._value.value
+
+    def get_values_as_argument(self):
+        """
+        This method returns the number as an argument of a function, or no values if it is empty.
+        """
+        if self._value.value is None:
+            return []
+        return [self._value.value]
+
+
+_EMPTY_NUMERICAL_CONTENT = NumericalContent(NumericalValue.empty())
+
 
 class Formula(Content):
     """
     This is a concrete implementation of the Content class.
     It represents a formula.
+    A formula is its text and the program of its shape, which is shared by every formula with the
+    same relative form and evaluates it at the position of its cell, so a formula does not keep an
+    expression of its own.
     """
+    __slots__ = ("_textual_representation", "_program")
 
     def __init__(self, textual_representation: str):
         """
@@ -149,11 +207,12 @@ class Formula(Content):
 
         Attributes:
         textual_representation -- the textual representation of the formula (str)
-        expression -- the expression of the formula (list of FormulaComponents)
+        program -- the compiled program of the shape of the formula, or None until the formula is
+                   built (FormulaProgram)
         """
-        super().__init__(NumericalValue(None))
+        super().__init__(NumericalValue.empty())
         self._textual_representation = textual_representation
-        self._expression = []
+        self._program = None
 
     @property
     def value(self):
@@ -171,6 +230,12 @@ class Formula(Content):
             raise ValueError("The value must be a NumericalValue.")
         self._value = value
 
+    def get_value_as_operand(self):
+        """
+        This method returns the computed value of the formula as an operand of another formula.
+        """
+        return self._value.value
+
     @property
     def textual_representation(self):
         """
@@ -188,17 +253,25 @@ class Formula(Content):
         self._textual_representation = textual_representation
 
     @property
-    def expression(self):
+    def program(self):
         """
-        Getter for expression.
+        Getter for the program.
         """
-        return self._expression
+        return self._program
 
-    @expression.setter
-    def expression(self, expression):
+    @program.setter
+    def program(self, program):
+        """
+        Setter for the program.
+        """
+        if program is not None and not callable(getattr(program, "evaluate", None)):
+            raise ValueError("The program must be a FormulaProgram.")
+        self._program = program
+
+    @property
+    def shape(self):
         """
-        Setter for expression.
+        Getter for the shape: the formula with its references relative to its cell, or None until
+        the formula is built.
         """
-        if not isinstance(expression, list):  # A list of formula components
-            raise ValueError("The expression must be a list.")
-        self._expression = expression
+        return self._program.shape if self._program is not None else None
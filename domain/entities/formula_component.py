@@ -7,7 +7,10 @@ import abc
 class FormulaComponent(abc.ABC):
     """
     This is an abstract class that represents a formula component.
+    Formula components have no instance dictionary: every class declares its attributes in __slots__.
     """
+    __slots__ = ()
+
     @abc.abstractmethod
     def __init__(self):
         """
@@ -19,7 +22,21 @@ class FormulaComponent(abc.ABC):
 class Parenthesis(FormulaComponent):
     """
     This class represents a parenthesis.
+    Parentheses are immutable, so there is only one opening and one closing instance.
     """
+    __slots__ = ("_opens",)
+
+    _instances = {}  # The shared instance of every kind of parenthesis
+
+    def __new__(cls, opens: bool):
+        """
+        This method returns the shared parenthesis of a kind, creating it the first time.
+        """
+        parenthesis = cls._instances.get(opens)
+        if parenthesis is None:
+            parenthesis = cls._instances[opens] = super().__new__(cls)
+        return parenthesis
+
     def __init__(self, opens: bool) -> None:
         """
         This method initializes the parenthesis.
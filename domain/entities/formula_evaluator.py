@@ -1,53 +1,132 @@
 """
 This file contains the formula evaluator class and its subclasses. 
 """
-from domain.entities.formula_component import Parenthesis
-from domain.entities.formula_operator import Operator
 from domain.utils.tokenizer import Tokenizer
 from domain.utils.parser import Parser
 import abc
+import weakref
 from domain.entities.value import NumericalValue
 from domain.entities.spreadsheet import Spreadsheet
 from domain.entities.cell import CellIdentifier
-from domain.entities.range import Range
 from domain.utils.tokenizer import TokenType
-from domain.entities.function import Suma, Max, Min, Promedio
-from domain.utils.shunting_yard_algorithm import ShuntingYard
+from domain.entities.function import Function
+from domain.utils.formula_compiler import FormulaCompiler, FormulaProgram, TemplateReader
 from domain.utils.dependency_manager import DependencyManager
+from domain.utils.recalculation_engine import RecalculationEngine
 from domain.entities.cell import Cell
-from domain.entities.content import NumericalContent
+from domain.entities.content import Content, Formula
 # from domain.exceptions.exceptions import CircularDependencyException, ContentException
 from test.entities.content_exception import ContentException
+from test.entities.circular_dependency_exception import CircularDependencyException
+from domain.utils.parse_cache import ParseCache
+
+ENGINE_VERSION = 1  # Increased whenever the same formulas may be evaluated to different values
+_MIN_RUN_LENGTH = 2  # The shortest run of formulas that is evaluated as a vector
+_PARSE_CACHE_SIZE = 4096  # The number of relative forms kept parsed
+
+
+class _SpreadsheetReader(TemplateReader):
+    """
+    This class reads the references of the compiled templates from the cells of a spreadsheet, without
+    creating any Cell, and shares the results of the functions through Function.evaluate_shared.
+    """
+    __slots__ = ("_spreadsheet",)
+
+    def __init__(self, spreadsheet: Spreadsheet) -> None:
+        """
+        This method initializes the reader.
+
+        Attributes:
+        _spreadsheet -- the spreadsheet (Spreadsheet)
+        """
+        self._spreadsheet = spreadsheet
+
+    def operand(self, row_offset: int, column_offset: int):
+        """
+        This method returns the reader of a cell used as an operand.
+        """
+        get_operand_at = self._spreadsheet.get_operand_at
+        return lambda row, column: get_operand_at(row + row_offset, column + column_offset)
+
+    def argument(self, row_offset: int, column_offset: int):
+        """
+        This method returns the reader of a cell passed to a function.
+        """
+        get_argument_at = self._spreadsheet.get_argument_at
+        return lambda row, column: get_argument_at(row + row_offset, column + column_offset)
+
+    def range(self, start_row_offset: int, start_column_offset: int, end_row_offset: int, end_column_offset: int):
+        """
+        This method returns the reader of a range passed to a function, which queries the aggregate index.
+        """
+        query = self._spreadsheet.aggregate_index.query
+        return lambda row, column: query(row + start_row_offset, column + start_column_offset,
+                                         row + end_row_offset, column + end_column_offset)
+
+    def shared(self, key_of, compute):
+        """
+        This method returns the evaluator of a function that is computed once per recalculation epoch
+        for all the formulas with the same absolute form of the function.
+        """
+        evaluate_shared = Function.evaluate_shared
+        return lambda row, column: evaluate_shared(key_of(row, column), compute, row, column)
 
 
 class FormulaEvaluator(abc.ABC):
     """
     This is an abstract class represents a formula evaluator.
+    In lazy mode, a change only marks the formulas that depend on it as dirty, and they are evaluated
+    when their values are read, with evaluate_pending.
+    Every shape is compiled once into a FormulaProgram shared by all its formulas, which evaluates
+    the formula at the position of its cell. The functions over the same ranges and numbers, such as
+    SUMA(A1:A50000) in many formulas, are computed once per recalculation epoch.
     """
     def __init__(self, spreadsheet: Spreadsheet) -> None:
         self.spreadsheet = spreadsheet
+        self.lazy = False
+        self.programs = weakref.WeakValueDictionary()  # Dropped when no formula has their shape
         self.tokenizer = Tokenizer()
         self.parser = Parser()
-        self.shunting_yard = ShuntingYard()
+        self.compiler = FormulaCompiler()
+        self.reader = _SpreadsheetReader(spreadsheet)
+        self.parse_cache = ParseCache(_PARSE_CACHE_SIZE)
         self.dependency_manager = DependencyManager(spreadsheet)
+        self.recalculation_engine = RecalculationEngine(spreadsheet, self.dependency_manager, self.evaluate_expression,
+                                                        self.evaluate_expressions)
 
-    def convert_to_formula_components(self, tokens: list) -> list:
+    @staticmethod
+    def build_template(tokens: list, row: int, column: int) -> tuple:
         """
-        This method converts the list of tokens to a list of FormulaComponent objects.
+        This method converts the list of tokens to a template: the formula components described
+        without any reference to concrete cells, so the same template serves every formula with the
+        same relative form. Cell references are kept as offsets from the cell that holds the formula.
+        The nodes of a template are tuples:
+        ("number", NumericalValue), ("operator", type), ("parenthesis", opens), ("cell", row offset, column offset),
+        ("range", start row offset, start column offset, end row offset, end column offset) and
+        ("function", name, argument nodes).
 
         Keyword arguments:
         tokens -- the list of tokens (list)
-        return -- the list of FormulaComponent objects (list)
+        row -- the row of the cell that holds the formula (int)
+        column -- the column of the cell that holds the formula, starting at 0 (int)
+        return -- the template (tuple of nodes)
         """
 
+        def cell_node(token) -> tuple:
+            """
+            This method creates the node of a cell reference.
+            """
+            identifier = CellIdentifier(token.value)
+            return "cell", identifier.row_number - row, identifier.column_number - column
+
         def create_function(tokens: list, i: int) -> tuple:
             """
-            This method creates a function from the list of tokens passed as argument.
+            This method creates a function node from the list of tokens passed as argument.
 
             Keyword arguments:
             tokens -- the list of tokens (list)
             i -- the current index iterating the tokens list(int)
-            return -- the function object (Function)
+            return -- the function node (tuple)
             """
 
             # Save function type
@@ -65,27 +144,21 @@ class FormulaEvaluator(abc.ABC):
                 argument = []
                 while tokens[i].type != TokenType.SEMICOLON and tokens[i].type != TokenType.CLOSING_PARENTHESIS:
                     if tokens[i].type == TokenType.NUMBER:
-                        argument.append(NumericalValue(float(tokens[i].value)))
+                        argument.append(("number", NumericalValue(float(tokens[i].value))))
                     elif tokens[i].type == TokenType.OPERATOR:
                         raise ContentException("Operators are not allowed in function arguments.")
                     elif tokens[i].type == TokenType.OPENING_PARENTHESIS or tokens[
                         i].type == TokenType.CLOSING_PARENTHESIS:
                         raise ContentException("Operations are not allowed in function arguments.")
-                    elif tokens[i].type == TokenType.CELL_IDENTIFIER:
-                        c = self.spreadsheet.get_cell(CellIdentifier(tokens[i].value))
-                        if c is not None:
-                            argument.append(c)
-                        else:  # if it doesn't exist, create it. Dependency manager will take care of the rest
-                            self.spreadsheet.add_cell(Cell(CellIdentifier(tokens[i].value), NumericalContent(NumericalValue(None))))
-                            argument.append(self.spreadsheet.get_cell(CellIdentifier(tokens[i].value)))
-                    elif tokens[i].type == TokenType.COLON:
-                        start_arg_cell_id = argument.pop(-1).identifier
-                        end_arg_cell_id = CellIdentifier(tokens[i + 1].value)
-                        i += 1
-                        if isinstance(start_arg_cell_id, CellIdentifier) and isinstance(end_arg_cell_id, CellIdentifier):
-                            argument.append(Range(start_arg_cell_id, end_arg_cell_id, self.spreadsheet))
-                        else:
+                    elif tokens[i].type == TokenType.CELL_IDENTIFIER and i + 2 < len(tokens) \
+                            and tokens[i + 1].type == TokenType.COLON:
+                        # A range: its cells are not created, the dependency manager indexes the whole range
+                        if tokens[i + 2].type != TokenType.CELL_IDENTIFIER:
                             raise ContentException("The start and end of the range must be cells.")
+                        argument.append(("range",) + cell_node(tokens[i])[1:] + cell_node(tokens[i + 2])[1:])
+                        i += 2
+                    elif tokens[i].type == TokenType.CELL_IDENTIFIER:
+                        argument.append(cell_node(tokens[i]))
                     elif tokens[i].type == TokenType.FUNCTION:
                         func, i = create_function(tokens, i)
                         argument.append(func)
@@ -95,69 +168,239 @@ class FormulaEvaluator(abc.ABC):
                 if argument: arguments.append(argument.pop(-1))
                 if i < (len(tokens) - 1) and tokens[i].type != TokenType.CLOSING_PARENTHESIS: i += 1
 
-            # Create function object
-            if func_type == "SUMA":
-                return Suma(arguments), i
-            elif func_type == "MAX":
-                return Max(arguments), i
-            elif func_type == "MIN":
-                return Min(arguments), i
-            elif func_type == "PROMEDIO":
-                return Promedio(arguments), i
-
-        # Convert tokens to FormulaComponent objects
+            return ("function", func_type, tuple(arguments)), i
+
+        # Convert tokens to template nodes
         i = 0
-        components = []
+        nodes = []
         while i < len(tokens):
             if tokens[i].type == TokenType.NUMBER:
-                components.append(NumericalValue(float(tokens[i].value)))
+                nodes.append(("number", NumericalValue(float(tokens[i].value))))
             elif tokens[i].type == TokenType.OPERATOR:
-                components.append(Operator(tokens[i].value))
+                nodes.append(("operator", tokens[i].value))
             elif tokens[i].type == TokenType.OPENING_PARENTHESIS:
-                components.append(Parenthesis(opens=True))
+                nodes.append(("parenthesis", True))
             elif tokens[i].type == TokenType.CLOSING_PARENTHESIS:
-                components.append(Parenthesis(opens=False))
+                nodes.append(("parenthesis", False))
             elif tokens[i].type == TokenType.CELL_IDENTIFIER:
-                cell = self.spreadsheet.get_cell(CellIdentifier(tokens[i].value))
-                if cell is not None:
-                    components.append(cell)
-                else:  # if it doesn't exist, create it. Dependency manager will take care of the rest
-                    self.spreadsheet.add_cell(Cell(CellIdentifier(tokens[i].value), NumericalContent(NumericalValue(None))))
-                    components.append(self.spreadsheet.get_cell(CellIdentifier(tokens[i].value)))
+                nodes.append(cell_node(tokens[i]))
             elif tokens[i].type == TokenType.COLON:
-                start_cell_id = components.pop(-1)
-                end_cell_id = self.spreadsheet.get_cell(CellIdentifier(tokens[i + 1].value))
-                i += 1
-                if isinstance(start_cell_id, CellIdentifier) and isinstance(end_cell_id, CellIdentifier):
-                    components.append(Range(start_cell_id, end_cell_id, self.spreadsheet))
-                else:
-                    raise ContentException("The start and end of the range must be cells.")
+                raise ContentException("The start and end of the range must be cells.")
             elif tokens[i].type == TokenType.FUNCTION:
                 func, i = create_function(tokens, i)
-                components.append(func)
+                nodes.append(func)
             else:
                 raise ContentException("Invalid expression.")
             i += 1
 
-        return components
+        return tuple(nodes)
 
     def generate_expression(self, formula_cell: Cell):
         """
-        This method generates the expression from the formula.
+        This method builds the program of the formula and checks that it does not introduce a circular
+        dependency. If it does, the dependencies of the formula are removed before raising the
+        CircularDependencyException, so the caller can restore the previous content of the cell.
 
         Keyword arguments:
-        formula -- the formula to be evaluated (str)
-        return -- the list of tokens (list)
+        formula_cell -- the cell that contains the formula (Cell)
+        """
+        identifier = formula_cell.identifier
+        was_formula = identifier in self.dependency_manager.order
+        self.build_expression(formula_cell)
+        try:
+            self.dependency_manager.detect_circular_dependencies(formula_cell)
+        except CircularDependencyException:
+            self.dependency_manager.remove_dependencies(identifier, formula_cell.content.program)
+            if not was_formula:
+                self.dependency_manager.remove_formula_node(identifier)
+            raise
+
+    def build_expression(self, formula_cell: Cell, parsed: tuple = None):
+        """
+        This method gives the formula the program of its shape and records its dependencies.
+        It does not check for circular dependencies, so it can be used to build many formulas before
+        checking the whole dependency graph once. A formula that already has a program, such as a
+        previous content being restored, keeps it. If the formula can not be parsed it is left without
+        a program and without dependencies, and the exception is raised.
+
+        Keyword arguments:
+        formula_cell -- the cell that contains the formula (Cell)
+        parsed -- the shape and the template of the formula, if it has already been parsed, for example
+                  by another process while loading a file (tuple)
+        """
+        identifier = formula_cell.identifier
+        content = formula_cell.content
+        program = content.program
+        if program is None or parsed is not None:
+            content.program = None
+            program = self.parse_formula(content.textual_representation, identifier.row_number,
+                                         identifier.column_number, parsed)
+            content.program = program
+        self.dependency_manager.add_dependencies(identifier, program)
+
+    def parse_template(self, formula_string: str, row: int, column: int) -> tuple:
+        """
+        This method parses a formula into its shape and its template, without binding it to any cell.
+        The parse cache maps the relative form of every formula (its text normalized to R1C1
+        references) to itself and its template. Formulas with the same relative form, such as the same text
+        set again or filled-down copies, have the same tokens up to their references, so once one
+        of them has been parsed and converted the others are only tokenized.
+
+        Keyword arguments:
+        formula_string -- the formula, without the equal sign (str)
+        row -- the row of the cell that holds the formula (int)
+        column -- the column of the cell that holds the formula, starting at 0 (int)
+        return -- the shape and the template of the formula (tuple)
+        """
+        tokens = list(self.tokenizer.tokenize(formula_string))
+        shape = self.tokenizer.relative_form(tokens, row, column)
+        entry = self.parse_cache.get(shape)
+        if entry is None:
+            entry = (shape, self.build_template(self.parser.parse(tokens), row, column))
+            self.parse_cache.put(shape, entry)
+        return entry  # The cached string is shared by every formula with the same relative form
+
+    def template_of(self, formula_cell: Cell) -> tuple:
+        """
+        This method returns the template of a formula whose program has already been built.
+
+        Keyword arguments:
+        formula_cell -- the cell that contains the formula (Cell)
+        return -- the template (tuple of nodes)
+        """
+        return formula_cell.content.program.template
+
+    def parse_formula(self, formula_string: str, row: int, column: int, parsed: tuple = None) -> FormulaProgram:
+        """
+        This method parses a formula and returns the program of its shape.
+        A formula parsed elsewhere is only looked up, in the parse cache so every formula with the
+        same relative form keeps sharing one string and one template, and then in the programs.
+
+        Keyword arguments:
+        formula_string -- the formula, without the equal sign (str)
+        row -- the row of the cell that holds the formula (int)
+        column -- the column of the cell that holds the formula, starting at 0 (int)
+        parsed -- the shape and the template of the formula, if it has already been parsed (tuple)
+        return -- the program of the shape of the formula (FormulaProgram)
         """
+        if parsed is None:
+            shape, template = self.parse_template(formula_string, row, column)
+        else:
+            entry = self.parse_cache.get(parsed[0])
+            if entry is None:
+                entry = parsed
+                self.parse_cache.put(parsed[0], entry)
+            shape, template = entry
+        program = self.programs.get(shape)
+        if program is None:
+            program = self.programs[shape] = self.compile_program(shape, template)
+        return program
 
-        tokens = list(self.tokenizer.tokenize(formula_cell.content.textual_representation))
-        tokens = self.parser.parse(tokens)
-        expression = self.convert_to_formula_components(tokens)
-        self.dependency_manager.remove_old_dependencies(formula_cell)
-        formula_cell.depends_on = self.dependency_manager.get_dependencies(expression)
-        self.dependency_manager.update_depends_on_me_lists(formula_cell.identifier, formula_cell.depends_on)
-        self.dependency_manager.detect_circular_dependencies(formula_cell.identifier, formula_cell)
-        formula_cell.content.expression = expression
+    def compile_program(self, shape: str, template: tuple) -> FormulaProgram:
+        """
+        This method compiles the program of a shape, which reads its references from the spreadsheet.
+
+        Keyword arguments:
+        shape -- the shape (str)
+        template -- the template of the shape (tuple of nodes)
+        return -- the program (FormulaProgram)
+        """
+        return FormulaProgram(shape, template, self.compiler.compile_template(template, self.reader))
+
+    def remove_dependencies(self, identifier: CellIdentifier, content):
+        """
+        This method removes the dependencies of the content of a cell, before it is replaced.
+        Only the formulas that have a program have dependencies.
+
+        Keyword arguments:
+        identifier -- the identifier of the cell (CellIdentifier)
+        content -- the content of the cell, or None if it does not exist (Content)
+        """
+        if isinstance(content, Formula) and content.program is not None:
+            self.dependency_manager.remove_dependencies(identifier, content.program)
+
+    def remove_expression(self, cell: Cell):
+        """
+        This method removes a cell whose content is no longer a formula from the topological order.
+        Its dependencies must have been removed with remove_dependencies.
+
+        Keyword arguments:
+        cell -- the cell that no longer contains a formula (Cell)
+        """
+        self.dependency_manager.remove_formula_node(cell.identifier)
+
+    def recalculate(self, changed_cell: Cell):
+        """
+        This method recalculates a changed cell and every formula that transitively depends on it.
+        Each affected formula is evaluated once, after all the formulas it depends on.
+        In lazy mode they are only marked as dirty.
+
+        Keyword arguments:
+        changed_cell -- the cell whose content has changed (Cell)
+        """
+        self.recalculation_engine.mark_dirty(changed_cell.identifier)
+        if not self.lazy:
+            self.recalculation_engine.recalculate()
+
+    def add_formulas(self, formula_cells: list):
+        """
+        This method checks once that a group of formulas, whose expressions have already been built
+        with build_expression, do not introduce any circular dependency, and adds them to the topological
+        order. Every new circular dependency goes through one of them, so the graph is only searched
+        from them. If there is one, the CircularDependencyException is raised and the order is left
+        untouched.
+        The formulas are taken out of the order and inserted again one by one, because inserting the
+        edges of a formula only keeps the order valid if every other edge already agrees with it.
+
+        Keyword arguments:
+        formula_cells -- the cells of the formulas (list of Cells)
+        """
+        dependency_manager = self.dependency_manager
+        cycles = dependency_manager.find_circular_dependencies(cell.identifier for cell in formula_cells)
+        if cycles:
+            coordinates = ", ".join(identifier.coordinate for identifier in cycles[0])
+            raise CircularDependencyException("Circular dependency detected: " + coordinates + ".")
+        for cell in formula_cells:
+            dependency_manager.remove_formula_node(cell.identifier)
+        for cell in formula_cells:  # The graph has no cycles, so every edge fits in the order
+            dependency_manager.detect_circular_dependencies(cell)
+
+    def recalculate_cells(self, changed_cells: list):
+        """
+        This method recalculates a group of changed cells and every formula that transitively depends
+        on any of them, evaluating each affected formula once. In lazy mode they are only marked as dirty.
+
+        Keyword arguments:
+        changed_cells -- the cells whose contents have changed (list of Cells)
+        """
+        for cell in changed_cells:
+            self.recalculation_engine.mark_dirty(cell.identifier)
+        if not self.lazy:
+            self.recalculation_engine.recalculate()
+
+    def evaluate_pending(self, identifiers=None):
+        """
+        This method evaluates the formulas left dirty in lazy mode. Every formula is evaluated once and
+        its value is kept until one of its inputs changes.
+
+        Keyword arguments:
+        identifiers -- the identifiers of the cells about to be read, so only the formulas they need are
+                       evaluated, or None to evaluate every dirty formula (iterable of CellIdentifiers)
+        """
+        if not self.recalculation_engine.dirty:
+            return
+        if identifiers is None:
+            self.recalculation_engine.recalculate()
+        else:
+            self.recalculation_engine.recalculate_needed(identifiers)
+
+    def recalculate_all(self):
+        """
+        This method evaluates every formula of the spreadsheet once, in topological order.
+        """
+        formulas = [cell.identifier for cell in self.spreadsheet.get_formula_cells()]
+        self.recalculation_engine.mark_all_dirty(formulas)
+        self.recalculation_engine.recalculate()
 
     @abc.abstractmethod
     def evaluate_expression(self, formula: Cell):
@@ -170,6 +413,17 @@ class FormulaEvaluator(abc.ABC):
         """
         pass
 
+    def evaluate_expressions(self, formulas: list):
+        """
+        This method evaluates formulas that do not depend on each other.
+        The subclasses that can evaluate many formulas at once override it.
+
+        Keyword arguments:
+        formulas -- the formula cells to be evaluated (list of Cells)
+        """
+        for formula in formulas:
+            self.evaluate_expression(formula)
+
 
 class FormulaEvaluatorPostfix(FormulaEvaluator):
     """
@@ -177,7 +431,19 @@ class FormulaEvaluatorPostfix(FormulaEvaluator):
     """
 
     def __init__(self,  spreadsheet: Spreadsheet) -> None:
+        """
+        This method initializes the postfix formula evaluator.
+
+        Attributes:
+        parallel_evaluator -- the evaluator of the expensive levels in worker processes, or None to
+                              evaluate every level in this process (ParallelLevelEvaluator)
+        _vector_programs -- the vectorized program of every shape evaluated in a run and the offsets
+                            of the cells it references, or None if the shape cannot be vectorized
+                            (dict of str -> tuple (callable, tuple of tuples (int, int)))
+        """
         super().__init__(spreadsheet)
+        self.parallel_evaluator = None
+        self._vector_programs = {}
 
     def evaluate_expression(self, formula: Cell):
         """
@@ -188,27 +454,98 @@ class FormulaEvaluatorPostfix(FormulaEvaluator):
         return -- the result of the evaluation (float)
         """
 
-        postfix = self.shunting_yard.generate_postfix_expression(formula.content.expression)
-        formula.content.value = NumericalValue(self.shunting_yard.evaluate_postfix_expression(postfix))
-        pass
+        content = formula.content
+        if content.program is None:  # The formula could not be parsed
+            raise ValueError("The formula is not valid.")
+        identifier = formula.identifier
+        content.value = NumericalValue(content.program.evaluate(identifier.row_number, identifier.column_number))
+        self.spreadsheet.update_cell_value(formula)
 
+    def evaluate_expressions(self, formulas: list):
+        """
+        This method evaluates formulas that do not depend on each other.
+        The formulas are grouped in runs by shape, that is, by their relative form, so filled-down
+        formulas such as =A2*B2, =A3*B3, ... form one run. In every run of arithmetic formulas the
+        cells referenced are read a whole column at a time and every operation is applied to whole
+        columns of values, and the rest of the formulas are evaluated one by one.
+        If there is a parallel evaluator, the levels expensive enough are evaluated by its workers instead.
+
+        Keyword arguments:
+        formulas -- the formula cells to be evaluated (list of Cells)
+        """
+        if self.parallel_evaluator is not None:
+            formulas = self.parallel_evaluator.evaluate(formulas, self.template_of, self.spreadsheet)
+        runs = {}
+        for formula in formulas:
+            shape = formula.content.shape
+            if shape is None:
+                self.evaluate_expression(formula)
+            else:
+                runs.setdefault(shape, []).append(formula)
+        for shape, run in runs.items():
+            program = self._vector_program(shape, run[0]) if len(run) >= _MIN_RUN_LENGTH else None
+            if program is None:
+                for formula in run:
+                    self.evaluate_expression(formula)
+            else:
+                self._evaluate_run(*program, run)
+
+    def _vector_program(self, shape: str, formula: Cell):
+        """
+        This method returns the vectorized program of a shape, compiling it from the template of one
+        of its formulas the first time.
+
+        Keyword arguments:
+        shape -- the shape (str)
+        formula -- a formula cell with that shape (Cell)
+        return -- the vectorized program and the offsets of the cells referenced by the shape
+                  (tuple (callable, tuple of tuples (int, int))) or None if the shape cannot be vectorized
+        """
+        if shape not in self._vector_programs:
+            program = formula.content.program
+            vectorized = self.compiler.compile_vectorized(program.template)
+            self._vector_programs[shape] = (vectorized, program.cell_offsets) if vectorized is not None else None
+        return self._vector_programs[shape]
+
+    def _evaluate_run(self, program, offsets: tuple, run: list):
+        """
+        This method evaluates a run of formulas with the same shape with its vectorized program.
+        The formulas of the run are grouped by column, and for every group the n-th cell referenced
+        by the formulas is read as a whole column from the spreadsheet and fills the n-th slot of the program.
+
+        Keyword arguments:
+        program -- the vectorized program of the shape (callable)
+        offsets -- the offsets of the cells referenced by the shape (tuple of tuples (int, int))
+        run -- the formula cells (list of Cells)
+        """
+        by_column = {}
+        for formula in run:
+            by_column.setdefault(formula.identifier.column_number, []).append(formula)
+        for column, formulas in by_column.items():
+            formulas.sort(key=lambda formula: formula.identifier.row_number)
+            rows = [formula.identifier.row_number for formula in formulas]
+            columns = [self.spreadsheet.get_operands_at([row + row_offset for row in rows], column + column_offset)
+                       for row_offset, column_offset in offsets]
+            for formula, result in zip(formulas, program(columns)):
+                formula.content.value = NumericalValue(result)
+                self.spreadsheet.update_cell_value(formula)
 
 if __name__ == "__main__":
     # Test generate_postfix_expression()
     s = Spreadsheet()
     fe = FormulaEvaluatorPostfix(s)
-    s.add_cell("B1", "5")
-    s.add_cell("B2", "3")
+    s.set_content(CellIdentifier("B1"), Content.create_content("5"))
+    s.set_content(CellIdentifier("B2"), Content.create_content("3"))
 
-    s.add_cell("D2", "=4-B2")
+    s.set_content(CellIdentifier("D2"), Content.create_content("=4-B2"))
     fe.generate_expression(s.get_cell(CellIdentifier("D2")))
     fe.evaluate_expression(s.get_cell(CellIdentifier("D2")))
 
-    s.add_cell("A1","=(B1*D2+3*2)-MAX(4;MIN(B1:C2))")
+    s.set_content(CellIdentifier("A1"), Content.create_content("=(B1*D2+3*2)-MAX(4;MIN(B1:C2))"))
     fe.generate_expression(s.get_cell(CellIdentifier("A1")))
     fe.evaluate_expression(s.get_cell(CellIdentifier("A1")))
 
-    s.add_cell("D3","=A1")
+    s.set_content(CellIdentifier("D3"), Content.create_content("=A1"))
     fe.generate_expression(s.get_cell(CellIdentifier("D3")))
     fe.evaluate_expression(s.get_cell(CellIdentifier("D3")))
 
@@ -1,14 +1,48 @@
 """
 This file contains the operator class.
 """
+import operator
 from domain.entities.formula_component import FormulaComponent
 
 
+def _divide(left_operand, right_operand):
+    """
+    This function divides two operands. Dividing by zero returns 0.
+    """
+    if right_operand == 0:
+        return 0
+    return left_operand / right_operand
+
+
+_OPERATIONS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": _divide,
+}
+
+
 class Operator(FormulaComponent):
     """
     This is a concrete implementation of the FormulaComponent class.
     This class represents an operator.
+    Operators are immutable, so every valid operator type has a single shared instance.
     """
+    __slots__ = ("_type",)
+
+    _instances = {}  # The shared instance of every valid operator type
+
+    def __new__(cls, operator_type: str):
+        """
+        This method returns the shared operator of a type, creating it the first time.
+        Invalid types are not shared, they fail when the operator is used.
+        """
+        if operator_type not in _OPERATIONS:
+            return super().__new__(cls)
+        instance = cls._instances.get(operator_type)
+        if instance is None:
+            instance = cls._instances[operator_type] = super().__new__(cls)
+        return instance
 
     def __init__(self, operator_type: str):
         """
@@ -18,7 +52,17 @@ class Operator(FormulaComponent):
         type -- the type of the operator (str)
         """
         self._type = operator_type
-        
+
+    @property
+    def operation(self):
+        """
+        Getter for the function that computes the operator without the checks of compute.
+        The empty operands (None) must be handled by the caller.
+        """
+        if self._type not in _OPERATIONS:
+            raise ValueError("The operator is not valid.")
+        return _OPERATIONS[self._type]
+
     def compute(self, left_operand, right_operand):
         """
         This method computes the value of the operator.
@@ -4,13 +4,24 @@ This file contains the function class.
 from domain.entities.argument import Argument
 from domain.entities.operand import Operand
 from domain.entities.value import NumericalValue
+from domain.utils.aggregate_index import combine_aggregates
 import abc
 
 
 class Function(Argument, Operand, abc.ABC):
     """
     This is an abstract class that represents a function.
+    A function can be shared by many formulas, so during a recalculation epoch its result is computed
+    once and kept until the epoch ends. Every formula that reads it is evaluated after all the formulas
+    it reads, so its inputs do not change within the epoch. Outside an epoch it is always computed.
+    The compiled formulas do not create Function objects: they aggregate the arguments themselves,
+    apply the result of the function class to them and share the results through evaluate_shared.
     """
+    __slots__ = ("_arguments", "_epoch", "_result", "__weakref__")
+    _current_epoch = None  # The number of the recalculation epoch in progress, or None
+    _epochs = 0  # The number of recalculation epochs started
+    _shared_results = {}  # The result of every shared function computed in the epoch, by its absolute form
+
     @abc.abstractmethod
     def __init__(self, arguments: list):
         """
@@ -18,8 +29,53 @@ class Function(Argument, Operand, abc.ABC):
 
         Keyword arguments:
         arguments -- the arguments of the function (list)
+
+        Attributes:
+        _arguments -- the arguments of the function (list)
+        _epoch -- the recalculation epoch in which the result was computed, or None (int)
+        _result -- the result computed in that epoch (float)
         """
         self._arguments = arguments
+        self._epoch = None
+        self._result = None
+
+    @staticmethod
+    def start_epoch() -> None:
+        """
+        This method starts a recalculation epoch. The results computed before are not used any more.
+        """
+        Function._epochs += 1
+        Function._current_epoch = Function._epochs
+        Function._shared_results.clear()
+
+    @staticmethod
+    def end_epoch() -> None:
+        """
+        This method ends the recalculation epoch, since the inputs of the functions may change after it.
+        """
+        Function._current_epoch = None
+        Function._shared_results.clear()
+
+    @staticmethod
+    def evaluate_shared(key, compute, *arguments):
+        """
+        This method returns the result of a function that many formulas may read, such as the
+        SUMA(A1:A50000) of many formulas, computing it at most once per recalculation epoch.
+        Outside an epoch it is always computed.
+
+        Keyword arguments:
+        key -- the absolute form of the function, the same in every formula that reads it (hashable)
+        compute -- the function that computes the result (callable)
+        arguments -- the arguments of compute, such as the position of the formula being evaluated
+        return -- the result of the function (float) or None if it has no values
+        """
+        if Function._current_epoch is None:
+            return compute(*arguments)
+        results = Function._shared_results
+        if key in results:
+            return results[key]
+        result = results[key] = compute(*arguments)
+        return result
 
     @property
     def arguments(self):
@@ -41,12 +97,55 @@ class Function(Argument, Operand, abc.ABC):
             values = values + argument.get_values_as_argument()  # List concatenation
         return values
     
+    def obtain_aggregate_from_arguments(self):
+        """
+        This method obtains the sum, the number, the minimum and the maximum of the values of the arguments,
+        without building the list of values.
+
+        Keyword arguments:
+        return -- the sum, the number of values, the minimum and the maximum (tuple)
+        """
+        aggregate = (0, 0, float("inf"), float("-inf"))
+        for argument in self._arguments:
+            aggregate = combine_aggregates(aggregate, argument.get_aggregate_as_argument())
+        return aggregate
+
+    @staticmethod
     @abc.abstractmethod
+    def result(aggregate: tuple):
+        """
+        This method computes the function from the aggregate of the values of its arguments.
+
+        Keyword arguments:
+        aggregate -- the sum, the number of values, the minimum and the maximum (tuple)
+        return -- the result of the function (float) or None if it has no values
+        """
+        pass
+
     def compute(self):
         """
         This method computes the function.
+
+        Keyword arguments:
+        return -- the result of the function (float) or None if it has no values
         """
-        pass
+        return self.result(self.obtain_aggregate_from_arguments())
+
+    def evaluate(self):
+        """
+        This method returns the result of the function, computing it at most once per recalculation epoch.
+
+        Keyword arguments:
+        return -- the result of the function (float) or None if it has no values
+        """
+        epoch = Function._current_epoch
+        if epoch is not None and self._epoch == epoch:
+            return self._result
+        result = self.compute()
+        if epoch is not None:
+            self._epoch = epoch
+            self._result = result
+        return result
 
     def get_value_as_operand(self):  # TODO: As operand??
         """
@@ -55,10 +154,7 @@ class Function(Argument, Operand, abc.ABC):
         Keyword arguments:
         return -- the value of the function (Value)??
         """
-        output = self.compute()
-        if output is None:
-            return None
-        return output
+        return self.evaluate()
 
     def get_values_as_argument(self):
         """
@@ -67,10 +163,10 @@ class Function(Argument, Operand, abc.ABC):
         Keyword arguments:
         return -- the values of the function (list)
         """
-        output = self.compute()
+        output = self.evaluate()
         if output is None:
             return []
-        return [self.compute()]
+        return [output]
 
 
 class Max(Function):  # TODO: REVISAR Argument and get_values_as_argument??
@@ -80,6 +176,8 @@ class Max(Function):  # TODO: REVISAR Argument and get_values_as_argument??
     get_values_as_argument method.
     It represents the Max function.
     """
+    __slots__ = ()
+
     def __init__(self, arguments: list):
         """
         This method initializes the function.
@@ -89,21 +187,18 @@ class Max(Function):  # TODO: REVISAR Argument and get_values_as_argument??
         """
         super().__init__(arguments)
     
-    def compute(self):
+    @staticmethod
+    def result(aggregate: tuple):
         """
-        This method computes the function Max.
+        This method computes the function Max from the aggregate of the values of its arguments.
 
         Keyword arguments:
+        aggregate -- the sum, the number of values, the minimum and the maximum (tuple)
         return -- the maximum value of the arguments (float)
         """
-
-        values = self.obtain_values_from_arguments()
-        if len(values) == 0:
+        _, count, _, max_value = aggregate
+        if count == 0:
             return None
-        max_value = values[0]
-        for argument in values:
-            if argument > max_value:
-                max_value = argument
         return max_value
 
 
@@ -114,6 +209,8 @@ class Min(Function):
     get_values_as_argument method.
     It represents the Min function.
     """
+    __slots__ = ()
+
     def __init__(self, arguments: list):
         """
         This method initializes the function.
@@ -123,20 +220,18 @@ class Min(Function):
         """
         super().__init__(arguments)
     
-    def compute(self):
+    @staticmethod
+    def result(aggregate: tuple):
         """
-        This method computes the function Min.
+        This method computes the function Min from the aggregate of the values of its arguments.
 
         Keyword arguments:
+        aggregate -- the sum, the number of values, the minimum and the maximum (tuple)
         return -- the minimum value of the arguments (float)
         """
-        values = self.obtain_values_from_arguments()
-        if len(values) == 0:
+        _, count, min_value, _ = aggregate
+        if count == 0:
             return None
-        min_value = values[0]
-        for argument in values:
-            if argument < min_value:
-                min_value = argument
         return min_value
 
 
@@ -147,6 +242,8 @@ class Suma(Function):
     get_values_as_argument method.
     It represents the Suma function.
     """
+    __slots__ = ()
+
     def __init__(self, arguments: list):
         """
         This method initializes the function.
@@ -156,19 +253,18 @@ class Suma(Function):
         """
         super().__init__(arguments)
 
-    def compute(self):
+    @staticmethod
+    def result(aggregate: tuple):
         """
-        This method computes the function Suma.
+        This method computes the function Suma from the aggregate of the values of its arguments.
 
         Keyword arguments:
+        aggregate -- the sum, the number of values, the minimum and the maximum (tuple)
         return -- the sum of the arguments (float)
         """
-        suma = 0
-        values = self.obtain_values_from_arguments()
-        if len(values) == 0:
+        suma, count, _, _ = aggregate
+        if count == 0:
             return None
-        for argument in values:
-            suma = suma + argument
         return suma
 
 
@@ -179,26 +275,27 @@ class Promedio(Function):
     get_values_as_argument method.
     It represents the Promedio function.
     """
+    __slots__ = ()
+
     def __init__(self, arguments: list):
         """
         This method initializes the function.
         """
         super().__init__(arguments)
 
-    def compute(self):
+    @staticmethod
+    def result(aggregate: tuple):
         """
-        This method computes the function Promedio.
+        This method computes the function Promedio from the aggregate of the values of its arguments.
         
         Keyword arguments:
+        aggregate -- the sum, the number of values, the minimum and the maximum (tuple)
         return -- the average of the arguments (float)
         """
-        suma = 0
-        values = self.obtain_values_from_arguments()
-        if len(values) == 0:
+        suma, count, _, _ = aggregate
+        if count == 0:
             return None
-        for argument in values:
-            suma = suma + argument
-        return suma/len(values)
+        return suma/count
 
 
 if __name__ == "__main__":
@@ -10,6 +10,7 @@ class Operand(FormulaComponent):
     This class is an interface for the arguments.
     The method must be implemented in the subclasses.
     """
+    __slots__ = ()
 
     @abc.abstractmethod
     def get_value_as_operand(self):
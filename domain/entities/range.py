@@ -5,10 +5,6 @@ This file contains the Range class.
 from domain.entities.argument import Argument
 from domain.entities.cell import CellIdentifier
 from domain.entities.spreadsheet import Spreadsheet
-from domain.entities.cell import Cell
-from domain.entities.content import NumericalContent
-from domain.entities.value import NumericalValue
-from domain.utils.utils import base26_to_int, int_to_base26
 
 class Range(Argument):
     """
@@ -16,6 +12,8 @@ class Range(Argument):
     It inherits from the Argument interface to obtain the
     get_values_as_argument method.
     """
+    __slots__ = ("_start", "_end", "_spreadsheet")
+
     def __init__(self, start: CellIdentifier, end: CellIdentifier, spreadsheet: Spreadsheet):
         """
         This method initializes the range.
@@ -31,24 +29,43 @@ class Range(Argument):
             raise ValueError("The end must be a CellIdentifier.")
         self._start = start
         self._end = end
-        self._cells = self.obtain_cells(spreadsheet)
+        self._spreadsheet = spreadsheet
+
+    @property
+    def start(self):
+        """
+        Getter for the start of the range.
+        """
+        return self._start
+
+    @property
+    def end(self):
+        """
+        Getter for the end of the range.
+        """
+        return self._end
+
+    @property
+    def bounds(self) -> tuple:
+        """
+        Getter for the bounds of the range as integers, inclusive.
+        Rows start at 1 and columns at 0, as in CellIdentifier.
+
+        return -- the bounds (tuple (start_row, start_column, end_row, end_column))
+        """
+        return (self._start.row_number, self._start.column_number,
+                self._end.row_number, self._end.column_number)
 
     def obtain_cells(self, spreadsheet: Spreadsheet):
         """
-        This method obtains the cells of the range from the spreadsheet.
+        This method obtains the existing cells of the range from the spreadsheet, in row-major order.
+        Empty cells are skipped instead of being created.
 
         Keyword arguments:
         spreadsheet -- the spreadsheet (Spreadsheet)
         return -- the cells of the range (list)
         """
-        cells = []
-        cell_ids = self.obtain_all_cell_ids()
-        for cell_id in cell_ids:
-            if spreadsheet.get_cell(cell_id) is not None:
-                cells.append(spreadsheet.get_cell(cell_id))
-            else:
-                cells.append(Cell(cell_id, NumericalContent(NumericalValue(None))))
-        return cells  # TODO: revisar
+        return [spreadsheet.get_cell(identifier) for identifier in spreadsheet.get_identifiers(*self.bounds)]
 
     def obtain_all_cell_ids(self) -> list:
         """
@@ -57,41 +74,25 @@ class Range(Argument):
         Keyword arguments:
         return -- the cell identifiers (list)
         """
-        cell_ids = []
-        columns = self.__generate_column_range(self._start.column, self._end.column)
-        for column in columns:
-            for row in range(int(self._start.row), int(self._end.row) + 1):
-                cell_ids.append(CellIdentifier(str(column) + str(row)))
-        return cell_ids
+        start_row, start_column, end_row, end_column = self.bounds
+        return [CellIdentifier.at(row, column)
+                for column in range(start_column, end_column + 1)
+                for row in range(start_row, end_row + 1)]
 
-    @staticmethod
-    def __generate_column_range(start_column, end_column):
-        """
-        This function returns a list of the columns in between the start and end columns.
-
-        Keyword arguments:
-        start_column -- the start column (str)
-        end_column -- the end column (str)
-        return -- the list of columns (list)
-        """
-        # Convert the start and end strings to integers
-        start_num = base26_to_int(start_column)
-        end_num = base26_to_int(end_column)
-
-        # Generate strings between the start and end integers
-        result = []
-        for i in range(start_num, end_num + 1):
-            result.append(int_to_base26(i))
-        
-        return result
-    
     def get_values_as_argument(self):
         """
         This method returns the values of the cells.
         return -- the values of the cells (list)
         """
-        values = []
-        for cell in self._cells:
-            value = cell.content.value.value
-            if value is not None: values.append(value)
-        return values
+        # The values are read when evaluating, never cached, and without creating Cell objects
+        return self._spreadsheet.get_values(*self.bounds)
+
+    def get_aggregate_as_argument(self) -> tuple:
+        """
+        This method returns the aggregates of the numbers of the range from the aggregate index
+        of the spreadsheet, in O(log n) per column instead of reading every cell.
+
+        Keyword arguments:
+        return -- the sum, the number of numbers, the minimum and the maximum (tuple)
+        """
+        return self._spreadsheet.aggregate_index.query(*self.bounds)
@@ -3,6 +3,12 @@ This file contains the spreadsheet class.
 """
 
 from domain.entities.cell import Cell, CellIdentifier
+from domain.entities.content import Content, Formula
+from domain.utils.aggregate_index import AggregateIndex
+from domain.utils.cell_storage import CellStorage, ColumnarCellStorage
+
+_EMPTY_AGGREGATE = (0, 0, float("inf"), float("-inf"))  # The aggregate of no values
+_PLAIN_OPERAND_TYPES = frozenset((float, type(None)))  # The contents that are already operands
 
 
 class Spreadsheet:
@@ -10,21 +16,46 @@ class Spreadsheet:
     This class represents a spreadsheet.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, storage: CellStorage = None) -> None:
         """
         This method initializes the spreadsheet.
 
+        Keyword arguments:
+        storage -- where the cells are kept, a ColumnarCellStorage by default (CellStorage)
+
         Attributes:
-        _cells -- the cells of the spreadsheet (dict)
+        _cells -- the cells of the spreadsheet (CellStorage)
+        _aggregate_index -- the aggregates of the columns read by ranges (AggregateIndex)
+        _edited_rows -- the rows whose contents have changed since start_tracking_edits was called,
+                        or None if they are not tracked (set of ints)
         """
-        self._cells = {}
+        if storage is None:
+            storage = ColumnarCellStorage()
+        if not isinstance(storage, CellStorage):
+            raise ValueError("The storage must be a CellStorage.")
+        self._cells = storage
+        self._aggregate_index = AggregateIndex(self.get_column_numbers, self.get_values)
+        self._edited_rows = None
 
     def __iter__(self):
         """
-        This method returns an iterator of the spreadsheet.
+        This method returns an iterator of the identifiers of the cells of the spreadsheet in row-major order.
         """
         return iter(self._cells)
 
+    def __len__(self) -> int:
+        """
+        This method returns the number of cells of the spreadsheet.
+        """
+        return len(self._cells)
+
+    @property
+    def aggregate_index(self):
+        """
+        Getter for the aggregate index.
+        """
+        return self._aggregate_index
+
     @property
     def cells(self):  # TODO: is necessary?
         """
@@ -32,6 +63,27 @@ class Spreadsheet:
         """
         return self._cells
 
+    @property
+    def edited_rows(self):
+        """
+        Getter for the rows whose contents have changed since start_tracking_edits was called, or None
+        if they are not tracked.
+        """
+        return self._edited_rows
+
+    def start_tracking_edits(self) -> None:
+        """
+        This method starts tracking the rows whose contents change, from now on.
+        """
+        self._edited_rows = set()
+
+    def _mark_edited(self, identifier: CellIdentifier) -> None:
+        """
+        This method records that the content of a cell has changed, if the edits are tracked.
+        """
+        if self._edited_rows is not None:
+            self._edited_rows.add(identifier.row_number)
+
     def add_cell(self, cell: Cell):
         """
         This method adds a cell to the spreadsheet.
@@ -41,11 +93,160 @@ class Spreadsheet:
         """
         if not isinstance(cell, Cell):
             raise ValueError("The cell must be a Cell.")
-        self._cells[cell.identifier] = cell
+        self._cells.put(cell)
+        self._mark_edited(cell.identifier)
+        self.update_cell_value(cell)
+
+    def replace_content(self, cell: Cell, content):
+        """
+        This method replaces the content of a cell of the spreadsheet.
+
+        Keyword arguments:
+        cell -- the cell (Cell)
+        content -- the new content (Content)
+        """
+        cell.content = content
+        self.set_content(cell.identifier, content)
+
+    def set_content(self, identifier: CellIdentifier, content: Content):
+        """
+        This method stores the content of a cell without creating a Cell object for it, when the
+        storage allows it. If the cell is held only its content is replaced.
+
+        Keyword arguments:
+        identifier -- the identifier of the cell (CellIdentifier)
+        content -- the content (Content)
+        """
+        if not isinstance(identifier, CellIdentifier):
+            raise ValueError("The identifier must be a CellIdentifier.")
+        if not isinstance(content, Content):
+            raise ValueError("The content must be a Content.")
+        self._cells.put_content(identifier, content)
+        self._mark_edited(identifier)
+        value = content.value.value
+        if not isinstance(value, (int, float)):  # Empty and textual cells are not numbers
+            value = None
+        self._aggregate_index.update(identifier.row_number, identifier.column_number, value)
+
+    def set_number(self, identifier: CellIdentifier, value: float):
+        """
+        This method stores a plain number in a cell without creating a Cell object for it, when the
+        storage allows it. If the cell already exists as an object only its content is replaced,
+        so the formulas that hold it keep seeing it.
+
+        Keyword arguments:
+        identifier -- the identifier of the cell (CellIdentifier)
+        value -- the number (float)
+        """
+        if not isinstance(identifier, CellIdentifier):
+            raise ValueError("The identifier must be a CellIdentifier.")
+        if not isinstance(value, (int, float)):
+            raise ValueError("The value must be a number.")
+        self._cells.put_number(identifier, value)
+        self._mark_edited(identifier)
+        self._aggregate_index.update(identifier.row_number, identifier.column_number, value)
+
+    def set_number_column(self, column: int, first_row: int, values, mask: bytearray):
+        """
+        This method stores the plain numbers of some consecutive rows of a column at once, such as the
+        ones read from a snapshot.
+
+        Keyword arguments:
+        column -- the column, starting at 0 (int)
+        first_row -- the row of the first number (int)
+        values -- the numbers, one per row (array of doubles)
+        mask -- whether every row holds a number (bytearray)
+        """
+        self._cells.put_number_column(column, first_row, values, mask)
+        self._aggregate_index.forget_column(column)
+        self._edited_rows = None  # Too many rows to track them one by one
+
+    def get_number_columns(self) -> dict:
+        """
+        This method returns the plain numbers kept without Cell objects, by column, as chunks of
+        consecutive rows: an array of doubles and a byte mask of the rows that hold a number.
+        They must not be changed.
+
+        Keyword arguments:
+        return -- the numbers (dict of column -> dict of first row -> tuple (array of doubles, bytearray))
+        """
+        return self._cells.number_columns()
+
+    def remove_cell(self, identifier: CellIdentifier):
+        """
+        This method removes a cell from the spreadsheet.
+
+        Keyword arguments:
+        identifier -- the identifier of the cell to be removed (CellIdentifier)
+        """
+        if not isinstance(identifier, CellIdentifier):
+            raise ValueError("The identifier must be a CellIdentifier.")
+        if self._cells.remove(identifier):
+            self._mark_edited(identifier)
+            self._aggregate_index.update(identifier.row_number, identifier.column_number, None)
+
+    def update_cell_value(self, cell: Cell):
+        """
+        This method must be called whenever the value of a cell changes, either because its content
+        has been replaced or because its formula has been evaluated, to keep the indexes up to date.
+
+        Keyword arguments:
+        cell -- the cell whose value has changed (Cell)
+        """
+        value = cell.content.value.value
+        if not isinstance(value, (int, float)):  # Empty and textual cells are not numbers
+            value = None
+        self._aggregate_index.update(cell.identifier.row_number, cell.identifier.column_number, value)
+
+    def get_column_numbers(self, column: int) -> dict:
+        """
+        This method returns the numbers of a column.
+
+        Keyword arguments:
+        column -- the column, starting at 0 (int)
+        return -- the numbers of the column (dict of row -> float)
+        """
+        return self._cells.column_numbers(column)
+
+    def get_values(self, start_row: int, start_column: int, end_row: int, end_column: int) -> list:
+        """
+        This method returns the values of the cells inside a rectangle without creating Cell objects.
+        Empty cells are skipped.
+
+        Keyword arguments:
+        start_row, start_column, end_row, end_column -- the bounds of the rectangle, inclusive (int)
+        return -- the values (list)
+        """
+        return self._cells.values_in(start_row, start_column, end_row, end_column)
+
+    def get_identifiers(self, start_row: int, start_column: int, end_row: int, end_column: int):
+        """
+        This method returns the identifiers of the cells inside a rectangle in row-major order.
+        Only the existing cells are visited, so its cost does not depend on the area of the rectangle.
+
+        Keyword arguments:
+        start_row, start_column, end_row, end_column -- the bounds of the rectangle, inclusive (int)
+        return -- the identifiers (list of CellIdentifiers)
+        """
+        return list(self._cells.identifiers_in(start_row, start_column, end_row, end_column))
 
     def get_cell(self, identifier: CellIdentifier) -> Cell:
         """
-        This method returns a cell.
+        This method returns a cell for reading. The cell of a plain number may be a copy, so whoever
+        keeps the cell or changes it must use hold_cell.
+
+        Keyword arguments:
+        identifier -- the identifier of the cell (CellIdentifier)
+        return -- the cell (Cell) or None if the cell does not exist
+        """
+        if not isinstance(identifier, CellIdentifier):
+            raise ValueError("The identifier must be a CellIdentifier.")
+        return self._cells.get(identifier)
+
+    def hold_cell(self, identifier: CellIdentifier) -> Cell:
+        """
+        This method returns a cell as the object kept by the spreadsheet, for callers that keep the
+        cell, such as the formulas that reference it, or change it.
 
         Keyword arguments:
         identifier -- the identifier of the cell (CellIdentifier)
@@ -53,14 +254,127 @@ class Spreadsheet:
         """
         if not isinstance(identifier, CellIdentifier):
             raise ValueError("The identifier must be a CellIdentifier.")
-        if identifier not in self._cells:
-            return None
-        return self._cells[identifier]
+        return self._cells.hold(identifier)
+
+    def get_cell_at(self, row: int, column: int) -> Cell:
+        """
+        This method returns the cell at a position for reading, for loops that work with integer positions.
+
+        Keyword arguments:
+        row -- the row of the cell (int)
+        column -- the column of the cell, starting at 0 (int)
+        return -- the cell (Cell) or None if the cell does not exist
+        """
+        return self._cells.get_at(row, column)
+
+    def get_value_at(self, row: int, column: int):
+        """
+        This method returns the value of the cell at a position without creating a Cell object for it,
+        for loops that work with integer positions.
+
+        Keyword arguments:
+        row -- the row of the cell (int)
+        column -- the column of the cell, starting at 0 (int)
+        return -- the value (float, str) or None if the cell does not exist or is empty
+        """
+        return self._cells.get_value_at(row, column)
+
+    def get_operand_at(self, row: int, column: int):
+        """
+        This method returns the value of the cell at a position as an operand of a formula, without
+        creating any object for it.
+
+        Keyword arguments:
+        row -- the row of the cell (int)
+        column -- the column of the cell, starting at 0 (int)
+        return -- the value (float) or None if the cell does not exist or is empty
+        """
+        content = self._cells.get_content_at(row, column)
+        if content is None or isinstance(content, float):
+            return content
+        return content.get_value_as_operand()
+
+    def get_operands_at(self, rows: list, column: int) -> list:
+        """
+        This method returns the values of the cells of a column at some rows as operands of formulas,
+        reading the column from the storage at once.
+
+        Keyword arguments:
+        rows -- the rows of the cells (list of ints)
+        column -- the column of the cells, starting at 0 (int)
+        return -- the values, in the order of the rows (list of floats or None)
+        """
+        contents = self._cells.get_contents_at(rows, column)
+        if set(map(type, contents)) <= _PLAIN_OPERAND_TYPES:
+            return contents
+        return [content if content is None or isinstance(content, float) else content.get_value_as_operand()
+                for content in contents]
+
+    def get_argument_at(self, row: int, column: int) -> tuple:
+        """
+        This method returns the aggregate of the cell at a position as a single-cell argument of a
+        function, without creating any object for it.
+
+        Keyword arguments:
+        row -- the row of the cell (int)
+        column -- the column of the cell, starting at 0 (int)
+        return -- the sum, the number of values, the minimum and the maximum (tuple)
+        """
+        content = self._cells.get_content_at(row, column)
+        if content is None:
+            return _EMPTY_AGGREGATE
+        values = [content] if isinstance(content, float) else content.get_values_as_argument()
+        if not values:
+            return _EMPTY_AGGREGATE
+        return sum(values), len(values), min(values), max(values)
+
+    def get_content(self, identifier: CellIdentifier):
+        """
+        This method returns the content of a cell without creating a Cell object for it.
+        It is meant for reading: the content of a plain number may be a copy.
+
+        Keyword arguments:
+        identifier -- the identifier of the cell (CellIdentifier)
+        return -- the content (Content) or None if the cell does not exist
+        """
+        if not isinstance(identifier, CellIdentifier):
+            raise ValueError("The identifier must be a CellIdentifier.")
+        return self._cells.get_content(identifier)
+
+    def get_rows(self, start_row: int = 0):
+        """
+        This method returns an iterator of the rows of the spreadsheet in order, each one with the
+        contents of its cells by column. Plain numbers may be given as floats instead of contents, so
+        no object is created for them.
+
+        Keyword arguments:
+        start_row -- the first row (int)
+        return -- the rows (iterator of tuples (row, list of tuples (column, Content or float)))
+        """
+        return self._cells.rows(start_row)
 
     def get_cells(self) -> list:
         """
-        This method returns the cells of the spreadsheet.
+        This method returns the cells of the spreadsheet for reading.
+        A Cell is created for every plain number, so it should be avoided on big spreadsheets.
 
         return -- the cells of the spreadsheet (list)
         """
-        return list(self._cells.values())
+        return [self._cells.get(identifier) for identifier in list(self._cells)]
+
+    def get_object_cells(self) -> list:
+        """
+        This method returns the cells of the spreadsheet that are not plain numbers, that is, every
+        cell but the ones returned by get_number_columns. The cells that are not held may be copies.
+
+        return -- the cells (list)
+        """
+        return self._cells.objects()
+
+    def get_formula_cells(self) -> list:
+        """
+        This method returns the cells of the spreadsheet that contain a formula.
+
+        return -- the formula cells (list)
+        """
+        return [cell for cell in self._cells.objects() if isinstance(cell.content, Formula)]
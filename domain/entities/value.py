@@ -10,7 +10,10 @@ from domain.entities.operand import Operand
 class Value(abc.ABC):
     """
     This is an abstract class that represents a value.
+    Values have no instance dictionary: every class declares its attributes in __slots__.
     """
+    __slots__ = ("_value",)
+
     @abc.abstractmethod
     def __init__(self, value):
         """
@@ -52,6 +55,8 @@ class TextualValue(Value):
     This is a concrete implementation of the Value class.
     It represents a textual value.
     """
+    __slots__ = ()
+
     def __init__(self, value):
         """
         This method initializes the textual value.
@@ -82,8 +87,10 @@ class NumericalValue(Value, Argument, Operand):
     """
     This is a concrete implementation of the Value class.
     It represents a numerical value.
-
+    The empty value is shared by every empty cell, so it can not be changed.
     """
+    __slots__ = ()
+
     def __init__(self, value):
         """
         This method initializes the numerical value.
@@ -92,6 +99,16 @@ class NumericalValue(Value, Argument, Operand):
         value -- the value of the numerical value (number)
         """
         super().__init__(value)
+
+    @staticmethod
+    def empty() -> 'NumericalValue':
+        """
+        This method returns the shared empty numerical value.
+
+        Keyword arguments:
+        return -- the empty value (NumericalValue)
+        """
+        return _EMPTY_NUMERICAL_VALUE
     
     @property
     def value(self):
@@ -107,6 +124,8 @@ class NumericalValue(Value, Argument, Operand):
         """
         if not isinstance(value, (int, float)):
             raise ValueError("The value must be a number.")
+        if self is _EMPTY_NUMERICAL_VALUE:
+            raise ValueError("The empty value is shared and can not be changed.")
         self._value = value
 
     def get_values_as_argument(self):
@@ -136,7 +155,21 @@ class NumericalValue(Value, Argument, Operand):
         """
         if self._value is None:
             return ""
-        if self._value == int(self._value):
-            return str(int(self._value))
+        return self.number_to_string(self._value)
+
+    @staticmethod
+    def number_to_string(number) -> str:
+        """
+        This method writes a number as a string, without decimals if it is a whole number.
+
+        Keyword arguments:
+        number -- the number (float)
+        return -- the number as a string (str)
+        """
+        if float(number).is_integer():
+            return str(int(number))
         else:
-            return str(self._value)
+            return str(number)
+
+
+_EMPTY_NUMERICAL_VALUE = NumericalValue(None)
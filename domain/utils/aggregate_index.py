@@ -0,0 +1,271 @@
+"""
+This file contains the AggregateIndex and ColumnAggregateTree classes.
+"""
+from array import array
+
+_EMPTY_AGGREGATE = (0, 0, float("inf"), float("-inf"))
+_DENSE_ROWS = 4096  # Columns shorter than this always get a tree
+_DENSITY = 8  # Longer columns get a tree only if they have a number every _DENSITY rows on average
+
+
+def combine_aggregates(first: tuple, second: tuple) -> tuple:
+    """
+    This function combines two aggregates (sum, count, minimum, maximum).
+    """
+    return (first[0] + second[0], first[1] + second[1],
+            min(first[2], second[2]), max(first[3], second[3]))
+
+
+def _is_dense(last_row: int, count: int) -> bool:
+    """
+    This function checks if a column is dense enough to get a tree.
+
+    Keyword arguments:
+    last_row -- the last row of the column that holds a number (int)
+    count -- the number of numbers of the column (int)
+    return -- True if the column should get a tree, False otherwise (bool)
+    """
+    return last_row < _DENSE_ROWS or last_row < _DENSITY * count
+
+
+class ColumnAggregateTree:
+    """
+    This class is a segment tree over the rows of one column. It keeps the sum, the number of
+    numbers, the minimum and the maximum of every node, so the aggregates of any interval of rows
+    cost O(log n) and so does updating one row.
+    The sums are recomputed from the children on every update instead of adding differences,
+    so they do not drift with rounding errors like a Fenwick tree of sums would.
+    """
+
+    def __init__(self, values: dict) -> None:
+        """
+        This method initializes the tree.
+
+        Keyword arguments:
+        values -- the numbers of the column (dict of row -> float)
+
+        Attributes:
+        _size -- the number of leaves, a power of two greater than every row (int)
+        _sums, _counts, _minimums, _maximums -- the aggregates of every node (array)
+        """
+        size = 1
+        while size <= max(values, default=0):
+            size *= 2
+        self._allocate(size)
+        for row, value in values.items():
+            self._set_leaf(row, value)
+        for node in range(size - 1, 0, -1):
+            self._pull(node)
+
+    @property
+    def size(self):
+        """
+        Getter for the number of leaves, one more than the last row the tree can hold without growing.
+        """
+        return self._size
+
+    @property
+    def count(self):
+        """
+        Getter for the number of numbers in the tree.
+        """
+        return self._counts[1]
+
+    def _allocate(self, size: int) -> None:
+        """
+        This method allocates empty arrays for a tree with the given number of leaves.
+        """
+        self._size = size
+        self._sums = array('d', bytes(16 * size))
+        self._counts = array('q', bytes(16 * size))
+        self._minimums = array('d', [float("inf")]) * (2 * size)
+        self._maximums = array('d', [float("-inf")]) * (2 * size)
+
+    def _set_leaf(self, row: int, value) -> None:
+        """
+        This method stores the value of a row in its leaf. None empties the leaf.
+        """
+        leaf = self._size + row
+        if value is None:
+            self._sums[leaf] = 0
+            self._counts[leaf] = 0
+            self._minimums[leaf] = float("inf")
+            self._maximums[leaf] = float("-inf")
+        else:
+            self._sums[leaf] = value
+            self._counts[leaf] = 1
+            self._minimums[leaf] = value
+            self._maximums[leaf] = value
+
+    def _pull(self, node: int) -> None:
+        """
+        This method recomputes a node from its two children.
+        """
+        left = 2 * node
+        right = left + 1
+        self._sums[node] = self._sums[left] + self._sums[right]
+        self._counts[node] = self._counts[left] + self._counts[right]
+        self._minimums[node] = min(self._minimums[left], self._minimums[right])
+        self._maximums[node] = max(self._maximums[left], self._maximums[right])
+
+    def _grow(self, row: int) -> None:
+        """
+        This method makes the tree big enough to hold the given row.
+        """
+        values = {leaf: self._sums[self._size + leaf]
+                  for leaf in range(self._size) if self._counts[self._size + leaf]}
+        size = self._size
+        while size <= row:
+            size *= 2
+        self._allocate(size)
+        for leaf, value in values.items():
+            self._set_leaf(leaf, value)
+        for node in range(size - 1, 0, -1):
+            self._pull(node)
+
+    def update(self, row: int, value) -> None:
+        """
+        This method updates the value of a row.
+
+        Keyword arguments:
+        row -- the row (int)
+        value -- the new number of the row, or None if it is empty or not a number (float)
+        """
+        if row >= self._size:
+            if value is None:
+                return
+            self._grow(row)
+        self._set_leaf(row, value)
+        node = (self._size + row) // 2
+        while node:
+            self._pull(node)
+            node //= 2
+
+    def query(self, start_row: int, end_row: int) -> tuple:
+        """
+        This method returns the aggregates of an interval of rows.
+
+        Keyword arguments:
+        start_row -- the first row, inclusive (int)
+        end_row -- the last row, inclusive (int)
+        return -- the sum, the number of numbers, the minimum and the maximum (tuple)
+        """
+        total, count = 0, 0
+        minimum, maximum = float("inf"), float("-inf")
+        left = self._size + max(start_row, 0)
+        right = self._size + min(end_row, self._size - 1) + 1
+        while left < right:
+            if left & 1:
+                total += self._sums[left]
+                count += self._counts[left]
+                minimum = min(minimum, self._minimums[left])
+                maximum = max(maximum, self._maximums[left])
+                left += 1
+            if right & 1:
+                right -= 1
+                total += self._sums[right]
+                count += self._counts[right]
+                minimum = min(minimum, self._minimums[right])
+                maximum = max(maximum, self._maximums[right])
+            left //= 2
+            right //= 2
+        return total, count, minimum, maximum
+
+
+class AggregateIndex:
+    """
+    This class keeps a ColumnAggregateTree for every dense column read by a range. The trees are built
+    the first time a range reads their column, they are shared by all the ranges over that column,
+    and they are kept up to date on every write to a cell of the column.
+    A tree has a leaf for every row up to the last number of its column, so sparse columns, such as
+    a few numbers spread over a million rows, do not get one: their aggregates are computed from the
+    values inside the range, which costs as much as the cells that exist there.
+    """
+
+    def __init__(self, read_column, read_values) -> None:
+        """
+        This method initializes the aggregate index.
+
+        Keyword arguments:
+        read_column -- the function that returns the numbers of a column (callable, int -> dict of row -> float)
+        read_values -- the function that returns the values inside a rectangle (callable, (start_row,
+                       start_column, end_row, end_column) -> list)
+
+        Attributes:
+        _read_column -- the function that returns the numbers of a column (callable)
+        _read_values -- the function that returns the values inside a rectangle (callable)
+        _columns -- the tree of every indexed column, or None for the sparse columns (dict of int -> ColumnAggregateTree)
+        """
+        self._read_column = read_column
+        self._read_values = read_values
+        self._columns = {}
+
+    def update(self, row: int, column: int, value) -> None:
+        """
+        This method updates the value of a cell, if its column is indexed.
+
+        Keyword arguments:
+        row -- the row of the cell (int)
+        column -- the column of the cell (int)
+        value -- the new number of the cell, or None if it is empty or not a number (float)
+        """
+        tree = self._columns.get(column)
+        if tree is None:  # The column is not indexed or it is sparse
+            return
+        if row >= tree.size and value is not None and not _is_dense(row, tree.count + 1):
+            self._columns[column] = None  # Growing the tree would make it sparse
+            return
+        tree.update(row, value)
+
+    def forget_column(self, column: int) -> None:
+        """
+        This method drops what is known about a column after many of its cells have been replaced at
+        once, so it is read again by the next range over it.
+
+        Keyword arguments:
+        column -- the column (int)
+        """
+        self._columns.pop(column, None)
+
+    def query(self, start_row: int, start_column: int, end_row: int, end_column: int) -> tuple:
+        """
+        This method returns the aggregates of the numbers inside a rectangle.
+
+        Keyword arguments:
+        start_row, start_column, end_row, end_column -- the bounds of the rectangle, inclusive (int)
+        return -- the sum, the number of numbers, the minimum and the maximum (tuple)
+        """
+        aggregate = _EMPTY_AGGREGATE
+        sparse_start = None  # The first column of the current run of sparse columns
+        for column in range(start_column, end_column + 2):
+            tree = None
+            if column <= end_column:
+                if column not in self._columns:
+                    numbers = self._read_column(column)
+                    dense = _is_dense(max(numbers, default=0), len(numbers))
+                    self._columns[column] = ColumnAggregateTree(numbers) if dense else None
+                tree = self._columns[column]
+                if tree is None:
+                    if sparse_start is None:
+                        sparse_start = column
+                    continue
+                aggregate = combine_aggregates(aggregate, tree.query(start_row, end_row))
+            if sparse_start is not None:  # The run of sparse columns is read in a single pass
+                aggregate = combine_aggregates(aggregate, self._aggregate_values(start_row, sparse_start,
+                                                                                 end_row, column - 1))
+                sparse_start = None
+        return aggregate
+
+    def _aggregate_values(self, start_row: int, start_column: int, end_row: int, end_column: int) -> tuple:
+        """
+        This method computes the aggregates of the numbers inside a rectangle from their values.
+
+        Keyword arguments:
+        start_row, start_column, end_row, end_column -- the bounds of the rectangle, inclusive (int)
+        return -- the sum, the number of numbers, the minimum and the maximum (tuple)
+        """
+        numbers = [value for value in self._read_values(start_row, start_column, end_row, end_column)
+                   if isinstance(value, (int, float))]
+        if not numbers:
+            return _EMPTY_AGGREGATE
+        return sum(numbers), len(numbers), min(numbers), max(numbers)
@@ -0,0 +1,968 @@
+"""
+This file contains the CellStorage abstract class and its implementations.
+"""
+import abc
+from array import array
+from itertools import compress
+from domain.entities.cell import Cell, CellIdentifier
+from domain.entities.content import Content, NumericalContent, TextualContent
+from domain.entities.value import NumericalValue, TextualValue
+from domain.utils.sparse_grid import SparseGrid
+
+
+class CellStorage(abc.ABC):
+    """
+    This is an abstract class that represents the place where a spreadsheet keeps its cells.
+    Cells handed out by hold are stored objects: changing them changes the spreadsheet. Cells handed
+    out by get are meant for reading, and storages that keep plain numbers apart may give a copy.
+    Every storage keeps the positions of its cells in a SparseGrid, so the cells are iterated in
+    row-major order and the cells inside a rectangle are found without probing the empty positions.
+    """
+
+    def __init__(self) -> None:
+        """
+        This method initializes the storage.
+
+        Attributes:
+        _grid -- the positions of the stored cells (SparseGrid)
+        """
+        self._grid = SparseGrid()
+
+    def __iter__(self):
+        """
+        This method returns an iterator of the identifiers of the stored cells in row-major order.
+        The storage must not be changed while the iterator is being used.
+        """
+        for row, column in self._grid:
+            yield CellIdentifier.at(row, column)
+
+    def __len__(self) -> int:
+        """
+        This method returns the number of stored cells.
+        """
+        return len(self._grid)
+
+    def identifiers_in(self, start_row: int, start_column: int, end_row: int, end_column: int):
+        """
+        This method returns an iterator of the identifiers of the stored cells inside a rectangle,
+        in row-major order. Its cost depends on the stored cells and not on the area of the rectangle.
+        The storage must not be changed while the iterator is being used.
+
+        Keyword arguments:
+        start_row, start_column, end_row, end_column -- the bounds of the rectangle, inclusive (int)
+        return -- the identifiers (iterator of CellIdentifiers)
+        """
+        for row, column in self._grid.positions(start_row, start_column, end_row, end_column):
+            yield CellIdentifier.at(row, column)
+
+    @abc.abstractmethod
+    def get(self, identifier: CellIdentifier):
+        """
+        This method returns a cell for reading.
+
+        Keyword arguments:
+        identifier -- the identifier of the cell (CellIdentifier)
+        return -- the cell (Cell) or None if the cell does not exist
+        """
+        pass
+
+    def hold(self, identifier: CellIdentifier):
+        """
+        This method returns a cell as a stored object, for callers that keep the cell or change it.
+        By default every cell is a stored object.
+
+        Keyword arguments:
+        identifier -- the identifier of the cell (CellIdentifier)
+        return -- the cell (Cell) or None if the cell does not exist
+        """
+        return self.get(identifier)
+
+    @abc.abstractmethod
+    def get_content(self, identifier: CellIdentifier):
+        """
+        This method returns the content of a cell without creating a Cell for it.
+
+        Keyword arguments:
+        identifier -- the identifier of the cell (CellIdentifier)
+        return -- the content (Content) or None if the cell does not exist
+        """
+        pass
+
+    @abc.abstractmethod
+    def put(self, cell: Cell) -> None:
+        """
+        This method stores a cell, replacing the one with the same identifier.
+
+        Keyword arguments:
+        cell -- the cell (Cell)
+        """
+        pass
+
+    def put_content(self, identifier: CellIdentifier, content: Content) -> None:
+        """
+        This method stores the content of a cell. If the cell is held only its content is replaced,
+        so whoever holds the object keeps seeing the cell. By default the cell is stored as a Cell object.
+
+        Keyword arguments:
+        identifier -- the identifier of the cell (CellIdentifier)
+        content -- the content (Content)
+        """
+        cell = self.hold(identifier)
+        if cell is not None:
+            cell.content = content
+        else:
+            self.put(Cell(identifier, content))
+
+    @abc.abstractmethod
+    def put_number(self, identifier: CellIdentifier, value: float) -> None:
+        """
+        This method stores a plain number in a cell. If the cell is stored as an object only its
+        content is replaced, so whoever holds the object keeps seeing the cell.
+
+        Keyword arguments:
+        identifier -- the identifier of the cell (CellIdentifier)
+        value -- the number (float)
+        """
+        pass
+
+    @abc.abstractmethod
+    def remove(self, identifier: CellIdentifier) -> bool:
+        """
+        This method removes a cell.
+
+        Keyword arguments:
+        identifier -- the identifier of the cell (CellIdentifier)
+        return -- True if the cell existed, False otherwise (bool)
+        """
+        pass
+
+    def get_at(self, row: int, column: int):
+        """
+        This method returns the cell at a position.
+
+        Keyword arguments:
+        row -- the row of the cell (int)
+        column -- the column of the cell, starting at 0 (int)
+        return -- the cell (Cell) or None if the cell does not exist
+        """
+        if not self._grid.contains(row, column):
+            return None
+        return self.get(CellIdentifier.at(row, column))
+
+    def get_content_at(self, row: int, column: int):
+        """
+        This method returns the content of the cell at a position without creating a Cell for it.
+
+        Keyword arguments:
+        row -- the row of the cell (int)
+        column -- the column of the cell, starting at 0 (int)
+        return -- the content (Content) or None if the cell does not exist, where storages that keep
+                  plain numbers apart may give a float instead of the content
+        """
+        if not self._grid.contains(row, column):
+            return None
+        return self.get_content(CellIdentifier.at(row, column))
+
+    def get_contents_at(self, rows: list, column: int) -> list:
+        """
+        This method returns the contents of the cells of a column at some rows, as get_content_at does
+        for each one of them.
+
+        Keyword arguments:
+        rows -- the rows (list of ints)
+        column -- the column of the cells, starting at 0 (int)
+        return -- the contents, in the order of the rows (list of Contents, floats or None)
+        """
+        return [self.get_content_at(row, column) for row in rows]
+
+    @abc.abstractmethod
+    def objects(self) -> list:
+        """
+        This method returns the cells that are not plain numbers: formulas, texts and the cells that
+        are held. Storages may give new Cells for the ones that are not held.
+
+        Keyword arguments:
+        return -- the cells (list of Cells)
+        """
+        pass
+
+    def column_numbers(self, column: int) -> dict:
+        """
+        This method returns the numbers of a column.
+
+        Keyword arguments:
+        column -- the column, starting at 0 (int)
+        return -- the numbers of the column (dict of row -> float)
+        """
+        numbers = {}
+        for row, _ in self._grid.positions(0, column, None, column):
+            value = self.get_value_at(row, column)
+            if isinstance(value, (int, float)):
+                numbers[row] = value
+        return numbers
+
+    def values_in(self, start_row: int, start_column: int, end_row: int, end_column: int) -> list:
+        """
+        This method returns the values of the cells inside a rectangle in row-major order.
+        Empty cells are skipped.
+
+        Keyword arguments:
+        start_row, start_column, end_row, end_column -- the bounds of the rectangle, inclusive (int)
+        return -- the values (list)
+        """
+        values = []
+        for row, column in self._grid.positions(start_row, start_column, end_row, end_column):
+            value = self.get_value_at(row, column)
+            if value is not None:
+                values.append(value)
+        return values
+
+    def get_value(self, identifier: CellIdentifier):
+        """
+        This method returns the value of a cell without creating a Cell for it.
+
+        Keyword arguments:
+        identifier -- the identifier of the cell (CellIdentifier)
+        return -- the value (float, str) or None if the cell does not exist or is empty
+        """
+        content = self.get_content(identifier)
+        if content is None:
+            return None
+        return content.value.value
+
+    def get_value_at(self, row: int, column: int):
+        """
+        This method returns the value of the cell at a position without creating a Cell for it.
+
+        Keyword arguments:
+        row -- the row of the cell (int)
+        column -- the column of the cell, starting at 0 (int)
+        return -- the value (float, str) or None if the cell does not exist or is empty
+        """
+        if not self._grid.contains(row, column):
+            return None
+        return self.get_value(CellIdentifier.at(row, column))
+
+    def rows(self, start_row: int = 0):
+        """
+        This method returns an iterator of the rows of the stored cells in order, each one with the
+        contents of its cells by column. The storage must not be changed while the iterator is being used.
+
+        Keyword arguments:
+        start_row -- the first row (int)
+        return -- the rows (iterator of tuples (row, list of tuples (column, Content))), where storages
+                  that keep plain numbers apart may give a float instead of the content
+        """
+        for row, columns in self._grid.rows(start_row):
+            yield row, [(column, self.get_content(CellIdentifier.at(row, column))) for column in columns]
+
+    def number_columns(self) -> dict:
+        """
+        This method returns the plain numbers that the storage keeps apart from its Cell objects, by
+        column, as chunks of consecutive rows: an array of doubles and a byte mask of the rows that hold
+        a number. The arrays belong to the storage and must not be changed. By default every cell is a
+        Cell object and there are none.
+
+        Keyword arguments:
+        return -- the numbers (dict of column -> dict of first row -> tuple (array of doubles, bytearray))
+        """
+        return {}
+
+    def put_number_column(self, column: int, first_row: int, values: array, mask: bytearray) -> None:
+        """
+        This method stores the plain numbers of some consecutive rows of a column at once, as given by
+        number_columns.
+
+        Keyword arguments:
+        column -- the column, starting at 0 (int)
+        first_row -- the row of the first number (int)
+        values -- the numbers, one per row (array of doubles)
+        mask -- whether every row holds a number (bytearray)
+        """
+        for offset, present in enumerate(mask):
+            if present:
+                self.put_number(CellIdentifier.at(first_row + offset, column), values[offset])
+
+    def load_all(self) -> None:
+        """
+        This method makes the storage hold every cell by itself, so whatever it reads the cells from can
+        be overwritten. Most storages always hold every cell, so by default it does nothing.
+        """
+        pass
+
+
+class DictCellStorage(CellStorage):
+    """
+    This is a concrete implementation of the CellStorage class.
+    It keeps every cell as a Cell object in a dictionary.
+    """
+
+    def __init__(self) -> None:
+        """
+        This method initializes the storage.
+
+        Attributes:
+        _cells -- the cells (dict of CellIdentifier -> Cell)
+        """
+        super().__init__()
+        self._cells = {}
+
+    def get(self, identifier: CellIdentifier):
+        """
+        This method returns a cell.
+        """
+        return self._cells.get(identifier)
+
+    def get_content(self, identifier: CellIdentifier):
+        """
+        This method returns the content of a cell without creating a Cell for it.
+        """
+        cell = self._cells.get(identifier)
+        return cell.content if cell is not None else None
+
+    def put(self, cell: Cell) -> None:
+        """
+        This method stores a cell, replacing the one with the same identifier.
+        """
+        self._cells[cell.identifier] = cell
+        self._grid.add(cell.identifier.row_number, cell.identifier.column_number)
+
+    def put_number(self, identifier: CellIdentifier, value: float) -> None:
+        """
+        This method stores a plain number in a cell.
+        """
+        cell = self._cells.get(identifier)
+        if cell is not None:
+            cell.content = NumericalContent(NumericalValue(value))
+        else:
+            self.put(Cell(identifier, NumericalContent(NumericalValue(value))))
+
+    def remove(self, identifier: CellIdentifier) -> bool:
+        """
+        This method removes a cell.
+        """
+        if self._cells.pop(identifier, None) is None:
+            return False
+        self._grid.discard(identifier.row_number, identifier.column_number)
+        return True
+
+    def objects(self) -> list:
+        """
+        This method returns the cells that are stored as Cell objects.
+        """
+        return list(self._cells.values())
+
+
+class ColumnarCellStorage(CellStorage):
+    """
+    This is a concrete implementation of the CellStorage class.
+    Plain numbers are kept in arrays of doubles, with a byte mask that tells which rows hold a number.
+    That is 9 bytes per number instead of the Cell, CellIdentifier, NumericalContent and NumericalValue
+    objects. Every column is split in chunks of CHUNK_ROWS rows and only the chunks that hold a number
+    exist, so a sparse column costs memory for its numbers and not for the rows between them.
+    Every other cell takes a slot in the object chunks of its column, of OBJECT_CHUNK_ROWS rows: a text
+    is kept as its string and a formula as its content, and only the cells held by a caller are kept as
+    Cell objects. The cells handed out by get for the rest are new Cells every time, which are not kept.
+    """
+    CHUNK_BITS = 10
+    CHUNK_ROWS = 1 << CHUNK_BITS  # The number of rows of a chunk of a column
+    _ROW_MASK = CHUNK_ROWS - 1
+    OBJECT_CHUNK_BITS = 6
+    OBJECT_CHUNK_ROWS = 1 << OBJECT_CHUNK_BITS  # The number of rows of a chunk of objects of a column
+    _OBJECT_ROW_MASK = OBJECT_CHUNK_ROWS - 1
+
+    def __init__(self) -> None:
+        """
+        This method initializes the storage.
+
+        Attributes:
+        _objects -- the chunks of the cells that are not plain numbers of every column, by the index of
+                    the chunk, where every slot is None, a held Cell, the string of a text or another
+                    Content (dict of int -> dict of int -> list)
+        _columns -- the chunks of numbers and masks of every column, by the index of the chunk
+                    (dict of int -> dict of int -> (array of doubles, bytearray))
+        """
+        super().__init__()
+        self._objects = {}
+        self._columns = {}
+
+    @staticmethod
+    def _content_of(entry) -> Content:
+        """
+        This method returns the content of a slot of the object chunks, or None for an empty slot.
+        """
+        if entry is None or isinstance(entry, Content):
+            return entry
+        if isinstance(entry, Cell):
+            return entry.content
+        if isinstance(entry, str):
+            return TextualContent(TextualValue(entry))
+        return entry
+
+    def _object_at(self, row: int, column: int):
+        """
+        This method returns the slot of a cell in the object chunks.
+
+        Keyword arguments:
+        row -- the row of the cell (int)
+        column -- the column of the cell, starting at 0 (int)
+        return -- the slot (Cell, str or Content) or None if the object chunks do not hold the cell
+        """
+        chunks = self._objects.get(column)
+        if chunks is None:
+            return None
+        chunk = chunks.get(row >> self.OBJECT_CHUNK_BITS)
+        if chunk is None:
+            return None
+        return chunk[row & self._OBJECT_ROW_MASK]
+
+    def _set_object(self, row: int, column: int, entry) -> None:
+        """
+        This method fills the slot of a cell in the object chunks.
+        """
+        chunks = self._objects.get(column)
+        if chunks is None:
+            chunks = self._objects[column] = {}
+        chunk = chunks.get(row >> self.OBJECT_CHUNK_BITS)
+        if chunk is None:
+            chunk = chunks[row >> self.OBJECT_CHUNK_BITS] = [None] * self.OBJECT_CHUNK_ROWS
+        chunk[row & self._OBJECT_ROW_MASK] = entry
+
+    def _discard_object(self, row: int, column: int) -> bool:
+        """
+        This method empties the slot of a cell in the object chunks, and removes the chunk if it is left empty.
+
+        Keyword arguments:
+        row -- the row of the cell (int)
+        column -- the column of the cell, starting at 0 (int)
+        return -- True if the object chunks held the cell, False otherwise (bool)
+        """
+        chunks = self._objects.get(column)
+        if chunks is None:
+            return False
+        index = row >> self.OBJECT_CHUNK_BITS
+        chunk = chunks.get(index)
+        if chunk is None or chunk[row & self._OBJECT_ROW_MASK] is None:
+            return False
+        chunk[row & self._OBJECT_ROW_MASK] = None
+        if not any(chunk):
+            del chunks[index]
+            if not chunks:
+                del self._objects[column]
+        return True
+
+    def _number_at(self, row: int, column: int) -> tuple:
+        """
+        This method finds the slot of a cell in the arrays.
+
+        Keyword arguments:
+        row -- the row of the cell (int)
+        column -- the column of the cell, starting at 0 (int)
+        return -- the chunk and the position of the row in it (tuple) or None if the arrays do not hold the cell
+        """
+        chunks = self._columns.get(column)
+        if chunks is None:
+            return None
+        chunk = chunks.get(row >> self.CHUNK_BITS)
+        if chunk is None:
+            return None
+        offset = row & self._ROW_MASK
+        if chunk[1][offset]:
+            return chunk, offset
+        return None
+
+    def _discard_number(self, identifier: CellIdentifier) -> bool:
+        """
+        This method removes a cell from the arrays, and the chunk if it is left without numbers.
+
+        Keyword arguments:
+        identifier -- the identifier of the cell (CellIdentifier)
+        return -- True if the arrays held the cell, False otherwise (bool)
+        """
+        row = identifier.row_number
+        column = identifier.column_number
+        slot = self._number_at(row, column)
+        if slot is None:
+            return False
+        (_, mask), offset = slot
+        mask[offset] = 0
+        if mask.find(1) < 0:
+            chunks = self._columns[column]
+            del chunks[row >> self.CHUNK_BITS]
+            if not chunks:
+                del self._columns[column]
+        return True
+
+    def _store_number(self, row: int, column: int, value: float) -> None:
+        """
+        This method writes a number in the arrays, creating its chunk if needed.
+        """
+        chunks = self._columns.get(column)
+        if chunks is None:
+            chunks = self._columns[column] = {}
+        chunk = chunks.get(row >> self.CHUNK_BITS)
+        if chunk is None:
+            chunk = chunks[row >> self.CHUNK_BITS] = (array('d', bytes(8 * self.CHUNK_ROWS)),
+                                                      bytearray(self.CHUNK_ROWS))
+        values, mask = chunk
+        values[row & self._ROW_MASK] = value
+        mask[row & self._ROW_MASK] = 1
+        self._grid.add(row, column)
+
+    def get(self, identifier: CellIdentifier):
+        """
+        This method returns a cell. Unless the cell is held, it is a new Cell that is not kept, so
+        changing it does not change the storage.
+        """
+        row = identifier.row_number
+        column = identifier.column_number
+        entry = self._object_at(row, column)
+        if entry is not None:
+            return entry if isinstance(entry, Cell) else Cell(identifier, self._content_of(entry))
+        slot = self._number_at(row, column)
+        if slot is None:
+            return None
+        (values, _), offset = slot
+        return Cell(identifier, NumericalContent(NumericalValue(values[offset])))
+
+    def hold(self, identifier: CellIdentifier):
+        """
+        This method returns a cell as a stored object. The cell is turned into a Cell object if it is not one yet.
+        """
+        entry = self._object_at(identifier.row_number, identifier.column_number)
+        if isinstance(entry, Cell):
+            return entry
+        cell = self.get(identifier)
+        if cell is not None:
+            self._discard_number(identifier)
+            self._set_object(identifier.row_number, identifier.column_number, cell)
+        return cell
+
+    def get_content(self, identifier: CellIdentifier):
+        """
+        This method returns the content of a cell without creating a Cell for it.
+        """
+        row = identifier.row_number
+        column = identifier.column_number
+        entry = self._object_at(row, column)
+        if entry is not None:
+            return self._content_of(entry)
+        slot = self._number_at(row, column)
+        if slot is None:
+            return None
+        (values, _), offset = slot
+        return NumericalContent(NumericalValue(values[offset]))
+
+    def get_content_at(self, row: int, column: int):
+        """
+        This method returns the content of the cell at a position, giving the numbers kept in the arrays as floats.
+        """
+        slot = self._number_at(row, column)
+        if slot is not None:
+            return slot[0][0][slot[1]]
+        entry = self._object_at(row, column)
+        return self._content_of(entry) if entry is not None else None
+
+    def get_contents_at(self, rows: list, column: int) -> list:
+        """
+        This method returns the contents of the cells of a column at some rows. Consecutive rows are
+        read a chunk at a time: the numbers are sliced from the arrays at once and only the rows that
+        do not hold a number are looked up in the object chunks.
+        """
+        if not rows or rows[-1] - rows[0] != len(rows) - 1 or rows != list(range(rows[0], rows[-1] + 1)):
+            return [self.get_content_at(row, column) for row in rows]
+        chunks = self._columns.get(column, {})
+        contents = []
+        row = rows[0]
+        end = rows[-1] + 1
+        while row < end:
+            index = row >> self.CHUNK_BITS
+            stop = min(end, (index + 1) << self.CHUNK_BITS)
+            first = row & self._ROW_MASK
+            last = first + stop - row
+            chunk = chunks.get(index)
+            if chunk is None:
+                contents.extend(self._content_of(self._object_at(hole, column)) for hole in range(row, stop))
+            else:
+                values, mask = chunk
+                start = len(contents)
+                contents.extend(values[first:last])
+                hole = mask.find(0, first, last)
+                while hole >= 0:
+                    contents[start + hole - first] = self._content_of(self._object_at(row + hole - first, column))
+                    hole = mask.find(0, hole + 1, last)
+            row = stop
+        return contents
+
+    def put(self, cell: Cell) -> None:
+        """
+        This method stores a cell, replacing the one with the same identifier.
+        """
+        self._discard_number(cell.identifier)
+        self._set_object(cell.identifier.row_number, cell.identifier.column_number, cell)
+        self._grid.add(cell.identifier.row_number, cell.identifier.column_number)
+
+    def put_content(self, identifier: CellIdentifier, content: Content) -> None:
+        """
+        This method stores the content of a cell. Numbers go to the arrays and texts are kept as their
+        strings, unless the cell is held.
+        """
+        row = identifier.row_number
+        column = identifier.column_number
+        entry = self._object_at(row, column)
+        if isinstance(entry, Cell):
+            entry.content = content
+            return
+        if isinstance(content, NumericalContent) and content.value.value is not None:
+            if entry is not None:
+                self._discard_object(row, column)
+            self._store_number(row, column, content.value.value)
+            return
+        self._discard_number(identifier)
+        self._set_object(row, column, content.value.value if isinstance(content, TextualContent) else content)
+        self._grid.add(row, column)
+
+    def put_number(self, identifier: CellIdentifier, value: float) -> None:
+        """
+        This method stores a plain number in a cell.
+        """
+        row = identifier.row_number
+        column = identifier.column_number
+        entry = self._object_at(row, column)
+        if isinstance(entry, Cell):
+            entry.content = NumericalContent(NumericalValue(value))
+            return
+        if entry is not None:
+            self._discard_object(row, column)
+        self._store_number(row, column, value)
+
+    def number_columns(self) -> dict:
+        """
+        This method returns the chunks of numbers of every column.
+        """
+        return {column: {index << self.CHUNK_BITS: chunk for index, chunk in chunks.items()}
+                for column, chunks in self._columns.items()}
+
+    def put_number_column(self, column: int, first_row: int, values: array, mask: bytearray) -> None:
+        """
+        This method stores the plain numbers of some rows of a column at once. A whole chunk whose
+        rows have no cells yet is adopted as it is.
+        """
+        chunks = self._columns.get(column)
+        index = first_row >> self.CHUNK_BITS
+        if first_row & self._ROW_MASK or len(mask) != self.CHUNK_ROWS or len(values) != self.CHUNK_ROWS \
+                or (chunks is not None and index in chunks) \
+                or next(self._grid.positions(first_row, column, first_row + self.CHUNK_ROWS - 1, column),
+                        None) is not None:
+            super().put_number_column(column, first_row, values, mask)
+            return
+        if mask.find(1) < 0:
+            return
+        if chunks is None:
+            chunks = self._columns[column] = {}
+        chunks[index] = (values, mask)
+        self._grid.add_column(column, (first_row + offset for offset in compress(range(self.CHUNK_ROWS), mask)))
+
+    def get_value_at(self, row: int, column: int):
+        """
+        This method returns the value of the cell at a position, reading the arrays first.
+        """
+        slot = self._number_at(row, column)
+        if slot is not None:
+            return slot[0][0][slot[1]]
+        entry = self._object_at(row, column)
+        if entry is None or isinstance(entry, str):
+            return entry
+        return self._content_of(entry).value.value
+
+    def rows(self, start_row: int = 0):
+        """
+        This method returns an iterator of the rows of the cells in order, each one with the contents
+        of its cells by column. The numbers kept in the arrays are given as floats, without creating any object.
+        """
+        get_content_at = self.get_content_at
+        for row, row_columns in self._grid.rows(start_row):
+            yield row, [(column, get_content_at(row, column)) for column in row_columns]
+
+    def remove(self, identifier: CellIdentifier) -> bool:
+        """
+        This method removes a cell.
+        """
+        if not self._discard_object(identifier.row_number, identifier.column_number) \
+                and not self._discard_number(identifier):
+            return False
+        self._grid.discard(identifier.row_number, identifier.column_number)
+        return True
+
+    def objects(self) -> list:
+        """
+        This method returns the cells that are not plain numbers, in no particular order. The cells
+        that are not held are new Cells that are not kept.
+        """
+        cells = []
+        for column, chunks in self._objects.items():
+            for index, chunk in chunks.items():
+                first_row = index << self.OBJECT_CHUNK_BITS
+                for offset, entry in enumerate(chunk):
+                    if entry is None:
+                        continue
+                    if not isinstance(entry, Cell):
+                        entry = Cell(CellIdentifier.at(first_row + offset, column), self._content_of(entry))
+                    cells.append(entry)
+        return cells
+
+
+class MappedCellStorage(ColumnarCellStorage):
+    """
+    This is a concrete implementation of the CellStorage class for spreadsheets opened from a mapped file.
+    The cells of a row are created the first time the row is read or changed, from the fields of the
+    file, and from then on they are kept as in a ColumnarCellStorage. Reading a single value or the
+    numbers of a column decodes only the fields involved and creates no cells, so a huge file can
+    be opened at once and only the rows that are used cost memory.
+    Listing all the cells or counting them loads every row. Once every row is loaded the file is closed.
+    """
+
+    def __init__(self, source) -> None:
+        """
+        This method initializes the storage.
+
+        Keyword arguments:
+        source -- the mapped file, with a row_count, read_row(row), read_field(row, column),
+                  decode(field) and close() (MappedS2VFile)
+
+        Attributes:
+        _source -- the mapped file, or None once every row is loaded (MappedS2VFile)
+        _loaded -- whether every row is loaded, indexed by row (bytearray)
+        _pending -- the number of rows not loaded yet (int)
+        """
+        super().__init__()
+        self._source = source
+        self._loaded = bytearray(source.row_count + 1)
+        self._pending = source.row_count
+        if not self._pending:
+            self._release()
+
+    def _release(self) -> None:
+        """
+        This method closes the mapped file.
+        """
+        self._source.close()
+        self._source = None
+
+    def _is_loaded(self, row: int) -> bool:
+        """
+        This method checks if a row is loaded. The rows out of the file are always loaded.
+        """
+        return self._source is None or not 0 < row < len(self._loaded) or self._loaded[row] == 1
+
+    def load_row(self, row: int) -> None:
+        """
+        This method creates the cells of a row from the file, if it is not loaded yet.
+        Numbers are kept in the arrays and every other non-empty field in the object chunks.
+        Formulas are not parsed: whoever loads their rows builds their programs.
+
+        Keyword arguments:
+        row -- the row, starting at 1 (int)
+        """
+        if self._is_loaded(row):
+            return
+        self._loaded[row] = 1
+        self._pending -= 1
+        for column, field in enumerate(self._source.read_row(row)):
+            if not field.strip():  # An empty field holds no cell
+                continue
+            identifier = CellIdentifier.at(row, column)
+            try:
+                super().put_number(identifier, float(field))
+            except ValueError:
+                super().put_content(identifier, Content.create_content(field))
+        if not self._pending:
+            self._release()
+
+    def load_rows(self, rows) -> None:
+        """
+        This method creates the cells of some rows from the file.
+
+        Keyword arguments:
+        rows -- the rows, starting at 1 (iterable of ints)
+        """
+        for row in rows:
+            self.load_row(row)
+
+    def _load_between(self, start_row: int, end_row: int) -> None:
+        """
+        This method creates the cells of the rows between two rows, both inclusive.
+        """
+        if self._source is not None:
+            self.load_rows(range(max(start_row, 1), min(end_row, len(self._loaded) - 1) + 1))
+
+    def load_all(self) -> None:
+        """
+        This method creates the cells of every row and closes the file.
+        """
+        self._load_between(1, len(self._loaded) - 1)
+
+    def __iter__(self):
+        """
+        This method returns an iterator of the identifiers of the cells in row-major order, loading every row.
+        """
+        self.load_all()
+        return super().__iter__()
+
+    def __len__(self) -> int:
+        """
+        This method returns the number of cells, loading every row.
+        """
+        self.load_all()
+        return super().__len__()
+
+    def rows(self, start_row: int = 0):
+        """
+        This method returns an iterator of the rows of the cells in order, loading every row.
+        """
+        self.load_all()
+        return super().rows(start_row)
+
+    def identifiers_in(self, start_row: int, start_column: int, end_row: int, end_column: int):
+        """
+        This method returns an iterator of the identifiers of the cells inside a rectangle, loading its rows.
+        """
+        self._load_between(start_row, end_row)
+        return super().identifiers_in(start_row, start_column, end_row, end_column)
+
+    def values_in(self, start_row: int, start_column: int, end_row: int, end_column: int) -> list:
+        """
+        This method returns the values of the cells inside a rectangle, loading its rows.
+        """
+        self._load_between(start_row, end_row)
+        return super().values_in(start_row, start_column, end_row, end_column)
+
+    def get(self, identifier: CellIdentifier):
+        """
+        This method returns a cell, loading its row.
+        """
+        self.load_row(identifier.row_number)
+        return super().get(identifier)
+
+    def hold(self, identifier: CellIdentifier):
+        """
+        This method returns a cell as a stored object, loading its row.
+        """
+        self.load_row(identifier.row_number)
+        return super().hold(identifier)
+
+    def get_at(self, row: int, column: int):
+        """
+        This method returns the cell at a position, loading its row.
+        """
+        self.load_row(row)
+        return super().get_at(row, column)
+
+    def get_content(self, identifier: CellIdentifier):
+        """
+        This method returns the content of a cell. If its row is not loaded the content is created
+        from its field, and the row stays unloaded.
+        """
+        row = identifier.row_number
+        if self._is_loaded(row):
+            return super().get_content(identifier)
+        field = self._source.read_field(row, identifier.column_number)
+        return Content.create_content(self._source.decode(field)) if field is not None and field.strip() else None
+
+    def get_content_at(self, row: int, column: int):
+        """
+        This method returns the content of the cell at a position. If its row is not loaded the content
+        is created from its field, giving a number as a float, and the row stays unloaded.
+        """
+        if self._is_loaded(row):
+            return super().get_content_at(row, column)
+        field = self._source.read_field(row, column)
+        if field is None or not field.strip():
+            return None
+        try:
+            return float(field)
+        except ValueError:
+            return Content.create_content(self._source.decode(field))
+
+    def get_contents_at(self, rows: list, column: int) -> list:
+        """
+        This method returns the contents of the cells of a column at some rows. The arrays are only
+        read at once when every row is loaded, and the other rows stay unloaded.
+        """
+        if self._source is None or all(map(self._is_loaded, rows)):
+            return super().get_contents_at(rows, column)
+        return [self.get_content_at(row, column) for row in rows]
+
+    def get_value_at(self, row: int, column: int):
+        """
+        This method returns the value of the cell at a position. If its row is not loaded the value
+        is read from its field, and the row stays unloaded.
+        """
+        if self._is_loaded(row):
+            return super().get_value_at(row, column)
+        field = self._source.read_field(row, column)
+        if field is None or not field.strip():
+            return None
+        try:
+            return float(field)
+        except ValueError:
+            return self._source.decode(field).strip()
+
+    def column_numbers(self, column: int) -> dict:
+        """
+        This method returns the numbers of a column. The numbers of the rows that are not loaded are
+        read from their fields, and those rows stay unloaded.
+        """
+        numbers = super().column_numbers(column)
+        if self._source is not None:
+            for row in range(1, len(self._loaded)):
+                if not self._loaded[row]:
+                    field = self._source.read_field(row, column)
+                    if field:
+                        try:
+                            numbers[row] = float(field)
+                        except ValueError:
+                            pass
+        return numbers
+
+    def number_columns(self) -> dict:
+        """
+        This method returns the chunks of numbers of every column, loading every row.
+        """
+        self.load_all()
+        return super().number_columns()
+
+    def put_number_column(self, column: int, first_row: int, values: array, mask: bytearray) -> None:
+        """
+        This method stores the plain numbers of some rows of a column at once, loading every row first.
+        """
+        self.load_all()
+        super().put_number_column(column, first_row, values, mask)
+
+    def put(self, cell: Cell) -> None:
+        """
+        This method stores a cell, loading its row first so the file does not replace it later.
+        """
+        self.load_row(cell.identifier.row_number)
+        super().put(cell)
+
+    def put_content(self, identifier: CellIdentifier, content: Content) -> None:
+        """
+        This method stores the content of a cell, loading its row first.
+        """
+        self.load_row(identifier.row_number)
+        super().put_content(identifier, content)
+
+    def put_number(self, identifier: CellIdentifier, value: float) -> None:
+        """
+        This method stores a plain number in a cell, loading its row first.
+        """
+        self.load_row(identifier.row_number)
+        super().put_number(identifier, value)
+
+    def remove(self, identifier: CellIdentifier) -> bool:
+        """
+        This method removes a cell, loading its row first.
+        """
+        self.load_row(identifier.row_number)
+        return super().remove(identifier)
@@ -1,89 +1,317 @@
-"""
-This file contains the DependencyManager class.
-"""
-from domain.entities.content import NumericalContent
-from domain.entities.spreadsheet import Spreadsheet
-from domain.entities.cell import Cell, CellIdentifier
-from domain.entities.function import Function
-from domain.entities.range import Range
-from domain.entities.value import NumericalValue
-from test.entities.circular_dependency_exception import CircularDependencyException
-
-class DependencyManager:
-    """
-    This class is responsible for managing the dependencies and detecting circular dependencies.
-    """
-
-    def __init__(self, spreadsheet: Spreadsheet):
-        """
-        This method initializes the dependency manager.
-
-        Keyword arguments:
-        spreadsheet -- the spreadsheet (Spreadsheet)
-
-        Attributes:
-        _spreadsheet -- the spreadsheet (Spreadsheet)
-        """
-        self._spreadsheet = spreadsheet
-
-    def get_dependencies(self, expression: list) -> list:
-        """
-        This method returns the dependencies of an expression.
-
-        Keyword arguments:
-        expression -- the expression (list of FormulaComponents)
-        return -- the dependencies (list of CellIdentifiers)
-        """
-        dependencies = []
-        for component in expression:
-            if isinstance(component, Cell):
-                dependencies.append(component.identifier)
-            elif isinstance(component, Function):
-                for argument in component.arguments:
-                    if isinstance(argument, Cell):
-                        dependencies.append(argument.identifier)
-                    elif isinstance(argument, Range):
-                        for cell_id in argument.obtain_all_cell_ids():
-                            dependencies.append(cell_id)
-        return dependencies
-
-    def remove_old_dependencies(self, cell: Cell):
-        """
-        This method removes the current cell from the depends_on_me lists of the cells that depend on it.
-        """
-        for dependency in cell.depends_on:
-            dep_cell = self._spreadsheet.get_cell(dependency)
-            if dep_cell is not None:
-                dep_cell.depends_on_me.remove(cell.identifier)
-
-    def update_depends_on_me_lists(self, new_formula: CellIdentifier, dependencies: list) -> None:
-        """
-        This method updates the dependencies of the cells that depend on the new_formula.
-
-        Keyword arguments:
-        new_formula -- the new formula (CellIdentifier)
-        dependencies -- the dependencies of the new formula (list of CellIdentifiers)
-        """
-        for dep_id in dependencies:
-            dep_cell = self._spreadsheet.get_cell(dep_id)
-            if dep_cell is not None:
-                if new_formula not in dep_cell.depends_on_me:
-                    dep_cell.add_dependency(new_formula)
-            else:
-                self._spreadsheet.add_cell(Cell(dep_id, NumericalContent(NumericalValue(None))))
-                self._spreadsheet.get_cell(dep_id).add_dependency(new_formula)
-
-    def detect_circular_dependencies(self, origin_cell: CellIdentifier, cell: Cell):
-        """
-        This method detects circular dependencies.
-
-        Keyword arguments:
-        cell -- the cell containing the new Formula to check (Cell)
-        return -- True if there are circular dependencies, False otherwise (bool)
-        """
-        dependencies = cell.depends_on_me
-        for dependency in dependencies:
-            if dependency == origin_cell:
-                raise CircularDependencyException("Circular dependency detected.")
-        for dependency in dependencies:
-            self.detect_circular_dependencies(origin_cell, self._spreadsheet.get_cell(dependency))
+"""
+This file contains the DependencyManager class.
+"""
+import bisect
+from domain.entities.content import Formula
+from domain.entities.spreadsheet import Spreadsheet
+from domain.entities.cell import Cell, CellIdentifier
+from domain.utils.range_index import RangeIndex
+from domain.utils.topological_order import TopologicalOrder
+from test.entities.circular_dependency_exception import CircularDependencyException
+
+class DependencyManager:
+    """
+    This class is responsible for managing the dependencies and detecting circular dependencies.
+    """
+
+    def __init__(self, spreadsheet: Spreadsheet):
+        """
+        This method initializes the dependency manager.
+
+        Keyword arguments:
+        spreadsheet -- the spreadsheet (Spreadsheet)
+
+        Attributes:
+        _spreadsheet -- the spreadsheet (Spreadsheet)
+        _dependents -- the formulas that reference every cell, by the packed position of the cell, as a
+                       single identifier or a list of them (dict of int -> CellIdentifier or list)
+        _range_index -- the ranges read by every formula (RangeIndex)
+        _order -- the topological order of the formulas, kept up to date on every edit (TopologicalOrder)
+        _formula_rows -- the sorted rows of the formulas of every column (dict of int -> list of ints)
+        """
+        self._spreadsheet = spreadsheet
+        self._dependents = {}
+        self._range_index = RangeIndex()
+        self._order = TopologicalOrder(self.get_dependents, self.get_formula_dependencies)
+        self._formula_rows = {}
+
+    @property
+    def range_index(self):
+        """
+        Getter for the range index.
+        """
+        return self._range_index
+
+    @property
+    def order(self):
+        """
+        Getter for the topological order of the formulas.
+        """
+        return self._order
+
+    @staticmethod
+    def _position(identifier: CellIdentifier) -> tuple:
+        """
+        This method returns the position of a cell as integers.
+
+        Keyword arguments:
+        identifier -- the identifier of the cell (CellIdentifier)
+        return -- the row and the column of the cell (tuple of ints)
+        """
+        return identifier.row_number, identifier.column_number
+
+    def get_dependents(self, identifier: CellIdentifier) -> list:
+        """
+        This method returns the formulas that depend directly on a cell, either because
+        they reference it or because they read a range that contains it.
+
+        Keyword arguments:
+        identifier -- the identifier of the cell (CellIdentifier)
+        return -- the dependent formulas (list of CellIdentifiers)
+        """
+        owners = self._dependents.get(identifier.key)
+        if owners is None:
+            dependents = []
+        elif isinstance(owners, list):
+            dependents = list(owners)
+        else:
+            dependents = [owners]
+        in_ranges = self._range_index.query(*self._position(identifier))
+        if not in_ranges:
+            return dependents
+        return list(dict.fromkeys(dependents + in_ranges))
+
+    def add_dependencies(self, identifier: CellIdentifier, program) -> None:
+        """
+        This method records the cells and the ranges a formula reads, as given by its program.
+
+        Keyword arguments:
+        identifier -- the identifier of the formula (CellIdentifier)
+        program -- the program of the formula (FormulaProgram)
+        """
+        row, column = self._position(identifier)
+        dependents = self._dependents
+        for dependency_row, dependency_column in program.cells(row, column):
+            key = CellIdentifier.key_at(dependency_row, dependency_column)
+            owners = dependents.get(key)
+            if owners is None:
+                dependents[key] = identifier
+            elif isinstance(owners, list):
+                if identifier not in owners:
+                    owners.append(identifier)
+            elif owners != identifier:
+                dependents[key] = [owners, identifier]
+        for bounds in program.ranges(row, column):
+            self._range_index.add(identifier, *bounds)
+
+    def remove_dependencies(self, identifier: CellIdentifier, program) -> None:
+        """
+        This method forgets the cells and the ranges a formula reads, as given by its program.
+
+        Keyword arguments:
+        identifier -- the identifier of the formula (CellIdentifier)
+        program -- the program of the formula (FormulaProgram)
+        """
+        row, column = self._position(identifier)
+        dependents = self._dependents
+        for dependency_row, dependency_column in program.cells(row, column):
+            key = CellIdentifier.key_at(dependency_row, dependency_column)
+            owners = dependents.get(key)
+            if owners is None:
+                continue
+            if isinstance(owners, list):
+                if identifier in owners:
+                    owners.remove(identifier)
+                    if len(owners) == 1:
+                        dependents[key] = owners[0]
+            elif owners == identifier:
+                del dependents[key]
+        self._range_index.remove(identifier)
+
+    def get_formula_dependencies(self, identifier: CellIdentifier) -> list:
+        """
+        This method returns the formulas a formula reads, either directly or through its ranges.
+
+        Keyword arguments:
+        identifier -- the identifier of the formula (CellIdentifier)
+        return -- the formulas (list of CellIdentifiers)
+        """
+        content = self._spreadsheet.get_content(identifier)
+        program = content.program if isinstance(content, Formula) else None
+        if program is None:
+            return []
+        row, column = self._position(identifier)
+        formulas = []
+        for dependency_row, dependency_column in program.cells(row, column):
+            # A formula holds its identifier, so a cell without one is not a formula
+            dependency = CellIdentifier.existing_at(dependency_row, dependency_column)
+            if dependency is not None and dependency in self._order:
+                formulas.append(dependency)
+        for start_row, start_column, end_row, end_column in program.ranges(row, column):
+            if end_column - start_column < len(self._formula_rows):
+                columns = range(start_column, end_column + 1)
+            else:
+                columns = [column for column in self._formula_rows if start_column <= column <= end_column]
+            for column in columns:
+                rows = self._formula_rows.get(column)
+                if rows:
+                    for row in rows[bisect.bisect_left(rows, start_row):bisect.bisect_right(rows, end_row)]:
+                        formulas.append(CellIdentifier.existing_at(row, column))
+        return formulas
+
+    def add_formula_node(self, identifier: CellIdentifier) -> None:
+        """
+        This method adds a cell that has just become a formula to the topological order.
+        Before getting any dependencies it can go first if other formulas read it, or last otherwise.
+
+        Keyword arguments:
+        identifier -- the identifier of the formula (CellIdentifier)
+        """
+        if identifier in self._order:
+            return
+        if self.get_dependents(identifier):
+            self._order.add_bottom(identifier)
+        else:
+            self._order.add_top(identifier)
+        self._index_formula_position(identifier)
+
+    def remove_formula_node(self, identifier: CellIdentifier) -> None:
+        """
+        This method removes a cell that is no longer a formula from the topological order.
+
+        Keyword arguments:
+        identifier -- the identifier of the cell (CellIdentifier)
+        """
+        if identifier not in self._order:
+            return
+        self._order.remove(identifier)
+        row, column = self._position(identifier)
+        rows = self._formula_rows[column]
+        del rows[bisect.bisect_left(rows, row)]
+        if not rows:
+            del self._formula_rows[column]
+
+    def _index_formula_position(self, identifier: CellIdentifier) -> None:
+        """
+        This method stores the position of a formula, so the formulas inside a range can be found.
+
+        Keyword arguments:
+        identifier -- the identifier of the formula (CellIdentifier)
+        """
+        row, column = self._position(identifier)
+        bisect.insort(self._formula_rows.setdefault(column, []), row)
+
+    def detect_circular_dependencies(self, cell: Cell):
+        """
+        This method detects if the dependencies of a formula introduce a circular dependency.
+        The edges of the formula are inserted one by one in the topological order, which only visits
+        the region of the graph that each edge affects.
+
+        Keyword arguments:
+        cell -- the cell containing the new Formula to check, with its dependencies already wired (Cell)
+        """
+        self.add_formula_node(cell.identifier)
+        for dependency in self.get_formula_dependencies(cell.identifier):
+            if not self._order.add_edge(dependency, cell.identifier):
+                raise CircularDependencyException("Circular dependency detected.")
+
+    def find_circular_dependencies(self, identifiers) -> list:
+        """
+        This method finds all the circular dependencies of the graph reachable from the given cells
+        with a single pass of Tarjan's strongly connected components algorithm.
+
+        Keyword arguments:
+        identifiers -- the identifiers where the search starts (iterable of CellIdentifiers)
+        return -- the cells of every circular dependency (list of lists of CellIdentifiers)
+        """
+        return [component for component in self._strongly_connected_components(identifiers)
+                if self._is_circular(component)]
+
+    def _strongly_connected_components(self, identifiers) -> list:
+        """
+        This method returns the strongly connected components of the graph reachable from the given cells,
+        using Tarjan's algorithm. The algorithm is iterative, so long chains do not hit the recursion limit.
+        A component is returned after every component that depends on it.
+
+        Keyword arguments:
+        identifiers -- the identifiers where the search starts (iterable of CellIdentifiers)
+        return -- the components (list of lists of CellIdentifiers)
+        """
+        index = {}
+        low_link = {}
+        on_stack = set()
+        stack = []
+        components = []
+        for root in identifiers:
+            if root in index:
+                continue
+            index[root] = low_link[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(self.get_dependents(root)))]
+            while work:
+                node, dependents = work[-1]
+                for dependent in dependents:
+                    if dependent not in index:
+                        index[dependent] = low_link[dependent] = len(index)
+                        stack.append(dependent)
+                        on_stack.add(dependent)
+                        work.append((dependent, iter(self.get_dependents(dependent))))
+                        break
+                    elif dependent in on_stack:
+                        low_link[node] = min(low_link[node], index[dependent])
+                else:  # All the dependents of the node have been visited
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low_link[parent] = min(low_link[parent], low_link[node])
+                    if low_link[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        components.append(component)
+        return components
+
+    def _is_circular(self, component: list) -> bool:
+        """
+        This method checks if a strongly connected component is a circular dependency.
+
+        Keyword arguments:
+        component -- the cells of the component (list of CellIdentifiers)
+        return -- True if the component is a circular dependency, False otherwise (bool)
+        """
+        return len(component) > 1 or component[0] in self.get_dependents(component[0])
+
+    def build_topological_order(self, identifiers) -> None:
+        """
+        This method checks the graph of the given formulas for circular dependencies with a single
+        pass of Tarjan's algorithm and, if there are none, replaces the topological order by the
+        one the same pass produces. It is meant for building the graph of a whole spreadsheet at once.
+
+        Keyword arguments:
+        identifiers -- the identifiers of all the formulas (iterable of CellIdentifiers)
+        """
+        components = self._strongly_connected_components(identifiers)
+        for component in components:
+            if self._is_circular(component):
+                coordinates = ", ".join(identifier.coordinate for identifier in component)
+                raise CircularDependencyException("Circular dependency detected: " + coordinates + ".")
+        # Tarjan's algorithm finishes a component after all the components that depend on it
+        self.restore_topological_order([component[0] for component in reversed(components)])
+
+    def restore_topological_order(self, order: list) -> None:
+        """
+        This method replaces the topological order by one that is known to be valid, such as the one
+        saved with a snapshot of the spreadsheet, without checking the graph again.
+
+        Keyword arguments:
+        order -- the identifiers of all the formulas, in topological order (list of CellIdentifiers)
+        """
+        self._formula_rows = {}
+        self._order.reset(order)
+        for identifier in order:
+            self._index_formula_position(identifier)
@@ -0,0 +1,494 @@
+"""
+This file contains the FormulaCompiler, FormulaProgram and TemplateReader classes.
+"""
+import abc
+from itertools import repeat
+from domain.entities.formula_component import Parenthesis
+from domain.entities.formula_operator import Operator
+from domain.entities.function import Suma, Max, Min, Promedio
+from domain.entities.operand import Operand
+from domain.utils.aggregate_index import combine_aggregates
+from domain.utils.shunting_yard_algorithm import ShuntingYard
+
+_FUNCTIONS = {"SUMA": Suma, "MAX": Max, "MIN": Min, "PROMEDIO": Promedio}
+_EMPTY_AGGREGATE = (0, 0, float("inf"), float("-inf"))
+
+
+def _aggregate_of(value) -> tuple:
+    """
+    This function returns the aggregate of a single value passed to a function, or of no values if it
+    is empty, as Argument.get_aggregate_as_argument does.
+    """
+    if value is None:
+        return _EMPTY_AGGREGATE
+    return sum((value,)), 1, value, value
+
+
+class TemplateReader(abc.ABC):
+    """
+    This is an abstract class that tells a compiled template how to read the cells it references.
+    Every method is called once for every reference of the template while it is compiled, in the
+    order of the template, and returns the function that reads the reference when the template is
+    evaluated at the position of a formula.
+    """
+    __slots__ = ()
+
+    @abc.abstractmethod
+    def operand(self, row_offset: int, column_offset: int):
+        """
+        This method returns the reader of a cell used as an operand.
+
+        Keyword arguments:
+        row_offset, column_offset -- the offset of the cell from the formula (int)
+        return -- the function from the row and the column of the formula to the value of the cell,
+                  or None if it is empty (callable)
+        """
+        pass
+
+    @abc.abstractmethod
+    def argument(self, row_offset: int, column_offset: int):
+        """
+        This method returns the reader of a cell passed to a function.
+
+        Keyword arguments:
+        row_offset, column_offset -- the offset of the cell from the formula (int)
+        return -- the function from the row and the column of the formula to the sum, the number, the
+                  minimum and the maximum of the values of the cell (callable)
+        """
+        pass
+
+    @abc.abstractmethod
+    def range(self, start_row_offset: int, start_column_offset: int, end_row_offset: int, end_column_offset: int):
+        """
+        This method returns the reader of a range passed to a function.
+
+        Keyword arguments:
+        start_row_offset, start_column_offset, end_row_offset, end_column_offset -- the offsets of the
+                bounds of the range from the formula, inclusive (int)
+        return -- the function from the row and the column of the formula to the sum, the number, the
+                  minimum and the maximum of the numbers of the range (callable)
+        """
+        pass
+
+    def shared(self, key_of, compute):
+        """
+        This method returns the evaluator of a function whose arguments are only ranges, numbers and
+        such functions, which every formula with the same absolute form of the function may share.
+        By default it is not shared.
+
+        Keyword arguments:
+        key_of -- the function from the row and the column of the formula to the absolute form of the
+                  function (callable)
+        compute -- the function from the row and the column of the formula to the result (callable)
+        return -- the function from the row and the column of the formula to the result (callable)
+        """
+        return compute
+
+
+class _CompiledOperand(Operand):
+    """
+    This class is an operand of a template that has already been compiled, so the shunting yard
+    algorithm can place it in the postfix expression.
+    """
+    __slots__ = ("compiled",)
+
+    def __init__(self, compiled: tuple) -> None:
+        """
+        This method initializes the operand.
+
+        Keyword arguments:
+        compiled -- the compiled operand (tuple (is_constant, value or function))
+        """
+        self.compiled = compiled
+
+    def get_value_as_operand(self):
+        """
+        This method is not available: the operand is only evaluated through its compiled form.
+        """
+        raise ValueError("The operand has been compiled.")
+
+
+class FormulaProgram:
+    """
+    This class is the compiled form of a shape: every formula with the same relative form shares one
+    program, which evaluates it at the position of its cell. The program also knows the references of
+    the shape as offsets, so the dependencies of a formula are found from its program and its position
+    instead of being kept by every formula.
+    """
+    __slots__ = ("_shape", "_template", "_evaluate", "_cell_offsets", "_range_offsets", "__weakref__")
+
+    def __init__(self, shape: str, template: tuple, evaluate) -> None:
+        """
+        This method initializes the program.
+
+        Keyword arguments:
+        shape -- the shape (str)
+        template -- the template of the shape (tuple of nodes)
+        evaluate -- the compiled template (callable)
+
+        Attributes:
+        _shape -- the shape (str)
+        _template -- the template of the shape (tuple of nodes)
+        _evaluate -- the function from the row and the column of a formula to its value (callable)
+        _cell_offsets -- the offsets of the cells referenced by the shape, used as operands or passed
+                         to functions, in the order of the template (tuple of tuples (int, int))
+        _range_offsets -- the offsets of the bounds of the ranges read by the shape, in the order of the
+                          template (tuple of tuples (int, int, int, int))
+        """
+        cell_offsets = []
+        range_offsets = []
+        pending = list(reversed(template))
+        while pending:  # The functions are walked before the nodes that follow them
+            node = pending.pop()
+            if node[0] == "cell":
+                cell_offsets.append(node[1:])
+            elif node[0] == "range":
+                range_offsets.append(node[1:])
+            elif node[0] == "function":
+                pending.extend(reversed(node[2]))
+        self._shape = shape
+        self._template = template
+        self._evaluate = evaluate
+        self._cell_offsets = tuple(cell_offsets)
+        self._range_offsets = tuple(range_offsets)
+
+    @property
+    def shape(self):
+        """
+        Getter for the shape.
+        """
+        return self._shape
+
+    @property
+    def template(self):
+        """
+        Getter for the template.
+        """
+        return self._template
+
+    @property
+    def cell_offsets(self):
+        """
+        Getter for the offsets of the referenced cells.
+        """
+        return self._cell_offsets
+
+    @property
+    def range_offsets(self):
+        """
+        Getter for the offsets of the bounds of the ranges.
+        """
+        return self._range_offsets
+
+    def evaluate(self, row: int, column: int):
+        """
+        This method evaluates the formula of the shape held by a cell.
+
+        Keyword arguments:
+        row -- the row of the cell (int)
+        column -- the column of the cell, starting at 0 (int)
+        return -- the value of the formula (float) or None if it is empty
+        """
+        return self._evaluate(row, column)
+
+    def cells(self, row: int, column: int) -> list:
+        """
+        This method returns the positions of the cells referenced by the formula of a cell.
+
+        Keyword arguments:
+        row -- the row of the cell (int)
+        column -- the column of the cell, starting at 0 (int)
+        return -- the positions (list of tuples (row, column))
+        """
+        return [(row + row_offset, column + column_offset) for row_offset, column_offset in self._cell_offsets]
+
+    def ranges(self, row: int, column: int) -> list:
+        """
+        This method returns the bounds of the ranges read by the formula of a cell.
+
+        Keyword arguments:
+        row -- the row of the cell (int)
+        column -- the column of the cell, starting at 0 (int)
+        return -- the bounds (list of tuples (start_row, start_column, end_row, end_column))
+        """
+        return [(row + start_row, column + start_column, row + end_row, column + end_column)
+                for start_row, start_column, end_row, end_column in self._range_offsets]
+
+
+class FormulaCompiler:
+    """
+    This class compiles the template of a shape into a tree of closures of the row and the column of
+    the formula. The compiled template is built once per shape and evaluates any formula of the shape
+    without running the shunting yard algorithm again, without isinstance checks and without
+    allocating a NumericalValue for every intermediate result.
+    Operations and functions whose operands are all constants are folded at compile time.
+    Arithmetic templates can also be compiled into vectorized form, to evaluate at once many
+    formulas of the same shape.
+    """
+
+    @staticmethod
+    def compile_template(template: tuple, reader: TemplateReader):
+        """
+        This method compiles a template.
+
+        Keyword arguments:
+        template -- the template (tuple of nodes)
+        reader -- how the references of the template are read (TemplateReader)
+        return -- the function from the row and the column of a formula to its value (callable)
+        """
+        components = []
+        for node in template:
+            if node[0] == "operator":
+                components.append(Operator(node[1]))
+            elif node[0] == "parenthesis":
+                components.append(Parenthesis(node[1]))
+            else:
+                components.append(_CompiledOperand(FormulaCompiler._compile_operand(node, reader)))
+        # Every node of the stack is a pair (is_constant, value or function)
+        stack = []
+        for component in ShuntingYard.generate_postfix_expression(components):
+            if isinstance(component, Operator):
+                right = stack.pop()
+                left = stack.pop()
+                stack.append(FormulaCompiler._compile_operation(component, left, right))
+            else:
+                stack.append(component.compiled)
+        if len(stack) != 1:
+            raise ValueError("The postfix expression is not valid.")
+        is_constant, node = stack.pop()
+        if is_constant:
+            return lambda row, column: node
+        return node
+
+    @staticmethod
+    def _compile_operand(node: tuple, reader: TemplateReader) -> tuple:
+        """
+        This method compiles a node used as an operand: a number, a cell or a function.
+
+        Keyword arguments:
+        node -- the node (tuple)
+        reader -- how the references of the template are read (TemplateReader)
+        return -- the compiled operand (tuple (is_constant, value or function))
+        """
+        kind = node[0]
+        if kind == "number":
+            return True, node[1].get_value_as_operand()
+        elif kind == "cell":
+            return False, reader.operand(node[1], node[2])
+        elif kind == "function":
+            return FormulaCompiler._compile_function(node, reader)
+        raise ValueError("Unexpected node in the template.")
+
+    @staticmethod
+    def _compile_argument(node: tuple, reader: TemplateReader) -> tuple:
+        """
+        This method compiles a node passed to a function into the aggregate of its values.
+
+        Keyword arguments:
+        node -- the node (tuple)
+        reader -- how the references of the template are read (TemplateReader)
+        return -- the compiled aggregate (tuple (is_constant, aggregate or function))
+        """
+        kind = node[0]
+        if kind == "number":
+            return True, node[1].get_aggregate_as_argument()
+        elif kind == "cell":
+            return False, reader.argument(node[1], node[2])
+        elif kind == "range":
+            return False, reader.range(*node[1:])
+        elif kind == "function":
+            is_constant, function = FormulaCompiler._compile_function(node, reader)
+            if is_constant:
+                return True, _aggregate_of(function)
+            return False, lambda row, column: _aggregate_of(function(row, column))
+        raise ValueError("Unexpected node in the template.")
+
+    @staticmethod
+    def _compile_function(node: tuple, reader: TemplateReader) -> tuple:
+        """
+        This method compiles a function. Its arguments are aggregated from left to right and the function
+        class computes the result from their aggregate, as Function.compute does.
+
+        Keyword arguments:
+        node -- the node of the function (tuple)
+        reader -- how the references of the template are read (TemplateReader)
+        return -- the compiled function (tuple (is_constant, value or function))
+        """
+        if node[1] not in _FUNCTIONS:
+            raise ValueError("The function is not valid.")
+        function = _FUNCTIONS[node[1]]
+        arguments = [FormulaCompiler._compile_argument(argument, reader) for argument in node[2]]
+        if all(is_constant for is_constant, _ in arguments):
+            aggregate = _EMPTY_AGGREGATE
+            for _, argument in arguments:
+                aggregate = combine_aggregates(aggregate, argument)
+            return True, function.result(aggregate)
+        readers = tuple((lambda row, column, aggregate=argument: aggregate) if is_constant else argument
+                        for is_constant, argument in arguments)
+
+        def compute(row: int, column: int):
+            aggregate = _EMPTY_AGGREGATE
+            for read in readers:
+                aggregate = combine_aggregates(aggregate, read(row, column))
+            return function.result(aggregate)
+
+        shared_form = FormulaCompiler._shared_form(node)
+        if shared_form is None:  # Its cell arguments may be formulas, which change within an epoch
+            return False, compute
+        structure, offsets = shared_form
+        row_offsets = offsets[0::2]
+        column_offsets = offsets[1::2]
+
+        def key_of(row: int, column: int) -> tuple:
+            return (structure, tuple(row + offset for offset in row_offsets),
+                    tuple(column + offset for offset in column_offsets))
+
+        return False, reader.shared(key_of, compute)
+
+    @staticmethod
+    def _shared_form(node: tuple):
+        """
+        This method returns the form of a node that can be shared: its structure, without the positions
+        of its ranges, and the offsets of the bounds of its ranges, one after the other.
+
+        Keyword arguments:
+        node -- the node (tuple)
+        return -- the structure and the offsets (tuple (tuple, tuple of ints)) or None if it can not be shared
+        """
+        kind = node[0]
+        if kind == "number":
+            return (kind, node[1].value), ()
+        elif kind == "range":
+            return (kind,), node[1:]
+        elif kind == "function":
+            forms = [FormulaCompiler._shared_form(argument) for argument in node[2]]
+            if None in forms:
+                return None
+            return (kind, node[1], tuple(form[0] for form in forms)), sum((form[1] for form in forms), ())
+        return None
+
+    @staticmethod
+    def _compile_operation(operator: Operator, left: tuple, right: tuple) -> tuple:
+        """
+        This method compiles an operation between two compiled operands.
+        An empty operand (None) makes the result 0, as in Operator.compute.
+
+        Keyword arguments:
+        operator -- the operator (Operator)
+        left -- the compiled left operand (tuple)
+        right -- the compiled right operand (tuple)
+        return -- the compiled operation (tuple)
+        """
+        left_is_constant, left_node = left
+        right_is_constant, right_node = right
+        if left_is_constant and right_is_constant:
+            return True, operator.compute(left_node, right_node)
+
+        operation = operator.operation
+        if left_is_constant and left_node is None:  # An empty function, such as MAX()
+            def node(row: int, column: int):
+                right_node(row, column)  # It is still evaluated, because it may fail
+                return 0
+        elif right_is_constant and right_node is None:
+            def node(row: int, column: int):
+                left_node(row, column)
+                return 0
+        elif left_is_constant:
+            def node(row: int, column: int):
+                right_value = right_node(row, column)
+                if right_value is None:
+                    return 0
+                return operation(left_node, right_value)
+        elif right_is_constant:
+            def node(row: int, column: int):
+                left_value = left_node(row, column)
+                if left_value is None:
+                    return 0
+                return operation(left_value, right_node)
+        else:
+            def node(row: int, column: int):
+                left_value = left_node(row, column)
+                right_value = right_node(row, column)
+                if left_value is None or right_value is None:
+                    return 0
+                return operation(left_value, right_value)
+        return False, node
+
+    @staticmethod
+    def compile_vectorized(template: tuple):
+        """
+        This method compiles a template into a function that evaluates many formulas of its shape at once.
+        Every cell reference becomes a slot, numbered in order of appearance, and the function takes one
+        list of values per slot, with one value per evaluated formula.
+        Only arithmetic over cells and numbers can be vectorized; functions and ranges cannot.
+
+        Keyword arguments:
+        template -- the template (tuple of nodes)
+        return -- a function from the lists of values of every slot to the list of results (callable),
+                  or None if the template cannot be vectorized or does not reference any cell
+        """
+        components = []
+        slots = 0
+        for node in template:
+            if node[0] == "operator":
+                components.append(Operator(node[1]))
+            elif node[0] == "parenthesis":
+                components.append(Parenthesis(node[1]))
+            elif node[0] == "number":
+                components.append(_CompiledOperand((True, node[1].get_value_as_operand())))
+            elif node[0] == "cell":
+                components.append(_CompiledOperand((False, lambda columns, slot=slots: columns[slot])))
+                slots += 1
+            else:
+                return None
+        stack = []
+        for component in ShuntingYard.generate_postfix_expression(components):
+            if isinstance(component, Operator):
+                right = stack.pop()
+                left = stack.pop()
+                stack.append(FormulaCompiler._compile_vectorized_operation(component, left, right))
+            else:
+                stack.append(component.compiled)
+        if len(stack) != 1 or slots == 0:
+            return None
+        return stack.pop()[1]
+
+    @staticmethod
+    def _compile_vectorized_operation(operator: Operator, left: tuple, right: tuple) -> tuple:
+        """
+        This method compiles an operation between two vectorized operands, applied to their whole
+        lists of values at once. An empty element (None) makes its result 0, as in Operator.compute.
+
+        Keyword arguments:
+        operator -- the operator (Operator)
+        left -- the compiled left operand (tuple)
+        right -- the compiled right operand (tuple)
+        return -- the compiled operation (tuple)
+        """
+        left_is_constant, left_node = left
+        right_is_constant, right_node = right
+        if left_is_constant and right_is_constant:
+            return True, operator.compute(left_node, right_node)
+
+        operation = operator.operation
+        if left_is_constant:
+            def node(columns):
+                values = right_node(columns)
+                if None not in values:
+                    return list(map(operation, repeat(left_node, len(values)), values))
+                return [0 if value is None else operation(left_node, value) for value in values]
+        elif right_is_constant:
+            def node(columns):
+                values = left_node(columns)
+                if None not in values:
+                    return list(map(operation, values, repeat(right_node, len(values))))
+                return [0 if value is None else operation(value, right_node) for value in values]
+        else:
+            def node(columns):
+                left_values = left_node(columns)
+                right_values = right_node(columns)
+                if None not in left_values and None not in right_values:
+                    return list(map(operation, left_values, right_values))
+                return [0 if left_value is None or right_value is None else operation(left_value, right_value)
+                        for left_value, right_value in zip(left_values, right_values)]
+        return False, node
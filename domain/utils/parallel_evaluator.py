@@ -0,0 +1,362 @@
+"""
+This file contains the ParallelLevelEvaluator class and the functions run by its worker processes.
+"""
+import heapq
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from domain.entities.content import Formula
+from domain.entities.function import Function
+from domain.entities.value import NumericalValue
+from domain.utils.formula_compiler import FormulaCompiler, TemplateReader
+
+_MIN_COST = 20000  # The estimated cost of a level below which it is evaluated without workers
+_AGGREGATE_SIZE = 4  # An argument is sent as its sum, number of values, minimum and maximum
+
+
+class _InputReader(TemplateReader):
+    """
+    This class reads the references of a template compiled in a worker from the inputs of the formula
+    being evaluated: every reference takes the next slots of the inputs, in the order of the template.
+    """
+    __slots__ = ("_inputs",)
+
+    def __init__(self, inputs: list) -> None:
+        """
+        This method initializes the reader.
+
+        Keyword arguments:
+        inputs -- the inputs of the formula being evaluated, shared by all its references (list)
+        """
+        self._inputs = inputs
+
+    def operand(self, row_offset: int, column_offset: int):
+        """
+        This method returns the reader of a cell used as an operand, whose value takes one slot.
+        """
+        inputs = self._inputs
+        index = len(inputs)
+        inputs.append(None)
+        return lambda row, column: inputs[index]
+
+    def argument(self, row_offset: int, column_offset: int):
+        """
+        This method returns the reader of a cell passed to a function, whose aggregates take four slots.
+        """
+        inputs = self._inputs
+        index = len(inputs)
+        inputs.extend([None] * _AGGREGATE_SIZE)
+        return lambda row, column: tuple(inputs[index:index + _AGGREGATE_SIZE])
+
+    def range(self, start_row_offset: int, start_column_offset: int, end_row_offset: int, end_column_offset: int):
+        """
+        This method returns the reader of a range passed to a function, whose aggregates take four slots.
+        """
+        return self.argument(start_row_offset, start_column_offset)
+
+
+_worker_programs = None  # The compiled program of every shape known to a worker process
+
+
+def _start_worker() -> None:
+    """
+    This function prepares a worker process of a parallel recalculation. A worker started during a
+    recalculation epoch must not keep the results of the functions between formulas.
+    """
+    global _worker_programs
+    _worker_programs = {}
+    Function.end_epoch()
+
+
+def _compile_template(template: tuple) -> tuple:
+    """
+    This function compiles a template into a program that reads its operands from a list of inputs,
+    in the order they appear in the template, as gathered by ParallelLevelEvaluator.gather_inputs.
+
+    Keyword arguments:
+    template -- the template of the formulas of a shape (tuple of nodes)
+    return -- the compiled program and the list of inputs it reads (tuple (callable, list))
+    """
+    inputs = []
+    return FormulaCompiler.compile_template(template, _InputReader(inputs)), inputs
+
+
+def _evaluate_chunk(templates: dict, shapes: list, lengths: array, values: array, empty: array,
+                    integers: array) -> tuple:
+    """
+    This function evaluates a chunk of formulas in a worker process.
+
+    Keyword arguments:
+    templates -- the templates of the shapes of the chunk that the worker has not been sent yet (dict of str -> tuple)
+    shapes -- the shape of every formula (list of str)
+    lengths -- the number of inputs of every formula (array of ints)
+    values -- the inputs of all the formulas, one after the other (array of floats)
+    empty -- the positions of the inputs that are empty (array of ints)
+    integers -- the positions of the inputs that are integers, such as the 0 of an operation with an
+                empty operand (array of ints)
+    return -- the results (array of floats), the positions of the empty results and of the integer results,
+              such as the 0 of an operation with an empty operand (arrays of ints), and the positions of the
+              formulas that could not be evaluated (list of ints)
+    """
+    for shape, template in templates.items():
+        if shape not in _worker_programs:
+            _worker_programs[shape] = _compile_template(template)
+    flat = values.tolist()
+    for position in empty:
+        flat[position] = None
+    for position in integers:
+        flat[position] = int(flat[position])
+    results = array('d', bytes(8 * len(shapes)))
+    empty_results = array('I')
+    integer_results = array('I')
+    failed = []
+    offset = 0
+    for index, (shape, length) in enumerate(zip(shapes, lengths)):
+        program, inputs = _worker_programs[shape]
+        inputs[:] = flat[offset:offset + length]
+        offset += length
+        try:
+            result = program(0, 0)  # The inputs do not depend on the position
+        except Exception:  # Evaluated again by the parent, which raises the error as usual
+            failed.append(index)
+            continue
+        if result is None:
+            empty_results.append(index)
+        elif isinstance(result, float):
+            results[index] = result
+        elif isinstance(result, int) and not isinstance(result, bool) and float(result) == result:
+            results[index] = result
+            integer_results.append(index)
+        else:
+            failed.append(index)
+    return results, empty_results, integer_results, failed
+
+
+class ParallelLevelEvaluator:
+    """
+    This class evaluates the formulas of a level of a recalculation, which do not depend on each other,
+    in worker processes. The parent process gathers the inputs of every formula: the values of the cells
+    it references and the aggregates of its ranges, which the aggregate index answers in O(log n) per
+    column. The inputs of each worker are sent as compact arrays. Every worker is a pool of its own, so
+    the parent knows the shapes it has compiled, and the template of a shape is sent to a worker only
+    the first time one of its formulas goes there. The results come back as arrays and are merged into
+    the spreadsheet by the parent.
+    The cost of a formula is estimated by the size of its template, the work a worker saves the parent,
+    and the formulas are spread across the workers by their cost, heaviest first, so no worker gets the
+    big formulas while the others wait. Levels that are too cheap to pay for sending them are left to
+    the parent before any input is gathered.
+    """
+
+    def __init__(self, processes: int = None, min_cost: int = _MIN_COST) -> None:
+        """
+        This method initializes the evaluator. The workers are started the first time they are needed.
+
+        Keyword arguments:
+        processes -- the number of worker processes, or None to use one per core (int)
+        min_cost -- the estimated cost of a level below which it is evaluated without workers (int)
+
+        Attributes:
+        _processes -- the number of worker processes (int)
+        _min_cost -- the estimated cost of a level below which it is evaluated without workers (int)
+        _workers -- the pool of one process of every worker, or None if they have not been started
+                    (list of ProcessPoolExecutors)
+        _shipped -- the shapes whose templates have been sent to every worker (list of sets of str)
+        _shapes -- the estimated cost of the formulas of every shape and where their inputs are
+                   (dict of str -> tuple (int, list))
+        """
+        if processes is not None and (not isinstance(processes, int) or processes < 1):
+            raise ValueError("The number of processes must be a positive integer.")
+        if not isinstance(min_cost, int) or min_cost < 0:
+            raise ValueError("The minimum cost must be a non-negative integer.")
+        self._processes = processes if processes is not None else os.cpu_count() or 1
+        self._min_cost = min_cost
+        self._workers = None
+        self._shipped = None
+        self._shapes = {}
+
+    @property
+    def processes(self):
+        """
+        Getter for the number of worker processes.
+        """
+        return self._processes
+
+    @staticmethod
+    def input_plan(template: tuple, path: tuple = (), as_argument: bool = False) -> list:
+        """
+        This method lists where the inputs of the formulas of a template are, in the order the compiled
+        template reads them: every cell used as an operand, whose value is sent, and every cell or range
+        passed to a function, whose aggregates are sent. The references of a template are relative to
+        the formula, so the same positions hold for all its formulas.
+
+        Keyword arguments:
+        template -- the template, or the arguments of a function (tuple of nodes)
+        path -- the position of the function whose arguments are listed, if any (tuple of ints)
+        as_argument -- True if the nodes are the arguments of a function (bool)
+        return -- the inputs (list of tuples (path, bool)), where the path is the position of the node
+                  in the template followed by its position in the arguments of every nested function,
+                  and the flag tells if the value of a cell is sent instead of aggregates
+        """
+        plan = []
+        for index, node in enumerate(template):
+            if node[0] == "function":
+                plan.extend(ParallelLevelEvaluator.input_plan(node[2], path + (index,), True))
+            elif node[0] == "cell" and not as_argument:
+                plan.append((path + (index,), True))
+            elif node[0] in ("cell", "range"):
+                plan.append((path + (index,), False))
+        return plan
+
+    @staticmethod
+    def template_cost(template: tuple) -> int:
+        """
+        This method estimates the cost of evaluating a formula of a template: its number of nodes,
+        counting the arguments of its functions.
+
+        Keyword arguments:
+        template -- the template of the formula (tuple of nodes)
+        return -- the estimated cost (int)
+        """
+        cost = 0
+        for node in template:
+            cost += 1
+            if node[0] == "function":
+                cost += ParallelLevelEvaluator.template_cost(node[2])
+        return cost
+
+    @staticmethod
+    def gather_inputs(template: tuple, plan: list, row: int, column: int, spreadsheet) -> list:
+        """
+        This method gathers the inputs of a formula: the value of every cell used as an operand, and the
+        aggregates of every cell or range passed to a function.
+
+        Keyword arguments:
+        template -- the template of the formula (tuple of nodes)
+        plan -- where the inputs are, as given by input_plan for the template (list)
+        row -- the row of the cell that holds the formula (int)
+        column -- the column of the cell that holds the formula, starting at 0 (int)
+        spreadsheet -- the spreadsheet (Spreadsheet)
+        return -- the inputs (list)
+        """
+        inputs = []
+        for path, as_operand in plan:
+            node = template[path[0]]
+            for index in path[1:]:
+                node = node[2][index]
+            if as_operand:
+                value = spreadsheet.get_operand_at(row + node[1], column + node[2])
+                if value is not None and not isinstance(value, (int, float)):
+                    raise ValueError("The value must be a number.")
+                if isinstance(value, int) and float(value) != value:  # It could not be sent as a double
+                    raise ValueError("The value is too big.")
+                inputs.append(value)
+            elif node[0] == "cell":
+                inputs.extend(spreadsheet.get_argument_at(row + node[1], column + node[2]))
+            else:
+                inputs.extend(spreadsheet.aggregate_index.query(row + node[1], column + node[2],
+                                                                row + node[3], column + node[4]))
+        return inputs
+
+    def evaluate(self, formulas: list, template_of, spreadsheet) -> list:
+        """
+        This method evaluates a level of formulas in the worker processes, if it is expensive enough.
+
+        Keyword arguments:
+        formulas -- the formula cells, which do not depend on each other (list of Cells)
+        template_of -- the function that returns the template of a formula cell (callable)
+        spreadsheet -- the spreadsheet, which the inputs are read from and the values are written to (Spreadsheet)
+        return -- the formula cells left for the parent to evaluate: all of them if the level is cheap,
+                  and otherwise those that could not be sent or evaluated in a worker (list of Cells)
+        """
+        if self._processes < 2 or len(formulas) < 2:
+            return formulas
+        costed = []  # The formula cells that can be sent, their costs and the plans of their inputs
+        left = []
+        total_cost = 0
+        for formula in formulas:
+            content = formula.content
+            if not isinstance(content, Formula) or content.shape is None:
+                left.append(formula)
+                continue
+            shape = self._shapes.get(content.shape)
+            if shape is None:
+                template = template_of(formula)
+                shape = self._shapes[content.shape] = (self.template_cost(template), self.input_plan(template))
+            costed.append((formula, shape))
+            total_cost += shape[0]
+        if total_cost < self._min_cost:
+            return formulas
+
+        bins = [(0, worker, []) for worker in range(self._processes)]  # The heaviest go first to the lightest bin
+        for formula, (cost, plan) in sorted(costed, key=lambda item: item[1][0], reverse=True):
+            try:
+                identifier = formula.identifier
+                inputs = self.gather_inputs(template_of(formula), plan, identifier.row_number,
+                                            identifier.column_number, spreadsheet)
+            except ValueError:  # Evaluated by the parent, which raises the error as usual
+                left.append(formula)
+                continue
+            bin_cost, worker, chunk = heapq.heappop(bins)
+            chunk.append((formula, inputs))
+            heapq.heappush(bins, (bin_cost + cost, worker, chunk))
+
+        if self._workers is None:
+            self._workers = [ProcessPoolExecutor(1, initializer=_start_worker) for _ in range(self._processes)]
+            self._shipped = [set() for _ in range(self._processes)]
+        tasks = []
+        for _, worker, chunk in bins:
+            if not chunk:
+                continue
+            shipped = self._shipped[worker]
+            templates = {}
+            shapes = []
+            lengths = array('I')
+            values = array('d')
+            empty = array('I')
+            integers = array('I')
+            for formula, inputs in chunk:
+                shape = formula.content.shape
+                if shape not in shipped:
+                    templates[shape] = template_of(formula)
+                    shipped.add(shape)
+                shapes.append(shape)
+                lengths.append(len(inputs))
+                for value in inputs:
+                    if value is None:
+                        empty.append(len(values))
+                        value = 0
+                    elif isinstance(value, int):
+                        integers.append(len(values))
+                    values.append(value)
+            task = self._workers[worker].submit(_evaluate_chunk, templates, shapes, lengths, values, empty, integers)
+            tasks.append((worker, chunk, task))
+
+        for worker, chunk, task in tasks:
+            try:
+                results, empty_results, integer_results, failed = task.result()
+            except Exception:
+                self._shipped[worker].clear()  # The worker may not have compiled the templates it was sent
+                raise
+            results = results.tolist()
+            for index in empty_results:
+                results[index] = None
+            for index in integer_results:
+                results[index] = int(results[index])
+            failed = set(failed)
+            for index, (formula, _) in enumerate(chunk):
+                if index in failed:
+                    left.append(formula)
+                    continue
+                formula.content.value = NumericalValue(results[index])
+                spreadsheet.update_cell_value(formula)
+        return left
+
+    def close(self) -> None:
+        """
+        This method stops the worker processes.
+        """
+        if self._workers is not None:
+            for worker in self._workers:
+                worker.shutdown()
+            self._workers = None
+            self._shipped = None
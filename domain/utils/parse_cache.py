@@ -0,0 +1,97 @@
+"""
+This file contains the ParseCache class.
+"""
+from collections import OrderedDict
+
+
+class ParseCache:
+    """
+    This class is a bounded cache of parsed formulas that evicts the least recently used entry
+    when it is full. It counts its hits and misses, so the benefit of the cache can be measured.
+    """
+
+    def __init__(self, maxsize: int = 4096) -> None:
+        """
+        This method initializes the parse cache.
+
+        Keyword arguments:
+        maxsize -- the maximum number of entries (int)
+
+        Attributes:
+        _maxsize -- the maximum number of entries (int)
+        _entries -- the entries, from the least to the most recently used (OrderedDict)
+        _hits -- the number of lookups that found their entry (int)
+        _misses -- the number of lookups that did not find their entry (int)
+        """
+        if not isinstance(maxsize, int) or maxsize < 1:
+            raise ValueError("The maximum size must be a positive integer.")
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self) -> int:
+        """
+        This method returns the number of entries in the cache.
+        """
+        return len(self._entries)
+
+    @property
+    def maxsize(self):
+        """
+        Getter for the maximum number of entries.
+        """
+        return self._maxsize
+
+    @property
+    def hits(self):
+        """
+        Getter for the number of lookups that found their entry.
+        """
+        return self._hits
+
+    @property
+    def misses(self):
+        """
+        Getter for the number of lookups that did not find their entry.
+        """
+        return self._misses
+
+    def get(self, key):
+        """
+        This method looks up an entry and marks it as the most recently used.
+
+        Keyword arguments:
+        key -- the key of the entry (hashable)
+        return -- the value of the entry or None if it is not in the cache
+        """
+        value = self._entries.get(key)
+        if value is None:
+            self._misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return value
+
+    def put(self, key, value) -> None:
+        """
+        This method adds an entry, evicting the least recently used one if the cache is full.
+
+        Keyword arguments:
+        key -- the key of the entry (hashable)
+        value -- the value of the entry, not None (any)
+        """
+        if value is None:
+            raise ValueError("The value can not be None.")
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        This method removes every entry and resets the counters.
+        """
+        self._entries.clear()
+        self._hits = 0
+        self._misses = 0
@@ -0,0 +1,177 @@
+"""
+This file contains the RangeIndex class.
+"""
+
+_LEVEL_BITS = 6  # The size of a block is 2^level, with a level below 2^_LEVEL_BITS
+_LEVEL_MASK = (1 << _LEVEL_BITS) - 1
+_LEVELS_MASK = (1 << 2 * _LEVEL_BITS) - 1  # The pair of sizes of a bucket key
+_COLUMN_BLOCK_SHIFT = 2 * _LEVEL_BITS
+_ROW_BLOCK_SHIFT = _COLUMN_BLOCK_SHIFT + 24  # Columns below 2^24, as in the cell identifiers
+
+
+class RangeIndex:
+    """
+    This class is a spatial index of rectangles over (row, column), such as the ranges read by formulas.
+    It answers "which owners have a rectangle that contains this cell?" without expanding the rectangles
+    cell by cell, so its memory grows with the number of rectangles and not with their area.
+
+    It is a segment tree in both directions: the rows of a rectangle are split into aligned blocks of
+    2^i rows, at most two of every size, and so are its columns, and the rectangle is stored in every
+    pair of a block of rows and a block of columns. The blocks that contain a cell are one per size in
+    each direction, so a query visits one bucket per pair of sizes in use, and every rectangle found in
+    them contains the cell, however many rectangles overlap or share their corner, such as the prefixes
+    A1:A1, A1:A2, ...
+    The columns must be below 2^24, as the ones of the cell identifiers.
+    """
+
+    def __init__(self) -> None:
+        """
+        This method initializes the range index.
+        Most buckets hold a single rectangle and most owners have a single rectangle, so they are
+        kept as the owner and the rectangle themselves, and only become a dict or a list when they grow.
+
+        Attributes:
+        _buckets -- the owners of the rectangles of every bucket, by the packed key of the bucket, as the
+                    owner of its only rectangle or a dict of owner -> the number of its rectangles stored
+                    in the bucket (dict of int -> owner or dict)
+        _levels -- the number of buckets in use in every pair of sizes, by the packed pair (dict of int -> int)
+        _owners -- the rectangles of every owner (dict of owner -> tuple or list of tuples)
+        _size -- the number of rectangles in the index (int)
+        """
+        self._buckets = {}
+        self._levels = {}
+        self._owners = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        """
+        This method returns the number of rectangles in the index.
+        """
+        return self._size
+
+    @staticmethod
+    def _blocks(start: int, end: int) -> list:
+        """
+        This method splits an interval into aligned blocks, taking at every step the biggest block
+        that starts there and does not go past the end.
+
+        Keyword arguments:
+        start, end -- the bounds of the interval, inclusive (int)
+        return -- the blocks (list of tuples (level, index)), where a block covers the positions from
+                  index * 2^level to (index + 1) * 2^level - 1
+        """
+        blocks = []
+        while start <= end:
+            level = (end - start + 1).bit_length() - 1
+            if start:
+                level = min(level, (start & -start).bit_length() - 1)
+            blocks.append((level, start >> level))
+            start += 1 << level
+        return blocks
+
+    def _bucket_keys(self, start_row: int, start_column: int, end_row: int, end_column: int) -> list:
+        """
+        This method returns the keys of the buckets where a rectangle is stored. A key packs the block
+        of rows, the block of columns and the pair of sizes, which takes its lowest _LEVEL_BITS * 2 bits.
+
+        Keyword arguments:
+        start_row, start_column, end_row, end_column -- the bounds of the rectangle, inclusive (int)
+        return -- the keys of the buckets (list of ints)
+        """
+        column_blocks = self._blocks(start_column, end_column)
+        return [(row_block << _ROW_BLOCK_SHIFT) | (column_block << _COLUMN_BLOCK_SHIFT)
+                | (row_level << _LEVEL_BITS) | column_level
+                for row_level, row_block in self._blocks(start_row, end_row)
+                for column_level, column_block in column_blocks]
+
+    def add(self, owner, start_row: int, start_column: int, end_row: int, end_column: int) -> None:
+        """
+        This method adds a rectangle to the index. Empty rectangles are ignored.
+
+        Keyword arguments:
+        owner -- the owner of the rectangle, for example the identifier of a formula cell (hashable)
+        start_row, start_column, end_row, end_column -- the bounds of the rectangle, inclusive (int)
+        """
+        if start_row > end_row or start_column > end_column:
+            return
+        buckets = self._buckets
+        for key in self._bucket_keys(start_row, start_column, end_row, end_column):
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = owner
+                levels = key & _LEVELS_MASK
+                self._levels[levels] = self._levels.get(levels, 0) + 1
+            elif type(bucket) is dict:
+                bucket[owner] = bucket.get(owner, 0) + 1
+            else:
+                buckets[key] = {bucket: 2} if bucket == owner else {bucket: 1, owner: 1}
+        rectangle = (start_row, start_column, end_row, end_column)
+        rectangles = self._owners.get(owner)
+        if rectangles is None:
+            self._owners[owner] = rectangle
+        elif type(rectangles) is list:
+            rectangles.append(rectangle)
+        else:
+            self._owners[owner] = [rectangles, rectangle]
+        self._size += 1
+
+    def remove(self, owner) -> None:
+        """
+        This method removes all the rectangles of an owner.
+
+        Keyword arguments:
+        owner -- the owner of the rectangles (hashable)
+        """
+        buckets = self._buckets
+        for rectangle in self.rectangles(owner):
+            for key in self._bucket_keys(*rectangle):
+                bucket = buckets[key]
+                if type(bucket) is dict:
+                    if bucket[owner] > 1:
+                        bucket[owner] -= 1
+                        continue
+                    del bucket[owner]
+                    if bucket:
+                        continue
+                del buckets[key]
+                levels = key & _LEVELS_MASK
+                self._levels[levels] -= 1
+                if self._levels[levels] == 0:
+                    del self._levels[levels]
+            self._size -= 1
+        self._owners.pop(owner, None)
+
+    def rectangles(self, owner) -> list:
+        """
+        This method returns the rectangles of an owner.
+
+        Keyword arguments:
+        owner -- the owner of the rectangles (hashable)
+        return -- the rectangles (list of tuples (start_row, start_column, end_row, end_column))
+        """
+        rectangles = self._owners.get(owner)
+        if rectangles is None:
+            return []
+        return list(rectangles) if type(rectangles) is list else [rectangles]
+
+    def query(self, row: int, column: int) -> list:
+        """
+        This method returns the owners of the rectangles that contain a cell.
+        An owner with several rectangles that contain the cell is returned once.
+
+        Keyword arguments:
+        row -- the row of the cell (int)
+        column -- the column of the cell (int)
+        return -- the owners (list)
+        """
+        owners = {}  # A dict keeps the owners unique and in insertion order
+        buckets = self._buckets
+        for levels in self._levels:
+            bucket = buckets.get(((row >> (levels >> _LEVEL_BITS)) << _ROW_BLOCK_SHIFT)
+                                 | ((column >> (levels & _LEVEL_MASK)) << _COLUMN_BLOCK_SHIFT) | levels)
+            if bucket is not None:
+                if type(bucket) is dict:
+                    owners.update(bucket)
+                else:
+                    owners[bucket] = 1
+        return list(owners)
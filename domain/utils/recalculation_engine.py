@@ -0,0 +1,225 @@
+"""
+This file contains the RecalculationEngine class.
+"""
+from domain.entities.spreadsheet import Spreadsheet
+from domain.entities.cell import CellIdentifier
+from domain.entities.content import Formula
+from domain.entities.function import Function
+from domain.utils.dependency_manager import DependencyManager
+
+
+class RecalculationEngine:
+    """
+    This class is responsible for recalculating the formulas affected by a change.
+    Every cell that transitively depends on a changed cell is marked as dirty, the dirty
+    cells are ordered topologically and each one of them is evaluated at most once.
+    The dirty cells are grouped in levels: the cells of a level only depend on cells of previous
+    levels, so a whole level can be handed to the evaluator at once.
+    Only the dirty formulas that read a cell whose value has actually changed are evaluated: the
+    direct dependents of a changed cell are stale, and so are the dependents of every formula whose
+    new value differs from its old one. A formula that evaluates to the same value, such as a MAX
+    whose maximum did not move, cuts the propagation off, and the formulas after it that are not
+    stale for another reason are skipped.
+    The dirty cells can also be left dirty and evaluated on demand, only those a read cell needs.
+    """
+
+    def __init__(self, spreadsheet: Spreadsheet, dependency_manager: DependencyManager, evaluate,
+                 evaluate_many=None) -> None:
+        """
+        This method initializes the recalculation engine.
+
+        Keyword arguments:
+        spreadsheet -- the spreadsheet (Spreadsheet)
+        dependency_manager -- the dependency manager of the spreadsheet (DependencyManager)
+        evaluate -- the function that evaluates a formula cell (callable)
+        evaluate_many -- the function that evaluates a list of independent formula cells (callable, optional)
+
+        Attributes:
+        _spreadsheet -- the spreadsheet (Spreadsheet)
+        _dependency_manager -- the dependency manager (DependencyManager)
+        _evaluate -- the function that evaluates a formula cell (callable)
+        _evaluate_many -- the function that evaluates a list of independent formula cells (callable or None)
+        _dirty -- the identifiers of the cells waiting to be recalculated (set of CellIdentifiers)
+        _stale -- the dirty cells that read a cell whose value has changed, so they must be evaluated
+                  (set of CellIdentifiers)
+        _evaluated -- the number of formulas evaluated by the last recalculation (int)
+        _cut_off -- the number of dirty formulas skipped by the last recalculation because none of the
+                    cells they read changed its value (int)
+        """
+        self._spreadsheet = spreadsheet
+        self._dependency_manager = dependency_manager
+        self._evaluate = evaluate
+        self._evaluate_many = evaluate_many
+        self._dirty = set()
+        self._stale = set()
+        self._evaluated = 0
+        self._cut_off = 0
+
+    @property
+    def dirty(self):
+        """
+        Getter for the dirty cells.
+        """
+        return self._dirty
+
+    @property
+    def evaluated_count(self):
+        """
+        Getter for the number of formulas evaluated by the last recalculation.
+        """
+        return self._evaluated
+
+    @property
+    def cut_off_count(self):
+        """
+        Getter for the number of dirty formulas skipped by the last recalculation because their inputs
+        kept their values.
+        """
+        return self._cut_off
+
+    def mark_dirty(self, identifier: CellIdentifier) -> None:
+        """
+        This method marks a changed cell and every cell that transitively depends on it as dirty.
+        The cell and its direct dependents are stale, since the content of the cell has changed.
+        The graph is walked iteratively, so long chains do not hit the recursion limit.
+
+        Keyword arguments:
+        identifier -- the identifier of the changed cell (CellIdentifier)
+        """
+        pending = [identifier]
+        self._dirty.add(identifier)
+        self._stale.add(identifier)
+        self._stale.update(self._dependency_manager.get_dependents(identifier))
+        while pending:
+            current = pending.pop()
+            for dependent in self._dependency_manager.get_dependents(current):
+                if dependent not in self._dirty:
+                    self._dirty.add(dependent)
+                    pending.append(dependent)
+
+    def mark_all_dirty(self, identifiers) -> None:
+        """
+        This method marks a group of cells as dirty and stale without walking their dependents, so all
+        of them are evaluated. It is meant for groups that already contain all their dependents, such as
+        all the formulas of a spreadsheet.
+
+        Keyword arguments:
+        identifiers -- the identifiers of the cells (iterable of CellIdentifiers)
+        """
+        identifiers = set(identifiers)
+        self._dirty.update(identifiers)
+        self._stale.update(identifiers)
+
+    def topological_order(self, cells: set) -> list:
+        """
+        This method orders a set of cells so every cell comes after the cells it depends on.
+
+        Keyword arguments:
+        cells -- the identifiers of the cells to order (set of CellIdentifiers)
+        return -- the ordered identifiers (list of CellIdentifiers)
+        """
+        return [identifier for level in self.levels(cells) for identifier in level]
+
+    def levels(self, cells: set) -> list:
+        """
+        This method splits a set of cells in levels, so every cell comes in a later level than the
+        cells it depends on and the cells of a level do not depend on each other.
+        Only the edges between the cells of the set are taken into account (Kahn's algorithm, one
+        level at a time).
+
+        Keyword arguments:
+        cells -- the identifiers of the cells to split (set of CellIdentifiers)
+        return -- the levels (list of lists of CellIdentifiers)
+        """
+        in_degree = dict.fromkeys(cells, 0)
+        dependents = {}
+        for identifier in cells:
+            inside = {d for d in self._dependency_manager.get_dependents(identifier) if d in in_degree}
+            dependents[identifier] = inside
+            for dependent in inside:
+                in_degree[dependent] += 1
+
+        level = [identifier for identifier, degree in in_degree.items() if degree == 0]
+        levels = []
+        while level:
+            levels.append(level)
+            next_level = []
+            for identifier in level:
+                for dependent in dependents[identifier]:
+                    in_degree[dependent] -= 1
+                    if in_degree[dependent] == 0:
+                        next_level.append(dependent)
+            level = next_level
+        return levels
+
+    def recalculate(self) -> None:
+        """
+        This method evaluates every dirty formula once, level by level, and clears the dirty set.
+        """
+        dirty = self._dirty
+        self._dirty = set()
+        self._evaluate_levels(dirty)
+
+    def recalculate_needed(self, identifiers) -> None:
+        """
+        This method evaluates only the dirty formulas that the given cells need: the cells themselves and
+        the dirty formulas they transitively read. The rest of the dirty cells stay dirty.
+        A clean cell never reads a dirty one, because every cell that depends on a dirty cell is dirty too,
+        so the search stops at the clean cells.
+
+        Keyword arguments:
+        identifiers -- the identifiers of the cells whose values are needed (iterable of CellIdentifiers)
+        """
+        needed = set()
+        pending = [identifier for identifier in identifiers if identifier in self._dirty]
+        needed.update(pending)
+        while pending:
+            current = pending.pop()
+            for dependency in self._dependency_manager.get_formula_dependencies(current):
+                if dependency in self._dirty and dependency not in needed:
+                    needed.add(dependency)
+                    pending.append(dependency)
+        if needed:
+            self._dirty -= needed
+            self._evaluate_levels(needed)
+
+    def _evaluate_levels(self, cells: set) -> None:
+        """
+        This method evaluates the stale formulas of a set of cells once, level by level, and makes the
+        dependents of the formulas whose values change stale. The cells leave the stale set, evaluated
+        or not, even if an evaluation fails.
+        The evaluation is a recalculation epoch, so every function shared by many formulas is computed once.
+
+        Keyword arguments:
+        cells -- the identifiers of the cells (set of CellIdentifiers)
+        """
+        stale = self._stale
+        order = self._dependency_manager.order
+        self._evaluated = 0
+        self._cut_off = 0
+        Function.start_epoch()
+        try:
+            for level in self.levels(cells):
+                formulas = []
+                for identifier in level:
+                    if identifier not in stale:
+                        if identifier in order:  # Only the formulas count, not the changed cells
+                            self._cut_off += 1
+                        continue
+                    cell = self._spreadsheet.get_cell(identifier)
+                    if cell is not None and isinstance(cell.content, Formula):
+                        formulas.append(cell)
+                previous_values = [cell.content.value.value for cell in formulas]
+                if self._evaluate_many is not None and len(formulas) > 1:
+                    self._evaluate_many(formulas)
+                else:
+                    for cell in formulas:
+                        self._evaluate(cell)
+                self._evaluated += len(formulas)
+                for cell, previous_value in zip(formulas, previous_values):
+                    value = cell.content.value.value
+                    if value != previous_value or type(value) is not type(previous_value):  # 0 and 0.0 print differently
+                        stale.update(self._dependency_manager.get_dependents(cell.identifier))
+        finally:
+            Function.end_epoch()
+            stale.difference_update(cells)
@@ -0,0 +1,273 @@
+"""
+This file contains the SparseGrid class.
+"""
+import bisect
+
+_TILE_BITS = 6  # Tiles are 64 rows by 64 columns
+_TILE_SIZE = 1 << _TILE_BITS
+_TILE_MASK = _TILE_SIZE - 1
+
+
+def _set_bits(mask: int):
+    """
+    This function yields the positions of the bits set in a mask, from the lowest to the highest.
+    """
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+def _bit_range(low: int, high: int) -> int:
+    """
+    This function returns a mask with the bits from low to high set, both inclusive.
+    """
+    return ((2 << high) - 1) ^ ((1 << low) - 1)
+
+
+class _Tile:
+    """
+    This class is a tile of 64 rows by 64 columns of a SparseGrid.
+    """
+    __slots__ = ("rows", "masks", "count")
+
+    def __init__(self) -> None:
+        """
+        This method initializes an empty tile.
+
+        Attributes:
+        rows -- the bitmap of the rows of the tile that have an occupied position (int)
+        masks -- the bitmap of the occupied columns of every row of the tile (list of ints)
+        count -- the number of occupied positions of the tile (int)
+        """
+        self.rows = 0
+        self.masks = [0] * _TILE_SIZE
+        self.count = 0
+
+
+class SparseGrid:
+    """
+    This class keeps the occupied positions (row, column) of a sheet in tiles of 64 rows by 64 columns,
+    keyed by the coordinates of the tile. Every tile has an occupancy bitmap for each of its rows and a
+    bitmap of the rows that are not empty. The tiles of every band of 64 rows are kept sorted by column,
+    and the bands of every column of tiles are kept sorted too. The occupied positions are listed in
+    row-major order, for the whole sheet or inside a rectangle, visiting only the tiles that intersect
+    the rectangle and the rows that are not empty, so the cost depends on the occupied positions and
+    not on the area, and nothing has to be sorted.
+    """
+
+    def __init__(self) -> None:
+        """
+        This method initializes the grid.
+
+        Attributes:
+        _tiles -- the tiles with occupied positions (dict of (band, tile column) -> _Tile)
+        _bands -- the bands of 64 rows that have tiles, sorted (list of ints)
+        _band_columns -- the columns of the tiles of every band, sorted (dict of int -> list of ints)
+        _column_bands -- the bands of the tiles of every column of tiles, sorted (dict of int -> list of ints)
+        _count -- the number of occupied positions (int)
+        """
+        self._tiles = {}
+        self._bands = []
+        self._band_columns = {}
+        self._column_bands = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        """
+        This method returns the number of occupied positions.
+        """
+        return self._count
+
+    def __iter__(self):
+        """
+        This method returns an iterator of the occupied positions in row-major order.
+        """
+        return self.positions(0, 0)
+
+    def rows(self, start_row: int = 0):
+        """
+        This method returns an iterator of the occupied rows in order, each one with its occupied columns.
+        The grid must not be changed while the iterator is being used.
+
+        Keyword arguments:
+        start_row -- the first row (int)
+        return -- the rows (iterator of tuples (row, list of columns))
+        """
+        start_row = max(start_row, 0)
+        for band in self._bands[bisect.bisect_left(self._bands, start_row >> _TILE_BITS):]:
+            tiles = [(self._tiles[(band, tile_column)].masks, tile_column << _TILE_BITS)
+                     for tile_column in self._band_columns[band]]
+            rows = 0
+            for tile_column in self._band_columns[band]:
+                rows |= self._tiles[(band, tile_column)].rows
+            band_base = band << _TILE_BITS
+            if start_row > band_base:
+                rows &= _bit_range(start_row - band_base, _TILE_MASK)
+            for offset in _set_bits(rows):
+                columns = []
+                for masks, base in tiles:
+                    mask = masks[offset]
+                    while mask:
+                        lowest = mask & -mask
+                        columns.append(base + lowest.bit_length() - 1)
+                        mask ^= lowest
+                yield band_base + offset, columns
+
+    def contains(self, row: int, column: int) -> bool:
+        """
+        This method checks if a position is occupied.
+
+        Keyword arguments:
+        row -- the row (int)
+        column -- the column (int)
+        return -- True if the position is occupied, False otherwise (bool)
+        """
+        tile = self._tiles.get((row >> _TILE_BITS, column >> _TILE_BITS))
+        return tile is not None and (tile.masks[row & _TILE_MASK] >> (column & _TILE_MASK)) & 1 == 1
+
+    def add(self, row: int, column: int) -> bool:
+        """
+        This method marks a position as occupied.
+
+        Keyword arguments:
+        row -- the row (int)
+        column -- the column (int)
+        return -- True if the position was empty, False otherwise (bool)
+        """
+        tile = self._tile(row >> _TILE_BITS, column >> _TILE_BITS)
+        offset = row & _TILE_MASK
+        bit = 1 << (column & _TILE_MASK)
+        if tile.masks[offset] & bit:
+            return False
+        tile.masks[offset] |= bit
+        tile.rows |= 1 << offset
+        tile.count += 1
+        self._count += 1
+        return True
+
+    def add_column(self, column: int, rows) -> None:
+        """
+        This method marks many positions of a column as occupied at once.
+
+        Keyword arguments:
+        column -- the column (int)
+        rows -- the rows, in ascending order (iterable of ints)
+        """
+        tile_column = column >> _TILE_BITS
+        bit = 1 << (column & _TILE_MASK)
+        band = None
+        tile = None
+        for row in rows:
+            if row >> _TILE_BITS != band:
+                band = row >> _TILE_BITS
+                tile = self._tile(band, tile_column)
+            offset = row & _TILE_MASK
+            if not tile.masks[offset] & bit:
+                tile.masks[offset] |= bit
+                tile.rows |= 1 << offset
+                tile.count += 1
+                self._count += 1
+
+    def _tile(self, band: int, tile_column: int) -> _Tile:
+        """
+        This method returns a tile, creating it if it does not exist.
+
+        Keyword arguments:
+        band -- the band of 64 rows of the tile (int)
+        tile_column -- the column of tiles of the tile (int)
+        return -- the tile (_Tile)
+        """
+        tile = self._tiles.get((band, tile_column))
+        if tile is None:
+            tile = self._tiles[(band, tile_column)] = _Tile()
+            columns = self._band_columns.get(band)
+            if columns is None:
+                columns = self._band_columns[band] = []
+                bisect.insort(self._bands, band)
+            bisect.insort(columns, tile_column)
+            bisect.insort(self._column_bands.setdefault(tile_column, []), band)
+        return tile
+
+    def discard(self, row: int, column: int) -> bool:
+        """
+        This method marks a position as empty. Tiles are freed when their last position is emptied.
+
+        Keyword arguments:
+        row -- the row (int)
+        column -- the column (int)
+        return -- True if the position was occupied, False otherwise (bool)
+        """
+        key = (row >> _TILE_BITS, column >> _TILE_BITS)
+        tile = self._tiles.get(key)
+        offset = row & _TILE_MASK
+        bit = 1 << (column & _TILE_MASK)
+        if tile is None or not tile.masks[offset] & bit:
+            return False
+        tile.masks[offset] ^= bit
+        if not tile.masks[offset]:
+            tile.rows ^= 1 << offset
+        tile.count -= 1
+        self._count -= 1
+        if not tile.count:
+            del self._tiles[key]
+            columns = self._band_columns[key[0]]
+            del columns[bisect.bisect_left(columns, key[1])]
+            if not columns:
+                del self._band_columns[key[0]]
+                del self._bands[bisect.bisect_left(self._bands, key[0])]
+            bands = self._column_bands[key[1]]
+            del bands[bisect.bisect_left(bands, key[0])]
+            if not bands:
+                del self._column_bands[key[1]]
+        return True
+
+    def positions(self, start_row: int, start_column: int, end_row: int = None, end_column: int = None):
+        """
+        This method returns an iterator of the occupied positions inside a rectangle in row-major order.
+        The grid must not be changed while the iterator is being used.
+
+        Keyword arguments:
+        start_row, start_column -- the first row and column of the rectangle (int)
+        end_row, end_column -- the last row and column of the rectangle, inclusive, or None to reach
+                               the end of the sheet (int)
+        return -- the positions (iterator of tuples (row, column))
+        """
+        bands = self._bands
+        first_band = max(start_row, 0) >> _TILE_BITS
+        last_band = end_row >> _TILE_BITS if end_row is not None else None
+        first_tile_column = max(start_column, 0) >> _TILE_BITS
+        last_tile_column = end_column >> _TILE_BITS if end_column is not None else None
+        if (end_row is not None and start_row > end_row) or (end_column is not None and start_column > end_column):
+            return
+        start = bisect.bisect_left(bands, first_band)
+        stop = bisect.bisect_right(bands, last_band) if last_band is not None else len(bands)
+        if last_tile_column is not None and last_tile_column - first_tile_column < stop - start:
+            # Few columns of tiles: only the bands where they have tiles are visited
+            selected = set()
+            for tile_column in range(first_tile_column, last_tile_column + 1):
+                column_bands = self._column_bands.get(tile_column, [])
+                end = bisect.bisect_right(column_bands, last_band) if last_band is not None else len(column_bands)
+                selected.update(column_bands[bisect.bisect_left(column_bands, first_band):end])
+            bands = sorted(selected)
+        else:
+            bands = bands[start:stop]
+        for band in bands:
+            columns = self._band_columns[band]
+            stop = bisect.bisect_right(columns, last_tile_column) if last_tile_column is not None else len(columns)
+            tiles = []
+            rows = 0
+            for tile_column in columns[bisect.bisect_left(columns, first_tile_column):stop]:
+                tile = self._tiles[(band, tile_column)]
+                base = tile_column << _TILE_BITS
+                high = min(end_column - base, _TILE_MASK) if end_column is not None else _TILE_MASK
+                tiles.append((tile.masks, base, _bit_range(max(start_column - base, 0), high)))
+                rows |= tile.rows
+            band_base = band << _TILE_BITS
+            high = min(end_row - band_base, _TILE_MASK) if end_row is not None else _TILE_MASK
+            rows &= _bit_range(max(start_row - band_base, 0), high)
+            for offset in _set_bits(rows):
+                row = band_base + offset
+                for masks, base, column_mask in tiles:
+                    for bit in _set_bits(masks[offset] & column_mask):
+                        yield row, base + bit
@@ -3,6 +3,9 @@ This file contains the tokenizer, Token and TokenType classes.
 """
 from enum import Enum
 import re
+from domain.utils.utils import base26_to_int
+
+_CELL_RE = re.compile(r'([A-Z]+)([0-9]+)', re.IGNORECASE)
 
 _TOKEN_RE = re.compile(r'''
     \s*(?:              # Optional whitespace, followed by one of:
@@ -38,6 +41,7 @@ class Token:
     """
     This class represents a token.
     """
+    __slots__ = ("type", "value")
 
     def __init__(self, token_type: TokenType, value: str):
         """
@@ -93,3 +97,25 @@ class Tokenizer:
                 yield Token(TokenType.FUNCTION, func.upper())  # Converting function name to uppercase
             else:
                 raise SyntaxError("Expected a token but found {!r}".format(error))
+
+    @staticmethod
+    def relative_form(tokens: list, row: int, column: int) -> str:
+        """
+        This method writes a sequence of tokens with every cell reference relative to the cell
+        that holds the formula, in R1C1 notation. Formulas that are the same up to relative offsets,
+        such as =A2*B2 in C2 and =A3*B3 in C3, have the same relative form: R[0]C[-2]*R[0]C[-1].
+
+        Keyword arguments:
+        tokens -- the tokens of the formula (list of Tokens)
+        row -- the row of the cell that holds the formula (int)
+        column -- the column of the cell that holds the formula, starting at 0 (int)
+        return -- the relative form (str)
+        """
+        parts = []
+        for token in tokens:
+            if token.type == TokenType.CELL_IDENTIFIER:
+                for letters, digits in _CELL_RE.findall(token.value):  # A range token holds two cells
+                    parts.append("R[{}]C[{}]".format(int(digits) - row, base26_to_int(letters.upper()) - column))
+            else:
+                parts.append(token.value)
+        return " ".join(parts)
@@ -0,0 +1,151 @@
+"""
+This file contains the TopologicalOrder class.
+"""
+
+
+class TopologicalOrder:
+    """
+    This class keeps a topological order of a directed graph while edges are added, following the
+    dynamic topological sort algorithm of Pearce and Kelly.
+    Every node has an integer position, and every edge goes from a lower position to a higher one.
+    When a new edge breaks that rule, only the nodes whose positions lie between the two ends of the
+    edge are visited and reordered, so the cost of an insertion is proportional to the region it
+    affects and not to the size of the graph. The searches are iterative, so long chains do not hit
+    the recursion limit.
+    Removing edges never breaks the order, so it needs no work.
+    """
+
+    def __init__(self, get_successors, get_predecessors) -> None:
+        """
+        This method initializes the topological order.
+
+        Keyword arguments:
+        get_successors -- the function that returns the nodes a node has edges to (callable)
+        get_predecessors -- the function that returns the nodes that have edges to a node (callable)
+
+        Attributes:
+        _positions -- the position of every node (dict of node -> int)
+        _top -- the position for the next node added at the top (int)
+        _bottom -- the position for the next node added at the bottom (int)
+        """
+        self._get_successors = get_successors
+        self._get_predecessors = get_predecessors
+        self._positions = {}
+        self._top = 0
+        self._bottom = -1
+
+    def __contains__(self, node) -> bool:
+        """
+        This method checks if a node is in the order.
+        """
+        return node in self._positions
+
+    def __len__(self) -> int:
+        """
+        This method returns the number of nodes in the order.
+        """
+        return len(self._positions)
+
+    def position(self, node):
+        """
+        This method returns the position of a node.
+
+        Keyword arguments:
+        node -- the node (hashable)
+        return -- the position of the node (int) or None if the node is not in the order
+        """
+        return self._positions.get(node)
+
+    def add_top(self, node) -> None:
+        """
+        This method adds a node after every other node. It is valid for nodes without successors.
+
+        Keyword arguments:
+        node -- the node (hashable)
+        """
+        self._positions[node] = self._top
+        self._top += 1
+
+    def add_bottom(self, node) -> None:
+        """
+        This method adds a node before every other node. It is valid for nodes without predecessors.
+
+        Keyword arguments:
+        node -- the node (hashable)
+        """
+        self._positions[node] = self._bottom
+        self._bottom -= 1
+
+    def remove(self, node) -> None:
+        """
+        This method removes a node from the order. The node must not have any predecessors left.
+
+        Keyword arguments:
+        node -- the node (hashable)
+        """
+        self._positions.pop(node, None)
+
+    def reset(self, nodes: list) -> None:
+        """
+        This method replaces the order by the given one.
+
+        Keyword arguments:
+        nodes -- the nodes, already in topological order (list)
+        """
+        self._positions = {node: position for position, node in enumerate(nodes)}
+        self._top = len(nodes)
+        self._bottom = -1
+
+    def add_edge(self, source, target) -> bool:
+        """
+        This method updates the order after an edge from source to target has been added to the graph.
+        Both nodes must be in the order.
+
+        Keyword arguments:
+        source -- the node where the edge starts (hashable)
+        target -- the node where the edge ends (hashable)
+        return -- False if the edge closes a cycle (the order is left untouched), True otherwise (bool)
+        """
+        if source == target:
+            return False
+        lower = self._positions[target]
+        upper = self._positions[source]
+        if upper < lower:  # The edge already agrees with the order
+            return True
+
+        # Nodes reachable from the target that are not after the source
+        forward = self._search(target, self._get_successors, lambda position: position <= upper)
+        if source in forward:
+            return False
+        # Nodes that reach the source and are not before the target
+        backward = self._search(source, self._get_predecessors, lambda position: position >= lower)
+
+        # The nodes that reach the source go first, keeping the relative order of each group
+        nodes = sorted(backward, key=self._positions.__getitem__) + sorted(forward, key=self._positions.__getitem__)
+        positions = sorted(self._positions[node] for node in nodes)
+        for node, position in zip(nodes, positions):
+            self._positions[node] = position
+        return True
+
+    def _search(self, start, get_neighbours, is_affected) -> set:
+        """
+        This method visits the nodes reachable from a node whose positions are in the affected region.
+
+        Keyword arguments:
+        start -- the node where the search starts (hashable)
+        get_neighbours -- the function that returns the neighbours of a node (callable)
+        is_affected -- the function that checks if a position is in the affected region (callable)
+        return -- the visited nodes, including the start (set)
+        """
+        visited = {start}
+        pending = [start]
+        while pending:
+            node = pending.pop()
+            for neighbour in get_neighbours(node):
+                if neighbour in visited:
+                    continue
+                position = self._positions.get(neighbour)
+                if position is not None and is_affected(position):
+                    visited.add(neighbour)
+                    pending.append(neighbour)
+        return visited
@@ -23,3 +23,28 @@ def int_to_base26(num):
         num //= 26
         num -= 1  # Subtract 1 for 0-indexing
     return result_b26
+
+
+_COLUMN_LETTERS = [int_to_base26(column) for column in range(26 + 26 * 26)]  # From A to ZZ
+_COLUMN_NUMBERS = {letters: column for column, letters in enumerate(_COLUMN_LETTERS)}
+
+
+def column_letters(column: int) -> str:
+    """
+    This function converts a column number to its letters, using a precomputed table for the
+    columns from A to ZZ.
+    """
+    if 0 <= column < len(_COLUMN_LETTERS):
+        return _COLUMN_LETTERS[column]
+    return int_to_base26(column)
+
+
+def column_number(letters: str) -> int:
+    """
+    This function converts the letters of a column to its number, starting at 0, using a
+    precomputed table for the columns from A to ZZ.
+    """
+    column = _COLUMN_NUMBERS.get(letters)
+    if column is None:
+        return base26_to_int(letters)
+    return column
@@ -0,0 +1,83 @@
+"""
+This file contains a benchmark of the memory used by every loaded cell.
+It loads generated S2V files with numbers, text, formulas, the empty cells referenced by formulas
+and a mix of them, and reports the bytes allocated per non-empty field of the file, measured with
+tracemalloc. The fields are counted instead of the cells, as the empty cells referenced by the formulas
+are not stored.
+
+Usage: python test/benchmarks/memory_per_cell.py [rows]
+"""
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from controller.controller import Controller  # noqa: E402
+from use_cases.spreadsheetloader import SpreadsheetLoaderS2V  # noqa: E402
+
+
+def write_sheet(path: str, rows: int, kind: str) -> int:
+    """
+    This function writes a generated S2V file.
+
+    Keyword arguments:
+    path -- the path of the file (str)
+    rows -- the number of rows (int)
+    kind -- "numbers", "text", "formulas", "empty references" or "mixed" (str)
+    return -- the number of non-empty fields written (int)
+    """
+    fields = 0
+    with open(path, "w") as file:
+        for row in range(1, rows + 1):
+            if kind == "numbers":
+                file.write(f"{row};{row * 0.5};{row % 9}\n")
+            elif kind == "mixed":  # Six numbers, a label and two formulas per row
+                file.write(f"{row};{row % 5};{row * 2};{row % 7};{row * 0.25};{row % 3};item {row % 11};"
+                           f"=A{row}*B{row};=SUMA(A{row}:F{row})\n")
+            elif kind == "text":
+                file.write(f"name{row};label;x{row % 7}\n")
+            elif kind == "formulas":
+                file.write(f"=E{row}*F{row};=A{row}+1;=SUMA(A{row}:B{row})\n")
+            else:  # Formulas whose operands are empty cells
+                file.write(f"=E{row}+F{row}+G{row}+H{row}\n")
+            fields += {"numbers": 3, "mixed": 9, "text": 3, "formulas": 3}.get(kind, 1)
+    return fields
+
+
+def measure(path: str) -> tuple:
+    """
+    This function loads a file and measures the memory kept by the loaded spreadsheet.
+
+    Keyword arguments:
+    path -- the path of the file (str)
+    return -- the bytes allocated for the loaded cells (int)
+    """
+    row_batches = list(SpreadsheetLoaderS2V().load_spreadsheet(path))
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    spreadsheet, formula_evaluator = Controller.load_cells(row_batches)
+    del row_batches
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    return sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+
+def main(rows: int) -> None:
+    """
+    This function runs the benchmark and prints its results.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        for kind in ("numbers", "text", "formulas", "empty references", "mixed"):
+            path = os.path.join(directory, kind.replace(" ", "_") + ".s2v")
+            fields = write_sheet(path, rows, kind)
+            allocated = measure(path)
+            print(f"{kind:>16}: {fields:>8} fields {allocated / fields:>8.1f} bytes per field")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
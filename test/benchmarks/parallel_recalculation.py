@@ -0,0 +1,81 @@
+"""
+This file contains a benchmark of the recalculation of a spreadsheet in several processes.
+It builds sheets where one edit makes a single level of formulas stale: formulas that add up a range,
+and long arithmetic formulas. Then it times that edit with every number of processes, after a first
+edit that starts the workers and sends them the templates.
+
+Usage: python test/benchmarks/parallel_recalculation.py [formulas] [processes ...]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from controller.controller import Controller  # noqa: E402
+
+
+def build(controller: Controller, formulas: int, kind: str) -> None:
+    """
+    This function fills a spreadsheet, as one batch of edits.
+
+    Keyword arguments:
+    controller -- the controller of the spreadsheet (Controller)
+    formulas -- the number of formulas (int)
+    kind -- "ranges" or "arithmetic" (str)
+    """
+    controller.begin_batch()
+    for row in range(1, formulas + 1):
+        controller.edit_cell(f"A{row}", str(row % 17))
+        controller.edit_cell(f"B{row}", str(row % 5 + 0.5))
+    for row in range(1, formulas + 1):
+        if kind == "ranges":
+            controller.edit_cell(f"C{row}", f"=SUMA(A1:B{row})*2+MAX(B1:B{row})")
+        else:  # Many operators over a few cells
+            terms = "+".join(f"(A{row}*{index}-B{row}/{index + 1})" for index in range(1, 16))
+            controller.edit_cell(f"C{row}", f"=A1+{terms}")
+    controller.commit_batch()
+
+
+def measure(formulas: int, kind: str, processes: int, repeats: int = 3) -> float:
+    """
+    This function times the recalculation of every formula after an edit of the cell they all read.
+
+    Keyword arguments:
+    formulas -- the number of formulas (int)
+    kind -- "ranges" or "arithmetic" (str)
+    processes -- the number of processes (int)
+    repeats -- the number of timed edits, of which the fastest is kept (int)
+    return -- the seconds of the fastest edit (float)
+    """
+    controller = Controller()
+    build(controller, formulas, kind)
+    controller.set_recalculation_processes(processes)
+    try:
+        controller.edit_cell("A1", "100")  # Starts the workers and sends them the templates
+        best = float("inf")
+        for repeat in range(repeats):
+            start = time.perf_counter()
+            controller.edit_cell("A1", str(repeat))
+            best = min(best, time.perf_counter() - start)
+        return best
+    finally:
+        controller.set_recalculation_processes(1)
+
+
+def main(formulas: int, process_counts: list) -> None:
+    """
+    This function runs the benchmark and prints its results.
+    """
+    print(f"{os.cpu_count()} cores, {formulas} formulas")
+    for kind in ("ranges", "arithmetic"):
+        serial = None
+        for processes in process_counts:
+            seconds = measure(formulas, kind, processes)
+            serial = serial or seconds
+            print(f"{kind:>10}: {processes:>2} processes {seconds:>8.3f} s  speedup {serial / seconds:.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+         [int(argument) for argument in sys.argv[2:]] or sorted({1, 2, os.cpu_count() or 1}))
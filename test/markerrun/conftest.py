@@ -0,0 +1,21 @@
+import os
+import shutil
+import pytest
+
+MARKER_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture(scope="package", autouse=True)
+def marker_working_directory(tmp_path_factory):
+    """
+    The marker reads and writes its files in the working directory, as TestsRunner does from this
+    directory. Under pytest they run in a temporary directory, so no file is left in the repository.
+    """
+    directory = tmp_path_factory.mktemp("markerrun")
+    shutil.copy(os.path.join(MARKER_DIRECTORY, "marker_save_test_ref.s2v"), directory)
+    previous = os.getcwd()
+    os.chdir(directory)
+    try:
+        yield directory
+    finally:
+        os.chdir(previous)
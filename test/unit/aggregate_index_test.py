@@ -0,0 +1,67 @@
+import random
+import unittest
+from controller.controller import Controller
+from domain.utils.aggregate_index import AggregateIndex, ColumnAggregateTree
+
+
+class AggregateIndexTest(unittest.TestCase):
+
+    @staticmethod
+    def aggregate(numbers):
+        if not numbers:
+            return 0, 0, float("inf"), float("-inf")
+        return sum(numbers), len(numbers), min(numbers), max(numbers)
+
+    def test01_tree_queries_match_the_numbers_after_updates(self):
+        generator = random.Random(6)
+        values = {row: float(generator.randint(-50, 50)) for row in range(0, 300, 3)}
+        tree = ColumnAggregateTree(values)
+        for step in range(500):
+            row = generator.randint(0, 700)  # Rows past the end grow the tree
+            value = None if generator.random() < 0.2 else float(generator.randint(-50, 50))
+            tree.update(row, value)
+            if value is None:
+                values.pop(row, None)
+            else:
+                values[row] = value
+            start = generator.randint(0, 700)
+            end = generator.randint(start, 800)
+            self.assertEqual(tree.query(start, end),
+                             self.aggregate([number for row, number in values.items() if start <= row <= end]))
+
+    def test02_dense_and_sparse_columns_are_combined(self):
+        cells = {(row, 0): float(row) for row in range(1, 100)}
+        cells.update({(row, 1): 2.0 for row in (5, 50_000, 900_000)})  # Too sparse for a tree
+        cells.update({(row, 2): -float(row) for row in range(1, 100, 2)})
+
+        def read_column(column):
+            return {row: value for (row, cell_column), value in cells.items() if cell_column == column}
+
+        def read_values(start_row, start_column, end_row, end_column):
+            return [value for (row, column), value in cells.items()
+                    if start_row <= row <= end_row and start_column <= column <= end_column]
+
+        index = AggregateIndex(read_column, read_values)
+        self.assertEqual(index.query(1, 0, 1_000_000, 2), self.aggregate(read_values(1, 0, 1_000_000, 2)))
+        self.assertIsNone(index._columns[1])
+        for row, column, value in ((10, 0, 1000.0), (60_000, 1, -7.0), (3, 2, None), (150, 0, 5.0)):
+            if value is None:
+                del cells[(row, column)]
+            else:
+                cells[(row, column)] = value
+            index.update(row, column, value)
+            self.assertEqual(index.query(2, 0, 70_000, 2), self.aggregate(read_values(2, 0, 70_000, 2)))
+
+    def test03_range_functions_follow_the_edits(self):
+        controller = Controller()
+        for row in range(1, 11):
+            controller.set_cell_content(f"A{row}", str(row))
+        functions = ("=SUMA(A1:A10)", "=MAX(A1:A10;100)", "=MIN(A3:A5;A1)", "=PROMEDIO(A1:A4)", "=SUMA(C1:C3)",
+                     "=SUMA(A1:A100000)")
+        for row, function in enumerate(functions, 1):
+            controller.set_cell_content(f"B{row}", function)
+        controller.set_cell_content("A3", "-5")
+        controller.set_cell_content("A4", "=A1*100")
+        controller.set_cell_content("A99999", "1000")
+        self.assertEqual([controller.get_cell_content_as_string(f"B{row}") for row in range(1, 7)],
+                         ["143.0", "100.0", "-5.0", "24.5", "", "1143.0"])  # A range without numbers has no sum
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from controller.controller import Controller
+from domain.entities.spreadsheet import Spreadsheet
+from test.entities.circular_dependency_exception import CircularDependencyException
+from test.usecasesmarker.saving_spreadsheet_exception import SavingSpreadsheetException
+
+
+class BatchEditTest(unittest.TestCase):
+
+    def setUp(self):
+        self.controller = Controller()
+        self.controller.edit_cell("A1", "1")
+        self.controller.edit_cell("A2", "2")
+        for row in range(1, 11):
+            self.controller.edit_cell(f"B{row}", "=A1+A2")
+        self.controller.edit_cell("C1", "=SUMA(B1:B10)")
+
+    def contents(self):
+        return {coordinate: (self.controller.get_cell_content_as_string(coordinate),
+                             self.controller.get_cell_formula_expression(coordinate)
+                             if self.controller.get_cell_content_as_string(coordinate) and coordinate[0] != "A" else None)
+                for coordinate in ("A1", "A2", "A3", "B1", "B10", "C1", "D1")}
+
+    def test01_every_formula_is_evaluated_once_at_commit(self):
+        self.controller.begin_batch()
+        self.controller.edit_cell("A1", "10")
+        self.controller.edit_cell("A2", "20")
+        self.controller.edit_cell("A1", "100")
+        self.assertEqual(self.controller.get_cell_content_as_string("C1"), "30.0")  # Nothing is evaluated yet
+        with mock.patch.object(Spreadsheet, "update_cell_value", autospec=True,
+                               side_effect=Spreadsheet.update_cell_value) as update_cell_value:
+            self.controller.commit_batch()
+        updated = [call.args[1].identifier.coordinate for call in update_cell_value.call_args_list]
+        formulas = [f"B{row}" for row in range(1, 11)] + ["C1"]
+        self.assertEqual(sorted(coordinate for coordinate in updated if coordinate not in ("A1", "A2")), sorted(formulas))
+        self.assertEqual(self.controller.get_cell_content_as_string("B10"), "120.0")
+        self.assertEqual(self.controller.get_cell_content_as_string("C1"), "1200.0")
+
+    def test02_rollback_restores_every_cell(self):
+        before = self.contents()
+        self.controller.begin_batch()
+        self.controller.edit_cell("A1", "10")
+        self.controller.edit_cell("A3", "new")
+        self.controller.edit_cell("B1", "=A1*A2")
+        self.controller.edit_cell("B1", "=A1-A2")
+        self.controller.edit_cell("D1", "=C1")
+        self.controller.rollback_batch()
+        self.assertEqual(self.contents(), before)
+        self.controller.edit_cell("A1", "5")
+        self.assertEqual(self.controller.get_cell_content_as_string("C1"), "70.0")
+
+    def test03_a_circular_dependency_rolls_the_whole_batch_back(self):
+        before = self.contents()
+        self.controller.begin_batch()
+        self.controller.edit_cell("A1", "10")
+        self.controller.edit_cell("A2", "=C1")
+        with self.assertRaises(CircularDependencyException):
+            self.controller.commit_batch()
+        self.assertEqual(self.contents(), before)
+        self.controller.begin_batch()  # The failed batch is over
+        self.controller.rollback_batch()
+
+    def test04_batches_can_not_be_nested_or_saved(self):
+        with self.assertRaises(ValueError):
+            self.controller.commit_batch()
+        with self.assertRaises(ValueError):
+            self.controller.rollback_batch()
+        self.controller.begin_batch()
+        with self.assertRaises(ValueError):
+            self.controller.begin_batch()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "book.s2v")
+            with self.assertRaises(SavingSpreadsheetException):
+                self.controller.save_spreadsheet_to_file(path)
+            self.controller.commit_batch()
+            self.controller.save_spreadsheet_to_file(path)
+            self.assertTrue(os.path.exists(path))
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from controller.controller import Controller
+from test.entities.circular_dependency_exception import CircularDependencyException
+from test.entities.content_exception import ContentException
+from test.usecasesmarker.reading_spreadsheet_exception import ReadingSpreadsheetException
+
+
+class BulkLoadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.controller = Controller()
+        self.controller.edit_cell("A1", "previous")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, text):
+        path = os.path.join(self.directory.name, "book.s2v")
+        with open(path, "w") as spreadsheet_file:
+            spreadsheet_file.write(text)
+        return path
+
+    def test01_forward_references_are_evaluated_once_without_replaying_edits(self):
+        path = self.write("=B1*2;=C1+1;5\n=A1+B1;=SUMA(A1:C1)\n;text;=B2/2\n")
+        with mock.patch.object(Controller, "edit_cell", side_effect=AssertionError("edit_cell replayed")):
+            self.controller.load_spreadsheet_from_file(path)
+        self.assertEqual(self.controller._formula_evaluator.recalculation_engine.evaluated_count, 5)
+        self.assertEqual([self.controller.get_cell_content_as_float(coordinate) for coordinate in ("A1", "A2", "B2", "C3")],
+                         [12, 18, 23, 11.5])
+        self.assertEqual(self.controller.get_cell_content_as_string("B3"), "text")
+
+    def test02_the_loaded_graph_keeps_working_after_the_load(self):
+        self.controller.load_spreadsheet_from_file(self.write("1;=A1+1\n=B1*2\n"))
+        self.controller.edit_cell("A1", "10")
+        self.assertEqual(self.controller.get_cell_content_as_float("A2"), 22)
+        with self.assertRaises(CircularDependencyException):
+            self.controller.edit_cell("A1", "=A2")
+
+    def test03_a_failed_load_keeps_the_previous_spreadsheet(self):
+        with self.assertRaises(CircularDependencyException):
+            self.controller.load_spreadsheet_from_file(self.write("=B1;=C1;=A1\n"))
+        with self.assertRaises(ContentException):
+            self.controller.load_spreadsheet_from_file(self.write("1;=1+\n"))
+        with self.assertRaises(ReadingSpreadsheetException):
+            self.controller.load_spreadsheet_from_file(os.path.join(self.directory.name, "missing.s2v"))
+        self.assertEqual(self.controller.get_cell_content_as_string("A1"), "previous")
+
+    def test04_a_formula_that_reads_an_empty_cell_is_saved_and_loaded_back(self):
+        self.controller.edit_cell("A4", "=C6")
+        self.controller.edit_cell("B2", "=SUMA(C1:C6)+C6")
+        path = os.path.join(self.directory.name, "saved.s2v")
+        self.controller.save_spreadsheet_to_file(path)
+        for load in ("load_spreadsheet_from_file", "open_spreadsheet_from_file"):
+            loaded = Controller()
+            getattr(loaded, load)(path)
+            self.assertEqual(loaded.get_cell_formula_expression("A4"), "=C6")
+            self.assertEqual(loaded.get_cell_content_as_string("B2"), "0")
+            loaded.edit_cell("C6", "3")
+            self.assertEqual(loaded.get_cell_content_as_float("A4"), 3)
+            self.assertEqual(loaded.get_cell_content_as_float("B2"), 6)
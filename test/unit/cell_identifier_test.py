@@ -0,0 +1,34 @@
+import gc
+import pickle
+import unittest
+from domain.entities.cell import CellIdentifier
+from test.entities.bad_coordinate_exception import BadCoordinateException
+
+
+class CellIdentifierTest(unittest.TestCase):
+
+    def test01_identifiers_are_interned(self):
+        identifier = CellIdentifier("ab12")
+        self.assertIs(CellIdentifier("AB12"), identifier)
+        self.assertIs(CellIdentifier.at(12, 27), identifier)
+        self.assertIs(pickle.loads(pickle.dumps(identifier)), identifier)
+        self.assertEqual((identifier.coordinate, identifier.column, identifier.row), ("AB12", "AB", "12"))
+        self.assertEqual((identifier.row_number, identifier.column_number), (12, 27))
+        self.assertEqual({identifier: 1}[CellIdentifier("AB12")], 1)
+        self.assertNotEqual(identifier, "AB12")
+
+    def test02_unused_identifiers_are_released(self):
+        self.assertIsNone(CellIdentifier.existing_at(987654, 3))
+        identifier = CellIdentifier("D987654")
+        self.assertIs(CellIdentifier.existing_at(987654, 3), identifier)
+        del identifier
+        gc.collect()
+        self.assertIsNone(CellIdentifier.existing_at(987654, 3))
+
+    def test03_bad_coordinates_are_rejected(self):
+        for coordinate in ("", "12", "A", "1A", "A-1", "A1B", None):
+            with self.assertRaises(BadCoordinateException):
+                CellIdentifier(coordinate)
+        for row, column in ((1, -1), (-1, 0), (1, 1 << 24)):
+            with self.assertRaises(BadCoordinateException):
+                CellIdentifier.at(row, column)
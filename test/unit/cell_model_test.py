@@ -0,0 +1,52 @@
+import unittest
+from controller.controller import Controller
+from domain.entities.cell import Cell, CellIdentifier
+from domain.entities.content import Formula, NumericalContent, TextualContent
+from domain.entities.value import NumericalValue, TextualValue
+
+
+class CellModelTest(unittest.TestCase):
+
+    def test01_cells_contents_and_values_have_no_instance_dictionary(self):
+        controller = Controller()
+        controller.set_cell_content("A1", "text")
+        controller.set_cell_content("A2", "=A3+1")
+        spreadsheet = controller._spreadsheet
+        objects = [spreadsheet.hold_cell(CellIdentifier("A1")), spreadsheet.hold_cell(CellIdentifier("A2")),
+                   NumericalContent(NumericalValue(1.0)), TextualContent(TextualValue("x")), CellIdentifier("A1")]
+        objects += [cell.content for cell in objects[:2]] + [cell.content.value for cell in objects[:2]]
+        for instance in objects:
+            self.assertFalse(hasattr(instance, "__dict__"), type(instance).__name__)
+        self.assertIsInstance(objects[1].content, Formula)
+
+    def test02_referenced_empty_cells_are_not_created(self):
+        controller = Controller()
+        controller.set_cell_content("B1", "=A9+A8")
+        spreadsheet = controller._spreadsheet
+        self.assertIsNone(spreadsheet.get_cell(CellIdentifier("A9")))
+        self.assertIsNone(spreadsheet.get_cell(CellIdentifier("A8")))
+        self.assertEqual(len(spreadsheet), 1)
+        empty = NumericalContent.empty()
+        self.assertIs(empty.value, NumericalValue.empty())
+        with self.assertRaises(ValueError):
+            empty.value = NumericalValue(1.0)
+        with self.assertRaises(ValueError):
+            NumericalValue.empty().value = 1.0
+        controller.set_cell_content("A9", "4")
+        controller.set_cell_content("A8", "1")
+        self.assertEqual(controller.get_cell_content_as_float("B1"), 5)
+
+    def test03_cells_only_keep_their_identifier_and_content(self):
+        cell = Cell(CellIdentifier("C3"), NumericalContent(NumericalValue(2.0)))
+        self.assertEqual(Cell.__slots__, ("_identifier", "_content"))
+        self.assertFalse(hasattr(cell, "depends_on"))
+
+    def test04_texts_and_formulas_are_stored_without_cell_objects(self):
+        controller = Controller()
+        controller.set_cell_content("A1", "text")
+        controller.set_cell_content("A2", "=B2*2")
+        controller.set_cell_content("A3", "=B3*2")
+        storage = controller._spreadsheet.cells
+        self.assertEqual(storage._object_at(1, 0), "text")
+        self.assertIsInstance(storage._object_at(2, 0), Formula)
+        self.assertIs(storage._object_at(2, 0).program, storage._object_at(3, 0).program)
@@ -0,0 +1,66 @@
+import unittest
+from array import array
+from domain.entities.cell import Cell, CellIdentifier
+from domain.entities.content import TextualContent
+from domain.entities.value import TextualValue
+from domain.utils.cell_storage import ColumnarCellStorage
+
+
+class ColumnarCellStorageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.storage = ColumnarCellStorage()
+
+    def test01_sparse_column_allocates_one_chunk(self):
+        self.storage.put_number(CellIdentifier.at(1000000, 0), 3.0)
+        chunks = self.storage.number_columns()[0]
+        self.assertEqual(len(chunks), 1)
+        (first_row, (values, mask)), = chunks.items()
+        self.assertEqual(first_row, 1000000 - 1000000 % ColumnarCellStorage.CHUNK_ROWS)
+        self.assertEqual(len(values), ColumnarCellStorage.CHUNK_ROWS)
+        self.assertEqual(self.storage.get_value_at(1000000, 0), 3.0)
+
+    def test02_get_hands_out_views_that_are_not_kept(self):
+        identifier = CellIdentifier.at(5, 2)
+        self.storage.put_number(identifier, 7.0)
+        view = self.storage.get(identifier)
+        self.assertEqual(view.content.value.value, 7.0)
+        self.assertIsNot(self.storage.get(identifier), view)
+        self.assertEqual(self.storage.objects(), [])
+        self.storage.put_number(identifier, 8.0)
+        self.assertEqual(self.storage.get(identifier).content.value.value, 8.0)
+
+    def test03_hold_keeps_the_cell_and_sees_later_numbers(self):
+        identifier = CellIdentifier.at(5, 2)
+        self.storage.put_number(identifier, 7.0)
+        held = self.storage.hold(identifier)
+        self.assertIs(self.storage.hold(identifier), held)
+        self.assertIs(self.storage.get(identifier), held)
+        self.assertEqual(self.storage.objects(), [held])
+        self.assertNotIn(2, self.storage.number_columns())
+        self.storage.put_number(identifier, 9.0)
+        self.assertEqual(held.content.value.value, 9.0)
+
+    def test04_removing_the_last_number_frees_the_chunk(self):
+        first, second = CellIdentifier.at(3, 1), CellIdentifier.at(4, 1)
+        self.storage.put_number(first, 1.0)
+        self.storage.put_number(second, 2.0)
+        self.assertTrue(self.storage.remove(first))
+        self.assertIn(1, self.storage.number_columns())
+        self.assertTrue(self.storage.remove(second))
+        self.assertEqual(self.storage.number_columns(), {})
+        self.assertFalse(self.storage.remove(second))
+        self.assertEqual(len(self.storage), 0)
+
+    def test05_chunks_are_adopted_and_merged_with_existing_cells(self):
+        rows = ColumnarCellStorage.CHUNK_ROWS
+        values, mask = array('d', bytes(8 * rows)), bytearray(rows)
+        values[1], mask[1] = 4.0, 1
+        values[2], mask[2] = 5.0, 1
+        self.storage.put_number_column(0, rows, values, mask)
+        self.assertIs(self.storage.number_columns()[0][rows][0], values)
+        self.storage.put(Cell(CellIdentifier.at(1, 3), TextualContent(TextualValue("x"))))
+        self.storage.put_number_column(3, 0, array('d', [0.0, 6.0]), bytearray([0, 1]))
+        self.assertEqual(self.storage.get_value_at(1, 3), 6.0)
+        self.assertEqual([row for row, _ in self.storage.rows()], [1, rows + 1, rows + 2])
+        self.assertEqual(self.storage.values_in(0, 0, 2 * rows, 3), [6.0, 4.0, 5.0])
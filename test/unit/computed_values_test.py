@@ -0,0 +1,56 @@
+import hashlib
+import os
+import tempfile
+import unittest
+from unittest import mock
+from controller.controller import Controller
+from domain.entities.cell import CellIdentifier
+from domain.entities.value import NumericalValue
+from use_cases.spreadsheetloader import ComputedValuesLoader
+from use_cases.spreadsheetsaver import ComputedValuesSaver
+
+
+class ComputedValuesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "book.s2v")
+        self.controller = Controller()
+        for cell, content in (("A1", "3"), ("A2", "4"), ("B1", "=A1*A2"), ("B2", "=1/0"), ("B3", "=SUMA(C1:C2)")):
+            self.controller.edit_cell(cell, content)
+        self.controller.save_spreadsheet_to_file(self.path, save_values=True)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def load(self, trust_values=True):
+        controller = Controller()
+        controller.load_spreadsheet_from_file(self.path, trust_values=trust_values)
+        return controller
+
+    def test01_values_keep_their_types(self):
+        values = ComputedValuesLoader().load_values(self.path)
+        self.assertEqual(values, {(1, 1): 12.0, (2, 1): 0, (3, 1): None})
+        self.assertIsInstance(values[(2, 1)], int)
+        loaded = self.load()
+        self.assertEqual([loaded.get_cell_content_as_string(cell) for cell in ("B1", "B2", "B3")], ["12.0", "0", ""])
+
+    def test02_trusted_values_are_not_evaluated_again(self):
+        cell = self.controller._spreadsheet.get_cell(CellIdentifier("B1"))
+        cell.content.value = NumericalValue(99.0)
+        ComputedValuesSaver().save_values(self.controller._spreadsheet, self.path)
+        self.assertEqual(self.load().get_cell_content_as_string("B1"), "99.0")
+        self.assertEqual(self.load(trust_values=False).get_cell_content_as_string("B1"), "12.0")
+
+    def test03_values_of_a_changed_file_are_ignored(self):
+        with open(self.path, "a") as s2v_file:
+            s2v_file.write("\n5")
+        self.assertIsNone(ComputedValuesLoader().load_values(self.path))
+        self.assertEqual(self.load().get_cell_content_as_string("B1"), "12.0")
+
+    def test04_the_file_is_hashed_in_chunks(self):
+        with open(self.path, "rb") as s2v_file:
+            expected = hashlib.sha256(s2v_file.read()).digest()
+        with mock.patch("use_cases.spreadsheetloader._DIGEST_CHUNK_SIZE", 3):
+            self.assertEqual(ComputedValuesLoader.digest(self.path), expected)
+        self.assertEqual(ComputedValuesLoader.digest(self.path), expected)
@@ -0,0 +1,36 @@
+import unittest
+from controller.controller import Controller
+
+
+class EarlyCutoffTest(unittest.TestCase):
+
+    def setUp(self):
+        self.controller = Controller()
+        for row in range(1, 11):
+            self.controller.edit_cell(f"A{row}", str(row))
+        self.controller.edit_cell("B1", "=MAX(A1:A10)")
+        for row in range(2, 50):
+            self.controller.edit_cell(f"B{row}", f"=B{row - 1}+1")
+
+    def test01_a_formula_that_keeps_its_value_stops_the_propagation(self):
+        self.controller.edit_cell("A3", "4")
+        self.assertEqual(self.controller.get_recalculation_counts(), (1, 48))
+        self.assertEqual(self.controller.get_cell_content_as_float("B49"), 58)
+        self.controller.edit_cell("A3", "40")
+        self.assertEqual(self.controller.get_recalculation_counts(), (49, 0))
+        self.assertEqual(self.controller.get_cell_content_as_float("B49"), 88)
+
+    def test02_a_change_that_reaches_a_join_through_one_branch_is_not_cut_off(self):
+        self.controller.edit_cell("C1", "=MIN(A1:A10)")
+        self.controller.edit_cell("D1", "=B49+C1")
+        self.controller.edit_cell("A1", "0")  # MIN moves, MAX does not
+        self.assertEqual(self.controller.get_recalculation_counts(), (3, 48))
+        self.assertEqual(self.controller.get_cell_content_as_float("D1"), 58 + 0)
+
+    def test03_a_value_that_only_changes_its_type_propagates(self):
+        self.controller.edit_cell("C1", "=A1/A2")
+        self.controller.edit_cell("C2", "=C1")
+        self.controller.edit_cell("A1", "0")  # C1 is 0.0
+        self.controller.edit_cell("A2", "0")  # Division by zero gives the integer 0
+        self.assertEqual(self.controller.get_recalculation_counts(), (3, 48))  # B1, C1 and C2
+        self.assertEqual(self.controller.get_cell_content_as_string("C2"), "0")
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+from controller.controller import Controller
+from use_cases.editjournal import EditJournal
+
+
+class EditJournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "book.journal")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test01_contents_with_any_character_are_replayed_as_written(self):
+        controller = Controller()
+        controller.start_journal(self.path)
+        controller.edit_cell("A1", "a\0b")
+        controller.edit_cell("A2", "ñandú;\n=x")
+        controller.edit_cell("A3", "")
+        controller._journal.close()  # The process stops without a checkpoint
+        journal = EditJournal(self.path)
+        self.assertEqual(journal.resume(), [("A1", "a\0b"), ("A2", "ñandú;\n=x"), ("A3", "")])
+        journal.close()
+
+    def test02_a_torn_record_is_cut_off_with_the_rest(self):
+        controller = Controller()
+        controller.start_journal(self.path)
+        controller.edit_cell("A1", "1")
+        controller.begin_batch()
+        controller.edit_cell("A2", "2")
+        controller.edit_cell("A3", "=A1+A2")
+        controller.commit_batch()
+        controller._journal.close()
+        size = os.path.getsize(self.path)
+        with open(self.path, "r+b") as journal_file:
+            journal_file.truncate(size - 3)
+        recovered = Controller()
+        recovered.recover_from_journal(self.path)
+        self.assertEqual(recovered.get_cell_content_as_string("A1"), "1.0")
+        self.assertEqual(recovered.get_cell_content_as_string("A3"), "")  # The batch is not replayed in part
+        self.assertEqual(recovered.get_cell_content_as_string("A2"), "")
+        recovered.edit_cell("B1", "5")
+        recovered.stop_journal()
+        journal = EditJournal(self.path)
+        self.assertEqual(journal.resume(), [("A1", "1"), ("B1", "5")])
+        journal.close()
+
+    def test03_recovery_replays_the_edits_on_the_last_checkpoint(self):
+        controller = Controller()
+        controller.start_journal(self.path, checkpoint_every=3)
+        for row in range(1, 6):
+            controller.edit_cell(f"A{row}", str(row))
+        controller.edit_cell("B1", "=SUMA(A1:A5)")
+        controller._journal.close()
+        self.assertGreater(controller._journal.generation, 1)
+        recovered = Controller()
+        recovered.recover_from_journal(self.path)
+        self.assertEqual(recovered.get_cell_content_as_string("B1"), "15.0")
+        self.assertFalse(os.path.exists(controller._journal.checkpoint_path(1)))
@@ -0,0 +1,42 @@
+import unittest
+from unittest import mock
+from controller.controller import Controller
+from domain.entities.cell import CellIdentifier
+from domain.entities.formula_evaluator import FormulaEvaluatorPostfix
+
+
+class FormulaCompilerTest(unittest.TestCase):
+
+    CASES = {"=1+2": 3, "=10/(2+3)": 2, "=100/(5+(25/5))": 10, "=2*3-4/2": 4, "=5/0": 0, "=A9": None,
+             "=A9+1": 0, "=MAX(1;2)*2": 4, "=1+SUMA(A1;2)": 4, "=A1*10-5": 5, "=(A1+1)*(A1+2)": 6,
+             "=SUMA(A1:A2)/PROMEDIO(A1;A2)": 2}
+
+    def setUp(self):
+        self.controller = Controller()
+        self.controller.set_cell_content("A1", "1")
+        self.controller.set_cell_content("A2", "1")
+
+    def value(self, coordinate):
+        return self.controller._spreadsheet.get_cell(CellIdentifier(coordinate)).content.value.value
+
+    def test01_compiled_formulas_give_the_interpreted_results(self):
+        for row, (formula, value) in enumerate(self.CASES.items(), 1):
+            self.controller.set_cell_content(f"C{row}", formula)
+            self.assertEqual(self.value(f"C{row}"), value, formula)
+
+    def test02_a_formula_is_compiled_once_for_all_its_evaluations(self):
+        with mock.patch.object(FormulaEvaluatorPostfix, "compile_program", autospec=True,
+                               side_effect=FormulaEvaluatorPostfix.compile_program) as compile_program:
+            self.controller.set_cell_content("C1", "=(A1+1)*(A1+2)")
+            for value in range(2, 12):
+                self.controller.set_cell_content("A1", str(value))
+            self.controller._formula_evaluator.recalculate_all()
+        self.assertEqual(compile_program.call_count, 1)
+        self.assertEqual(self.value("C1"), 12 * 13)
+
+    def test03_a_new_formula_in_the_same_cell_is_compiled_again(self):
+        self.controller.set_cell_content("C1", "=A1*10-5")
+        self.controller.set_cell_content("C1", "=A1*10+5")
+        self.assertEqual(self.value("C1"), 15)
+        self.controller.set_cell_content("A1", "2")
+        self.assertEqual(self.value("C1"), 25)
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from controller.controller import Controller
+from use_cases.spreadsheetsaver import IncrementalSpreadsheetSaverS2V, SpreadsheetSaverS2V
+
+
+class IncrementalSaveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "book.s2v")
+        self.full_path = os.path.join(self.directory.name, "full.s2v")
+        self.controller = Controller()
+        for row in range(1, 30):
+            self.controller.edit_cell(f"A{row}", str(row))
+            self.controller.edit_cell(f"C{row}", f"=A{row}*2")
+        self.controller.edit_cell("B3", "text")
+        self.controller.save_spreadsheet_to_file(self.path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def assertSavedAsAWholeSave(self):
+        SpreadsheetSaverS2V().save_spreadsheet(self.controller._spreadsheet, self.full_path)
+        with open(self.path, "rb") as saved, open(self.full_path, "rb") as full:
+            self.assertEqual(saved.read(), full.read())
+
+    def test01_a_row_that_keeps_its_length_is_written_in_place(self):
+        self.controller.edit_cell("B3", "TEXT")
+        self.controller.edit_cell("A7", "8")  # C7 is a formula: its line keeps its text
+        with mock.patch.object(IncrementalSpreadsheetSaverS2V, "_write_rows") as write_rows:
+            self.controller.save_spreadsheet_to_file(self.path)
+        write_rows.assert_not_called()
+        self.assertSavedAsAWholeSave()
+
+    def test02_rows_that_change_their_length_rewrite_the_tail(self):
+        for edits in ((("B3", "a longer text"),), (("A5", "1"), ("D20", "=A1")), (("A40", "far"),),
+                      (("C29", ""), ("A29", ""), ("A40", "")), (("B3", "ñandú;x"),)):
+            for coordinate, content in edits:
+                self.controller.edit_cell(coordinate, content)
+            self.controller.save_spreadsheet_to_file(self.path)
+            self.assertSavedAsAWholeSave()
+
+    def test03_a_file_changed_by_someone_else_is_saved_whole(self):
+        with open(self.path, "ab") as spreadsheet_file:
+            spreadsheet_file.write(b"\nappended")
+        self.controller.edit_cell("B3", "TEXT")
+        self.controller.save_spreadsheet_to_file(self.path)
+        self.assertSavedAsAWholeSave()
+
+    def test04_another_spreadsheet_or_file_is_saved_whole(self):
+        self.controller.save_spreadsheet_to_file(self.full_path)  # The saver now remembers the other file
+        self.controller.edit_cell("B3", "TEXT")
+        self.controller.save_spreadsheet_to_file(self.path)
+        self.assertSavedAsAWholeSave()
+        self.controller = Controller()
+        self.controller.edit_cell("A1", "1")
+        self.controller.save_spreadsheet_to_file(self.path)
+        self.assertSavedAsAWholeSave()
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+from controller.controller import Controller
+from domain.entities.cell import CellIdentifier
+
+
+class LazyEvaluationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.controller = Controller()
+        self.controller.set_lazy_evaluation(True)
+        self.controller.edit_cell("A1", "1")
+        for row in range(1, 21):
+            self.controller.edit_cell(f"B{row}", f"=A1*{row}")
+            self.controller.edit_cell(f"C{row}", f"=B{row}+1")
+        self.engine = self.controller._formula_evaluator.recalculation_engine
+
+    def dirty_formulas(self):
+        return {identifier for identifier in self.engine.dirty if identifier.column != "A"}
+
+    def test01_edits_only_mark_formulas_and_reads_evaluate_what_they_need(self):
+        for value in range(2, 10):
+            self.controller.edit_cell("A1", str(value))
+        self.assertEqual(len(self.dirty_formulas()), 40)
+        self.assertEqual(self.controller.get_cell_content_as_float("C3"), 9 * 3 + 1)
+        self.assertEqual(self.engine.evaluated_count, 2)  # B3 and C3
+        self.assertNotIn(CellIdentifier("C3"), self.dirty_formulas())
+        self.assertIn(CellIdentifier("C4"), self.dirty_formulas())
+        self.controller.prefetch_cells(["C5", "C6"])
+        self.assertEqual(len(self.dirty_formulas()), 34)
+        self.assertEqual(self.controller.get_cell_content_as_float("C5"), 9 * 5 + 1)
+
+    def test02_lazy_and_eager_spreadsheets_agree(self):
+        eager = Controller()
+        eager.edit_cell("A1", "1")
+        for row in range(1, 21):
+            eager.edit_cell(f"B{row}", f"=A1*{row}")
+            eager.edit_cell(f"C{row}", f"=B{row}+1")
+        for controller in (eager, self.controller):
+            controller.edit_cell("A1", "4")
+            controller.edit_cell("D1", "=SUMA(C1:C20)")
+            controller.begin_batch()
+            controller.edit_cell("B7", "0")
+            controller.edit_cell("A1", "5")
+            controller.commit_batch()
+        coordinates = [f"{column}{row}" for row in range(1, 21) for column in "BCD"]
+        self.assertEqual([self.controller.get_cell_content_as_string(coordinate) for coordinate in coordinates],
+                         [eager.get_cell_content_as_string(coordinate) for coordinate in coordinates])
+
+    def test03_saving_or_leaving_lazy_mode_evaluates_every_dirty_formula(self):
+        self.controller.edit_cell("A1", "3")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "book.s2v")
+            self.controller.save_spreadsheet_to_file(path, save_values=True)
+            self.assertEqual(self.engine.dirty, set())
+            loaded = Controller()
+            loaded.load_spreadsheet_from_file(path, trust_values=True)
+        self.assertEqual(loaded.get_cell_content_as_float("C20"), 61)
+        self.controller.edit_cell("A1", "2")
+        self.controller.set_lazy_evaluation(False)
+        self.assertEqual(self.engine.dirty, set())
+        self.controller.edit_cell("A1", "0")
+        self.assertEqual(self.engine.dirty, set())
+        with self.assertRaises(ValueError):
+            self.controller.set_lazy_evaluation("yes")
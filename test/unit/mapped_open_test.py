@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+from controller.controller import Controller
+from use_cases.spreadsheetloader import MappedS2VFile
+from test.usecasesmarker.reading_spreadsheet_exception import ReadingSpreadsheetException
+
+
+class MappedOpenTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "book.s2v")
+        lines = [f"{row};ñandú {row};{row / 4}" for row in range(1, 500)]
+        lines[9] = "=SUMA(A300:A310)+C400;=MAX(A1,5)*2"  # Row 10 has formulas, and a comma in one
+        lines[19] = ""
+        with open(self.path, "w", newline="") as spreadsheet_file:
+            spreadsheet_file.write("\r\n".join(lines[:250]) + "\r" + "\n".join(lines[250:]) + "\n")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test01_the_mapped_file_reads_rows_and_fields_on_demand(self):
+        source = MappedS2VFile(self.path)
+        try:
+            self.assertEqual(source.row_count, 499)
+            self.assertEqual(list(source.formula_rows), [10])
+            self.assertEqual(source.read_row(300), ["300", "ñandú 300", "75.0"])
+            self.assertEqual(source.read_row(10), ["=SUMA(A300:A310)+C400", "=MAX(A1;5)*2"])
+            self.assertEqual(source.read_row(20), [])
+            self.assertEqual(source.decode(source.read_field(251, 1)), "ñandú 251")
+        finally:
+            source.close()
+
+    def test02_only_the_rows_that_are_used_are_loaded(self):
+        loaded = Controller()
+        loaded.load_spreadsheet_from_file(self.path)
+        opened = Controller()
+        opened.open_spreadsheet_from_file(self.path)
+        storage = opened._spreadsheet.cells
+        self.assertEqual(sum(storage._loaded), 1)  # Only row 10: the cells and ranges read do not load their rows
+        self.assertEqual(opened.get_cell_content_as_float("A10"), sum(range(300, 311)) + 100)
+        self.assertEqual(opened.get_cell_content_as_string("B450"), "ñandú 450")
+        self.assertLess(sum(storage._loaded), 10)
+        opened.edit_cell("A300", "1000")
+        self.assertEqual(opened.get_cell_content_as_float("A10"), sum(range(301, 311)) + 1000 + 100)
+        loaded.edit_cell("A300", "1000")
+        coordinates = [f"{column}{row}" for row in range(1, 500) for column in "ABC"]
+        self.assertEqual([opened.get_cell_content_as_string(coordinate) for coordinate in coordinates],
+                         [loaded.get_cell_content_as_string(coordinate) for coordinate in coordinates])
+
+    def test03_saving_over_the_opened_file_keeps_every_row(self):
+        controller = Controller()
+        controller.open_spreadsheet_from_file(self.path)
+        controller.edit_cell("B2", "changed")
+        controller.save_spreadsheet_to_file(self.path)
+        reopened = Controller()
+        reopened.load_spreadsheet_from_file(self.path)
+        self.assertEqual(reopened.get_cell_content_as_string("B2"), "changed")
+        self.assertEqual(reopened.get_cell_content_as_string("B499"), "ñandú 499")
+        with self.assertRaises(ReadingSpreadsheetException):
+            controller.open_spreadsheet_from_file(os.path.join(self.directory.name, "missing.s2v"))
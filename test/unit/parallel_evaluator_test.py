@@ -0,0 +1,96 @@
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+from controller.controller import Controller
+from domain.entities.cell import CellIdentifier
+from domain.utils.parallel_evaluator import ParallelLevelEvaluator
+
+
+class ParallelLevelEvaluatorTest(unittest.TestCase):
+
+    def build(self, controller):
+        for row in range(1, 41):
+            controller.edit_cell(f"A{row}", str(row % 7))
+            controller.edit_cell(f"B{row}", str(row / 4))
+        for row in range(1, 41):
+            controller.edit_cell(f"C{row}", f"=A{row}*B{row}-A1/2")
+            controller.edit_cell(f"D{row}", f"=SUMA(A1:B{row})+MAX(B{row};MIN(A1:A40))")
+            controller.edit_cell(f"E{row}", f"=C{row}+D{row}*PROMEDIO(A{row}:B{row})")
+            controller.edit_cell(f"F{row}", f"=G{row}+1")  # G is empty
+
+    def values(self, controller):
+        return [controller.get_cell_content_as_string(f"{column}{row}") for row in range(1, 41) for column in "CDEF"]
+
+    def test01_workers_give_the_same_values_and_get_every_template_once(self):
+        serial = Controller()
+        self.build(serial)
+        parallel = Controller()
+        evaluator = ParallelLevelEvaluator(2, 0)
+        parallel._parallel_evaluator = parallel._formula_evaluator.parallel_evaluator = evaluator
+        sent = []  # The worker and the shape of every template sent
+        submit = ProcessPoolExecutor.submit
+
+        def submit_and_record(pool, function, templates, *arguments):
+            sent.extend((id(pool), shape) for shape in templates)
+            return submit(pool, function, templates, *arguments)
+
+        try:
+            self.build(parallel)
+            with mock.patch.object(ProcessPoolExecutor, "submit", submit_and_record):
+                for value in ("1", "3", "0", "-2.5"):
+                    serial.edit_cell("A1", value)
+                    parallel.edit_cell("A1", value)
+                    self.assertEqual(self.values(parallel), self.values(serial))
+                parallel._formula_evaluator.recalculate_all()
+            self.assertEqual(self.values(parallel), self.values(serial))
+            self.assertTrue(sent)
+            self.assertEqual(len(sent), len(set(sent)))
+        finally:
+            evaluator.close()
+
+    def test02_input_plan_follows_the_template(self):
+        template = (("cell", 0, 0), ("operator", "+"),
+                    ("function", "SUMA", (("range", 0, 0, 1, 1), ("function", "MAX", (("cell", 0, 1),)))))
+        self.assertEqual(ParallelLevelEvaluator.input_plan(template), [((0,), True), ((2, 0), False), ((2, 1, 0), False)])
+        self.assertEqual(ParallelLevelEvaluator.template_cost(template), 6)
+
+    def test03_cheap_levels_stay_in_the_parent(self):
+        controller = Controller()
+        evaluator = ParallelLevelEvaluator(2)
+        controller._parallel_evaluator = controller._formula_evaluator.parallel_evaluator = evaluator
+        self.build(controller)
+        controller.edit_cell("A1", "5")
+        self.assertIsNone(evaluator._workers)
+
+    def test04_integer_inputs_keep_their_type(self):
+        def build(controller):
+            controller.edit_cell("B2", "2")
+            controller.edit_cell("E1", "0")
+            for row in range(1, 21):
+                controller.edit_cell(f"A{row + 5}", "1")
+                controller.edit_cell(f"D{row}", f"=A4/MIN(B2:C5)+C6")  # An empty operand gives 0
+                controller.edit_cell(f"F{row}", f"=A{row + 5}/E1")  # A division by zero gives 0
+                controller.edit_cell(f"G{row}", f"=D{row}+F{row}*0")
+                controller.edit_cell(f"H{row}", f"=F{row}-F{row}")
+
+        def typed_values(controller):
+            return [(lambda value: (type(value), value))(
+                        controller._spreadsheet.get_cell(CellIdentifier(f"{column}{row}")).content.value.value)
+                    for row in range(1, 21) for column in "DFGH"]
+
+        serial = Controller()
+        build(serial)
+        parallel = Controller()
+        evaluator = ParallelLevelEvaluator(2, 0)
+        parallel._parallel_evaluator = parallel._formula_evaluator.parallel_evaluator = evaluator
+        try:
+            build(parallel)
+            for value in ("4", "0"):
+                serial.edit_cell("E1", value)
+                parallel.edit_cell("E1", value)
+                self.assertEqual(typed_values(parallel), typed_values(serial))
+            self.assertEqual(parallel.get_cell_content_as_string("D1"), "0")
+            self.assertEqual(parallel.get_cell_content_as_string("H1"), "0")
+            self.assertIsNotNone(evaluator._workers)
+        finally:
+            evaluator.close()
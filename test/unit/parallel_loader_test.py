@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from controller.controller import Controller
+from use_cases.spreadsheetloader import ParallelSpreadsheetLoaderS2V, SpreadsheetLoaderS2V
+
+
+class ParallelLoaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "book.s2v")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, last_field):
+        lines = []
+        for row in range(1, 401):
+            if row % 50 == 0:
+                lines.append("")
+            elif row == 1:
+                lines.append("1;=A1+1;text")
+            else:
+                lines.append(f"{row};=A{row}*MIN(B1:B{row - 1},5);=SUMA(A1:A{row}){last_field}")
+        with open(self.path, "w", newline="") as spreadsheet_file:
+            spreadsheet_file.write("\r\n".join(lines[:200]) + "\n" + "\r".join(lines[200:]))
+
+    def test01_ranges_start_at_line_boundaries_and_keep_the_row_numbers(self):
+        self.write(";=1+")  # A formula that can not be parsed
+        ranges = ParallelSpreadsheetLoaderS2V.split_ranges(self.path, 1000)
+        self.assertGreater(len(ranges), 5)
+        self.assertEqual((ranges[0][0], ranges[-1][1]), (0, os.path.getsize(self.path)))
+        self.assertTrue(all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:])))
+        serial = [row for batch in SpreadsheetLoaderS2V().load_spreadsheet(self.path) for row in batch]
+        parallel = [row for batch in ParallelSpreadsheetLoaderS2V(2, 1000).load_spreadsheet(self.path) for row in batch]
+        self.assertEqual([row for row, _ in parallel], [row for row, _ in serial])
+        # The formulas that could be parsed come with their shape and template
+        texts = [[value[0] if isinstance(value, tuple) else value for value in values] for _, values in parallel]
+        self.assertEqual(texts, [values for _, values in serial])
+        self.assertIsInstance(parallel[5][1][1], tuple)
+        self.assertEqual(parallel[5][1][3], "=1+")
+
+    def test02_a_parallel_load_gives_the_values_of_a_serial_load(self):
+        self.write("")
+        serial = Controller()
+        serial.load_spreadsheet_from_file(self.path)
+        parallel = Controller()
+        with mock.patch.object(ParallelSpreadsheetLoaderS2V.__init__, "__defaults__", (None, 1000)):
+            parallel.load_spreadsheet_from_file(self.path, processes=2)
+        coordinates = [f"{column}{row}" for row in range(1, 401) for column in "ABC"]
+        self.assertEqual([parallel.get_cell_content_as_string(coordinate) for coordinate in coordinates],
+                         [serial.get_cell_content_as_string(coordinate) for coordinate in coordinates])
+        parallel.edit_cell("A1", "7")
+        self.assertEqual(parallel.get_cell_content_as_float("B1"), 8)
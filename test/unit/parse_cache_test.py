@@ -0,0 +1,48 @@
+import unittest
+from controller.controller import Controller
+from domain.utils.parse_cache import ParseCache
+
+
+class ParseCacheTest(unittest.TestCase):
+
+    def test01_the_least_recently_used_entry_is_evicted(self):
+        cache = ParseCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.get("a"), cache.get("c"), len(cache)), (1, 3, 2))
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+        with self.assertRaises(ValueError):
+            ParseCache(0)
+        with self.assertRaises(ValueError):
+            cache.put("d", None)
+
+    def test02_filled_down_formulas_are_parsed_once(self):
+        controller = Controller()
+        cache = controller._formula_evaluator.parse_cache
+        controller.set_cell_content("A1", "2")
+        for row in range(1, 21):
+            controller.set_cell_content(f"B{row}", f"=A{row}*3+SUMA(A{row}:A{row + 1})")
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.misses, 1)
+        controller.set_cell_content("C1", "=a1*3+suma(A1:a2)")  # The same relative form in lower case
+        self.assertEqual(len(cache), 2)  # Another column: another relative form
+        controller.set_cell_content("B1", "=a1*3+suma(A1:a2)")
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(controller.get_cell_content_as_float("B1"), 8)
+        self.assertEqual(controller.get_cell_content_as_float("C1"), 8)
+
+    def test03_evicted_shapes_still_evaluate(self):
+        controller = Controller()
+        controller._formula_evaluator.parse_cache = ParseCache(3)
+        controller.set_cell_content("A1", "2")
+        for row in range(2, 30):
+            controller.set_cell_content(f"B{row}", f"=A{row - 1}+{row}")
+        self.assertEqual(len(controller._formula_evaluator.parse_cache), 3)
+        controller.set_cell_content("A1", "5")
+        self.assertEqual(controller.get_cell_content_as_float("B2"), 7)
+        for coordinate in ("C5", "C6"):  # One text, two relative forms
+            controller.set_cell_content(coordinate, "=SUMA(A1:A3;MAX(B1:B4;7);A1)+PROMEDIO(A1:B3)")
+            self.assertEqual(controller.get_cell_content_as_float(coordinate), 5 + 7 + 5 + (5 + 7 + 0) / 3)  # B3 adds to the empty A2
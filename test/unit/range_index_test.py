@@ -0,0 +1,77 @@
+import random
+import time
+import unittest
+from controller.controller import Controller
+from domain.entities.cell import CellIdentifier
+from domain.utils.range_index import RangeIndex
+
+
+class RangeIndexTest(unittest.TestCase):
+
+    def test01_query_matches_brute_force(self):
+        generator = random.Random(4)
+        index = RangeIndex()
+        rectangles = {}
+        for owner in range(400):
+            start_row, start_column = generator.randrange(200), generator.randrange(40)
+            rectangle = (start_row, start_column,
+                         start_row + generator.randrange(120), start_column + generator.randrange(12))
+            index.add(owner, *rectangle)
+            rectangles[owner] = rectangle
+        for owner in range(0, 400, 3):
+            index.remove(owner)
+            del rectangles[owner]
+        self.assertEqual(len(index), len(rectangles))
+        for _ in range(2000):
+            row, column = generator.randrange(330), generator.randrange(55)
+            expected = {owner for owner, (start_row, start_column, end_row, end_column) in rectangles.items()
+                        if start_row <= row <= end_row and start_column <= column <= end_column}
+            self.assertEqual(set(index.query(row, column)), expected)
+
+    def test02_owner_with_repeated_rectangles(self):
+        index = RangeIndex()
+        index.add("B1", 0, 0, 9, 0)
+        index.add("B1", 0, 0, 9, 0)
+        index.add("B2", 5, 0, 5, 3)
+        self.assertEqual(index.query(5, 0), ["B1", "B2"])
+        self.assertEqual(len(index.rectangles("B1")), 2)
+        index.remove("B1")
+        self.assertEqual(index.query(5, 0), ["B2"])
+        self.assertEqual(index.query(2, 0), [])
+        self.assertEqual(len(index), 1)
+
+    def query_time(self, count, end_column, row, column, expected):
+        index = RangeIndex()
+        for end_row in range(count):  # A1:A1, A1:A2, ... or A1:B1, A1:B2, ... all share their first cell
+            index.add(end_row, 0, 0, end_row, end_column)
+        best = float("inf")
+        for _ in range(5):
+            start = time.perf_counter()
+            for _ in range(200):
+                self.assertEqual(index.query(row(count), column), expected(count))
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def test03_prefix_ranges_query_time_does_not_grow_with_their_number(self):
+        def query_time(count):
+            return self.query_time(count, 0, lambda count: count - 1, 0, lambda count: [count - 1])
+
+        # A linear scan of the ranges would be 16 times slower with 16 times more ranges
+        self.assertLess(query_time(16000), 4 * query_time(1000))
+
+    def test04_wide_ranges_next_to_the_cell_are_not_scanned(self):
+        def query_time(count):
+            return self.query_time(count, 1, lambda count: count // 2, 2, lambda count: [])
+
+        self.assertLess(query_time(16000), 4 * query_time(1000))
+
+    def test05_text_is_rejected_in_an_empty_cell_inside_a_range_read_by_a_formula(self):
+        controller = Controller()
+        controller.edit_cell("A1", "1")
+        controller.edit_cell("B1", "=SUMA(A1:A5)")
+        with self.assertRaises(ValueError):
+            controller.edit_cell("A3", "hello")
+        self.assertIsNone(controller._spreadsheet.get_cell(CellIdentifier("A3")))
+        controller.edit_cell("A3", "2")
+        self.assertEqual(controller.get_cell_content_as_float("B1"), 3)
+        controller.edit_cell("A6", "hello")  # Outside the range
@@ -0,0 +1,53 @@
+import unittest
+from unittest import mock
+from controller.controller import Controller
+from domain.entities.cell import CellIdentifier
+from domain.entities.spreadsheet import Spreadsheet
+
+
+class RecalculationEngineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.controller = Controller()
+        self.controller.set_cell_content("A1", "1")
+        self.controller.set_cell_content("A2", "=A1*2")
+        self.controller.set_cell_content("A3", "=A1*3")
+        self.controller.set_cell_content("A4", "=A2+A3")
+        self.controller.set_cell_content("A5", "=A4+A2+A3")
+        self.engine = self.controller._formula_evaluator.recalculation_engine
+
+    def evaluated_by(self, coordinate, content):
+        with mock.patch.object(Spreadsheet, "update_cell_value", autospec=True,
+                               side_effect=Spreadsheet.update_cell_value) as update_cell_value:
+            self.controller.set_cell_content(coordinate, content)
+        return [call.args[1].identifier.coordinate for call in update_cell_value.call_args_list
+                if call.args[1].identifier.coordinate != coordinate]
+
+    def test01_every_dependent_of_a_diamond_is_evaluated_once_and_in_order(self):
+        evaluated = self.evaluated_by("A1", "3")
+        self.assertEqual(sorted(evaluated[:2]), ["A2", "A3"])
+        self.assertEqual(evaluated[2:], ["A4", "A5"])
+        self.assertEqual(self.engine.evaluated_count, 4)
+        self.assertEqual(self.controller.get_cell_content_as_float("A5"), 30)
+        self.assertEqual(self.engine.dirty, set())
+
+    def test02_levels_only_follow_the_edges_between_dirty_cells(self):
+        cells = {CellIdentifier(coordinate) for coordinate in ("A2", "A3", "A4", "A5")}
+        levels = [sorted(identifier.coordinate for identifier in level) for level in self.engine.levels(cells)]
+        self.assertEqual(levels, [["A2", "A3"], ["A4"], ["A5"]])
+        order = [identifier.coordinate for identifier in self.engine.topological_order(cells)]
+        self.assertEqual(order[2:], ["A4", "A5"])
+
+    def test03_changes_reach_the_end_of_long_chains(self):
+        self.controller.set_cell_content("B1", "1")
+        for row in range(2, 2001):
+            self.controller.set_cell_content(f"B{row}", f"=B{row - 1}+1")
+        self.controller.set_cell_content("B1", "10")
+        self.assertEqual(self.controller.get_cell_content_as_float("B2000"), 2009)
+        self.assertEqual(self.engine.evaluated_count, 1999)
+
+    def test04_replacing_a_formula_drops_its_dependencies(self):
+        self.controller.set_cell_content("A4", "7")
+        self.assertEqual(self.controller.get_cell_content_as_float("A5"), 12)
+        self.assertEqual(sorted(self.evaluated_by("A1", "6")), ["A2", "A3", "A5"])
+        self.assertEqual(self.controller.get_cell_content_as_float("A5"), 7 + 12 + 18)
@@ -0,0 +1,50 @@
+import gc
+import unittest
+from unittest import mock
+from controller.controller import Controller
+from domain.entities.cell import CellIdentifier
+from domain.entities.function import Suma
+
+
+class SharedFunctionsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.controller = Controller()
+        for row in range(1, 101):
+            self.controller.edit_cell(f"A{row}", str(row % 7))
+        for row in range(1, 31):
+            self.controller.edit_cell(f"C{row}", f"=SUMA(A1:A100)*{row}+MAX(A1:A100;3)")
+
+    def program(self, coordinate):
+        return self.controller._spreadsheet.get_cell(CellIdentifier(coordinate)).content.program
+
+    def test01_formulas_with_the_same_absolute_function_share_its_result(self):
+        self.controller.edit_cell("D1", "=SUMA(A1:A100)")
+        self.controller.edit_cell("D2", "=SUMA(A1:A99)")
+        self.controller.edit_cell("D3", "=SUMA(A1;A2)")  # Cell arguments are not shared
+        self.controller.edit_cell("D4", "=SUMA(A1;A2)")
+        with mock.patch.object(Suma, "result", side_effect=Suma.result) as result:
+            self.controller._formula_evaluator.recalculate_all()
+        self.assertEqual(result.call_count, 4)
+        self.controller.edit_cell("E1", "=A1*2")
+        self.controller.edit_cell("E2", "=A2*2")
+        self.assertIs(self.program("E1"), self.program("E2"))
+
+    def test02_a_shared_function_is_computed_once_per_recalculation(self):
+        with mock.patch.object(Suma, "result", side_effect=Suma.result) as result:
+            self.controller.edit_cell("A5", "100")
+        self.assertEqual(result.call_count, 1)
+        self.assertEqual(self.controller.get_cell_content_as_float("C30"),
+                         (sum(row % 7 for row in range(1, 101)) - 5 + 100) * 30 + 100)
+        with mock.patch.object(Suma, "result", side_effect=Suma.result) as result:
+            self.controller.edit_cell("A6", "1")
+        self.assertEqual(result.call_count, 1)  # The result of the previous recalculation is not reused
+        self.assertEqual(self.controller.get_cell_content_as_float("C1"), sum(row % 7 for row in range(1, 101)) - 11 + 101 + 100)
+
+    def test03_programs_no_formula_has_are_dropped(self):
+        programs = self.controller._formula_evaluator.programs
+        count = len(programs)
+        for row in range(1, 31):
+            self.controller.edit_cell(f"C{row}", str(row))
+        gc.collect()
+        self.assertLess(len(programs), count)
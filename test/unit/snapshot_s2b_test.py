@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+from controller.controller import Controller
+from use_cases.spreadsheetloader import SnapshotS2B
+
+
+class SnapshotS2BTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "book.s2b")
+        self.controller = Controller()
+        for cell, content in (("A1", "1"), ("A2", "2.5"), ("A1000000", "4"), ("B1", "total"),
+                              ("C1", "=SUMA(A1:A3)*2"), ("C2", "=1/0"), ("C3", "=C1+A2"), ("C4", "=SUMA(D1:D3)")):
+            self.controller.edit_cell(cell, content)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def contents(self, controller):
+        return {cell: (controller.get_cell_content_as_string(cell), controller.get_cell_formula_expression(cell)
+                       if cell.startswith("C") else None)
+                for cell in ("A1", "A2", "A1000000", "B1", "C1", "C2", "C3", "C4")}
+
+    def test01_round_trip_keeps_contents_and_value_types(self):
+        self.controller.save_spreadsheet_to_file(self.path)
+        loaded = Controller()
+        loaded.load_spreadsheet_from_file(self.path)
+        self.assertEqual(self.contents(loaded), self.contents(self.controller))
+        self.assertEqual(loaded.get_cell_content_as_string("C2"), "0")
+        self.assertEqual(loaded.get_cell_content_as_string("C1"), "7.0")
+
+    def test02_snapshot_has_the_graph_and_the_kinds_of_values(self):
+        self.controller.save_spreadsheet_to_file(self.path)
+        snapshot = SnapshotS2B(self.path)
+        try:
+            shapes, kinds, values, order = snapshot.graph()
+        finally:
+            snapshot.close()
+        self.assertEqual(sorted(order), [0, 1, 2, 3])
+        self.assertEqual(sorted(kinds), [SnapshotS2B.NO_VALUE, SnapshotS2B.FLOAT_VALUE,
+                                         SnapshotS2B.FLOAT_VALUE, SnapshotS2B.INTEGER_VALUE])
+
+    def test03_loaded_formulas_recalculate(self):
+        self.controller.save_spreadsheet_to_file(self.path)
+        loaded = Controller()
+        loaded.load_spreadsheet_from_file(self.path)
+        loaded.edit_cell("A2", "10")
+        self.assertEqual(loaded.get_cell_content_as_string("C3"), "32.0")
+        loaded.edit_cell("D2", "5")
+        self.assertEqual(loaded.get_cell_content_as_string("C4"), "5.0")
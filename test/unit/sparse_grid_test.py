@@ -0,0 +1,49 @@
+import random
+import unittest
+from controller.controller import Controller
+from domain.utils.sparse_grid import SparseGrid
+
+
+class SparseGridTest(unittest.TestCase):
+
+    def test01_positions_and_rows_match_brute_force(self):
+        generator = random.Random(12)
+        grid = SparseGrid()
+        occupied = set()
+        for step in range(3000):
+            position = (generator.randrange(0, 5000), generator.randrange(0, 300))
+            if generator.random() < 0.3:
+                self.assertEqual(grid.discard(*position), position in occupied)
+                occupied.discard(position)
+            else:
+                self.assertEqual(grid.add(*position), position not in occupied)
+                occupied.add(position)
+        grid.add_column(7, range(100, 4000, 9))
+        occupied.update((row, 7) for row in range(100, 4000, 9))
+        self.assertEqual(len(grid), len(occupied))
+        self.assertEqual(list(grid), sorted(occupied))
+        for step in range(50):
+            start_row, start_column = generator.randrange(0, 5000), generator.randrange(0, 300)
+            end_row, end_column = start_row + generator.randrange(0, 2000), start_column + generator.randrange(0, 200)
+            self.assertEqual(list(grid.positions(start_row, start_column, end_row, end_column)),
+                             sorted((row, column) for row, column in occupied
+                                    if start_row <= row <= end_row and start_column <= column <= end_column))
+        rows = {}
+        for row, column in sorted(occupied):
+            rows.setdefault(row, []).append(column)
+        self.assertEqual(list(grid.rows(2500)), [(row, columns) for row, columns in rows.items() if row >= 2500])
+        self.assertTrue(grid.contains(100, 7))
+        self.assertEqual(list(grid.positions(10, 10, 5, 20)), [])
+
+    def test02_spreadsheets_list_far_apart_cells_in_row_major_order(self):
+        controller = Controller()
+        for coordinate, content in (("AB3", "x"), ("B1", "1"), ("A3", "=B1*2"), ("Z2", "t"), ("AA1", "5"),
+                                    ("CV1000000", "9")):
+            controller.set_cell_content(coordinate, content)
+        spreadsheet = controller._spreadsheet
+        self.assertEqual([identifier.coordinate for identifier in spreadsheet],
+                         ["B1", "AA1", "Z2", "A3", "AB3", "CV1000000"])
+        controller.set_cell_content("DA1", "=SUMA(A1:CV1000000)")
+        self.assertEqual(controller.get_cell_content_as_float("DA1"), 1 + 5 + 2 + 9)
+        self.assertEqual([identifier.coordinate for identifier in spreadsheet.get_identifiers(2, 0, 1000000, 99)],
+                         ["Z2", "A3", "AB3", "CV1000000"])
@@ -0,0 +1,56 @@
+import io
+import locale
+import os
+import tempfile
+import unittest
+from controller.controller import Controller
+from use_cases.spreadsheetsaver import SpreadsheetSaverS2V
+
+
+class RecordingStream(io.BytesIO):
+
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        return super().write(data)
+
+
+class SpreadsheetWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.controller = Controller()
+        for coordinate, content in (("A1", "1"), ("C1", "2.5"), ("B3", "=SUMA(A1:C1;4)"), ("A5", "ñandú"),
+                                    ("D5", "=A1*2"), ("B2", "1e20"), ("A4", "-0.1")):
+            self.controller.edit_cell(coordinate, content)
+
+    def test01_rows_are_written_as_s2v_lines(self):
+        stream = RecordingStream()
+        SpreadsheetSaverS2V().write_spreadsheet(self.controller._spreadsheet, stream)
+        self.assertEqual(stream.getvalue().decode(locale.getpreferredencoding(False)),
+                         "1;;2.5\n;100000000000000000000\n;=SUMA(A1:C1,4)\n-0.1\nñandú;;;=A1*2")
+        self.assertEqual(stream.writes, 1)
+
+    def test02_big_sheets_are_written_in_blocks(self):
+        for row in range(7, 2007):
+            self.controller.edit_cell(f"B{row}", f"=A{row - 1}+{row}")
+        stream = RecordingStream()
+        SpreadsheetSaverS2V().write_spreadsheet(self.controller._spreadsheet, stream, block_size=1000)
+        lines = stream.getvalue().decode(locale.getpreferredencoding(False)).split("\n")
+        self.assertEqual(len(lines), 2006)
+        self.assertEqual(lines[2005], ";=A2005+2006")
+        self.assertGreater(stream.writes, 10)
+        self.assertLess(stream.writes, 100)
+
+    def test03_saved_files_load_back(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "book.s2v")
+            self.controller.save_spreadsheet_to_file(path)
+            loaded = Controller()
+            loaded.load_spreadsheet_from_file(path)
+        for coordinate in ("A1", "C1", "B2", "B3", "A4", "A5", "D5"):
+            self.assertEqual(loaded.get_cell_content_as_string(coordinate),
+                             self.controller.get_cell_content_as_string(coordinate))
+        self.assertEqual(loaded.get_cell_formula_expression("B3"), "=SUMA(A1:C1;4)")
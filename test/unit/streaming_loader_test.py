@@ -0,0 +1,43 @@
+import os
+import tempfile
+import unittest
+from use_cases.spreadsheetloader import SpreadsheetLoaderS2V
+
+
+class StreamingLoaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "book.s2v")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, text):
+        with open(self.path, "w", newline="") as spreadsheet_file:
+            spreadsheet_file.write(text)
+
+    def test01_rows_come_out_in_batches_while_the_file_is_read(self):
+        self.write("".join(f"{row};=A{row}*2,5\n" if row % 10 else "\n" for row in range(1, 301)))
+        batches = SpreadsheetLoaderS2V().load_spreadsheet(self.path, chunk_size=200)
+        first = next(batches)
+        self.assertLess(len(first), 270)  # The rest of the file has not been read yet
+        rows = first + [row for batch in batches for row in batch]
+        self.assertEqual(len(rows), 270)  # Empty lines are skipped but keep their numbers
+        self.assertEqual(rows[9], (11, [11.0, "=A11*2;5"]))
+        self.assertEqual([row for row, _ in rows], [row for row in range(1, 301) if row % 10])
+
+    def test02_line_ends_and_fields_are_classified(self):
+        self.write("1;text; 2 \r\n\r=SUMA(A1,B1);;x\n")
+        rows = [row for batch in SpreadsheetLoaderS2V().load_spreadsheet(self.path) for row in batch]
+        self.assertEqual(rows, [(1, [1.0, "text", 2.0]), (3, ["=SUMA(A1;B1)", None, "x"])])
+
+    def test03_a_comma_outside_a_formula_is_an_error(self):
+        self.write("1;2\n3,5;4\n")
+        batches = SpreadsheetLoaderS2V().load_spreadsheet(self.path)
+        with self.assertRaises(ValueError):
+            list(batches)
+        with self.assertRaises(FileNotFoundError):
+            SpreadsheetLoaderS2V().load_spreadsheet(os.path.join(self.directory.name, "missing.s2v"))
+        with self.assertRaises(ValueError):
+            SpreadsheetLoaderS2V().load_spreadsheet(self.path[:-4] + ".txt")
@@ -0,0 +1,110 @@
+import os
+import tempfile
+import unittest
+from controller.controller import Controller
+from domain.utils.topological_order import TopologicalOrder
+from test.entities.circular_dependency_exception import CircularDependencyException
+
+
+class TopologicalOrderTest(unittest.TestCase):
+
+    def order_of(self, edges):
+        successors = {}
+        predecessors = {}
+        visited = []
+
+        def get_successors(node):
+            visited.append(node)
+            return successors.get(node, [])
+
+        def get_predecessors(node):
+            visited.append(node)
+            return predecessors.get(node, [])
+
+        order = TopologicalOrder(get_successors, get_predecessors)
+
+        def add_edge(source, target):
+            successors.setdefault(source, []).append(target)
+            predecessors.setdefault(target, []).append(source)
+            if order.add_edge(source, target):
+                return True
+            successors[source].remove(target)
+            predecessors[target].remove(source)
+            return False
+
+        for source, target in edges:
+            for node in (source, target):
+                if node not in order:
+                    order.add_top(node)
+            self.assertTrue(add_edge(source, target))
+        return order, add_edge, visited
+
+    def test01_a_backward_edge_only_reorders_the_nodes_between_its_ends(self):
+        order, add_edge, visited = self.order_of([(node, node + 1) for node in range(0, 1000, 2)])
+        for node in range(1000):
+            if node not in order:
+                order.add_top(node)
+        visited.clear()
+        self.assertTrue(add_edge(503, 500))
+        self.assertLess(order.position(503), order.position(500))
+        self.assertLess(order.position(500), order.position(501))
+        self.assertLessEqual(len(visited), 10)  # Nowhere near the 1000 nodes of the graph
+
+    def test02_an_edge_that_closes_a_cycle_leaves_the_order_untouched(self):
+        order, add_edge, _ = self.order_of([("a", "b"), ("b", "c"), ("c", "d")])
+        positions = {node: order.position(node) for node in "abcd"}
+        self.assertFalse(add_edge("d", "a"))
+        self.assertFalse(add_edge("b", "b"))
+        self.assertEqual({node: order.position(node) for node in "abcd"}, positions)
+
+    def test03_a_rejected_formula_keeps_the_previous_content_and_values(self):
+        controller = Controller()
+        controller.set_cell_content("A1", "1")
+        controller.set_cell_content("A2", "=A1+1")
+        controller.set_cell_content("A3", "=A2+1")
+        controller.set_cell_content("B1", "=SUMA(C1:C10)")
+        for coordinate, content in (("A1", "=A3"), ("A2", "=A3*2"), ("Q9", "=Q9"), ("C5", "=B1")):
+            with self.assertRaises(CircularDependencyException):
+                controller.set_cell_content(coordinate, content)
+        self.assertEqual(controller.get_cell_formula_expression("A2"), "=A1+1")
+        self.assertEqual(controller.get_cell_content_as_string("Q9"), "")
+        controller.set_cell_content("A1", "5")
+        self.assertEqual(controller.get_cell_content_as_float("A3"), 7)
+        controller.set_cell_content("C5", "=A3")
+        self.assertEqual(controller.get_cell_content_as_float("B1"), 7)
+
+    def test04_long_chains_do_not_hit_the_recursion_limit(self):
+        controller = Controller()
+        controller.set_cell_content("A1", "1")
+        for row in range(2, 3000):
+            controller.set_cell_content(f"A{row}", f"=A{row - 1}+1")
+        with self.assertRaises(CircularDependencyException):
+            controller.set_cell_content("A1", "=A2999")
+        controller.set_cell_content("A1", "2")
+        self.assertEqual(controller.get_cell_content_as_float("A2999"), 3000)
+
+    def test05_formulas_written_before_the_cells_they_read_are_reordered(self):
+        controller = Controller()
+        for row in range(1, 300):
+            controller.set_cell_content(f"B{row}", f"=B{row + 1}+1")
+        controller.set_cell_content("B300", "1")
+        self.assertEqual(controller.get_cell_content_as_float("B1"), 300)
+        with self.assertRaises(CircularDependencyException):
+            controller.set_cell_content("B300", "=B1")
+
+    def test06_a_whole_file_is_checked_in_one_pass(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cycle.s2v")
+            with open(path, "w") as spreadsheet_file:
+                spreadsheet_file.write("1;=A1+C1;=B1\n")
+            with self.assertRaises(CircularDependencyException):
+                Controller().load_spreadsheet_from_file(path)
+            with open(path, "w") as spreadsheet_file:
+                spreadsheet_file.write("=B1+1;=C1*2;4\n=A1;=SUMA(A1:C1)\n")
+            controller = Controller()
+            controller.load_spreadsheet_from_file(path)
+            self.assertEqual(controller.get_cell_content_as_float("B2"), 21)
+            controller.set_cell_content("C1", "1")
+            self.assertEqual(controller.get_cell_content_as_float("A2"), 3)
+            with self.assertRaises(CircularDependencyException):
+                controller.set_cell_content("C1", "=A2")
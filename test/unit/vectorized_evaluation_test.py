@@ -0,0 +1,68 @@
+import unittest
+from unittest import mock
+from controller.controller import Controller
+from domain.entities.cell import CellIdentifier
+from domain.entities.formula_evaluator import FormulaEvaluatorPostfix
+from domain.utils.cell_storage import ColumnarCellStorage
+
+
+class VectorizedEvaluationTest(unittest.TestCase):
+
+    ROWS = 60
+
+    def build(self):
+        controller = Controller()
+        for row in range(1, self.ROWS + 1):
+            controller.set_cell_content(f"A{row}", str(row % 13))
+            controller.set_cell_content(f"B{row}", str(row % 7 - 3))
+            controller.set_cell_content(f"C{row}", f"=A{row}*B{row}")
+            controller.set_cell_content(f"D{row}", f"=C{row}/B{row}+2")  # Divides by zero every 7 rows
+            controller.set_cell_content(f"E{row}", f"=(A{row}-1)*(C{row}+0.5)-D{row}+H{row % 5 + 1}*2")
+            controller.set_cell_content(f"F{row}", f"=SUMA(A{row}:B{row})+A{row}")
+        return controller
+
+    def values(self, controller):
+        return [controller.get_cell_content_as_string(f"{column}{row}")
+                for row in range(1, self.ROWS + 1) for column in "CDEF"]
+
+    def test01_runs_give_the_same_values_as_formulas_one_by_one(self):
+        with mock.patch("domain.entities.formula_evaluator._MIN_RUN_LENGTH", 10 ** 9):
+            one_by_one = self.build()
+            one_by_one._formula_evaluator.recalculate_all()
+            one_by_one.set_cell_content("A5", "100")
+            one_by_one.set_cell_content("H2", "4")
+            expected = self.values(one_by_one)
+        vectorized = self.build()
+        with mock.patch.object(FormulaEvaluatorPostfix, "_evaluate_run", autospec=True,
+                               side_effect=FormulaEvaluatorPostfix._evaluate_run) as evaluate_run:
+            vectorized._formula_evaluator.recalculate_all()
+        self.assertGreaterEqual(evaluate_run.call_count, 3)  # The C, D and E columns
+        vectorized.set_cell_content("A5", "100")
+        vectorized.set_cell_content("H2", "4")
+        self.assertEqual(self.values(vectorized), expected)
+
+    def test02_shapes_with_functions_are_not_vectorized(self):
+        controller = self.build()
+        evaluator = controller._formula_evaluator
+        for column, vectorized in (("C", True), ("E", True), ("F", False)):
+            formula = controller._spreadsheet.get_cell(CellIdentifier(f"{column}2"))
+            self.assertEqual(evaluator._vector_program(formula.content.shape, formula) is not None, vectorized)
+
+    def test03_operand_columns_are_read_from_the_arrays(self):
+        controller = Controller()
+        for row in range(1015, 1035):  # Across the end of the first chunk of the arrays
+            if row != 1020:  # Left empty
+                controller.set_cell_content(f"A{row}", str(row % 9))
+        controller.set_cell_content("A1018", "=B1+1")
+        controller.set_cell_content("A1030", "=B1*2")
+        spreadsheet = controller._spreadsheet
+        rows = list(range(1012, 1040))
+        expected = [spreadsheet.get_operand_at(row, 0) for row in rows]
+        with mock.patch.object(ColumnarCellStorage, "get_content_at", autospec=True,
+                               side_effect=ColumnarCellStorage.get_content_at) as get_content_at:
+            self.assertEqual(spreadsheet.get_operands_at(rows, 0), expected)
+            self.assertEqual(get_content_at.call_count, 0)
+            self.assertEqual(spreadsheet.get_operands_at(rows[::-1], 0), expected[::-1])
+        controller.set_cell_content("A1025", "text")
+        with self.assertRaises(ValueError):
+            spreadsheet.get_operands_at(rows, 0)
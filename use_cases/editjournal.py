@@ -0,0 +1,221 @@
+"""
+This file contains the EditJournal class.
+This class keeps an append-only journal of the edits of a spreadsheet, on top of its last checkpoint.
+"""
+import os
+import struct
+import zlib
+
+
+
+class EditJournal:
+    """
+    This class represents the journal of the edits of a spreadsheet. Every edit is appended to the
+    journal file instead of saving the whole spreadsheet, and the journal is written to the disk once
+    every few edits. The journal is compacted from time to time: the whole spreadsheet is saved as a
+    checkpoint, a S2B snapshot, and the journal starts empty again on top of it.
+    Every checkpoint has a generation, which is part of its path, and the journal starts with the
+    generation of the checkpoint it applies to. A new checkpoint is written before the journal is
+    replaced, so a crash at any moment leaves a journal and the checkpoint it applies to.
+    The journal file has a header, the magic, the version and the generation, followed by the records.
+    Every record is an edit, or all the edits of a batch committed at once: its length, its CRC-32 and
+    the identifiers of the cells and their new contents in UTF-8, each one preceded by its length, so
+    a content may hold any character. A record that was being written during a crash is detected and
+    dropped with the rest of the journal after it, and a batch is never replayed in part.
+    """
+    MAGIC = b"S2VJ"
+    VERSION = 2
+    HEADER = struct.Struct("<4sIQ")  # Magic, version and generation of the checkpoint
+    RECORD = struct.Struct("<II")  # Length and CRC-32 of the edit
+    FIELD = struct.Struct("<I")  # Length of an identifier or a content
+    SYNC_EVERY = 64  # The default number of edits written to the disk at once
+    CHECKPOINT_EVERY = 10000  # The default number of edits after which a checkpoint is due
+
+    def __init__(self, file_path: str, sync_every: int = SYNC_EVERY, checkpoint_every: int = CHECKPOINT_EVERY) -> None:
+        """
+        This method initializes the journal. Nothing is written until the first checkpoint is
+        started with start or an existing journal is resumed with resume.
+
+        Keyword arguments:
+        file_path -- the path of the journal file (str)
+        sync_every -- the number of edits written to the disk at once (int)
+        checkpoint_every -- the number of edits after which a checkpoint is due (int)
+
+        Attributes:
+        file_path -- the path of the journal file (str)
+        generation -- the generation of the checkpoint the journal applies to (int)
+        _sync_every -- the number of edits written to the disk at once (int)
+        _checkpoint_every -- the number of edits after which a checkpoint is due (int)
+        _file -- the open journal file, or None (file object)
+        _edits -- the number of edits in the journal (int)
+        _unsynced -- the number of edits not written to the disk yet (int)
+        """
+        if not isinstance(file_path, str):
+            raise ValueError("The file path must be a string.")
+        if not isinstance(sync_every, int) or sync_every < 1:
+            raise ValueError("The number of edits written at once must be a positive integer.")
+        if not isinstance(checkpoint_every, int) or checkpoint_every < 1:
+            raise ValueError("The number of edits between checkpoints must be a positive integer.")
+        self.file_path = file_path
+        self.generation = 0
+        self._sync_every = sync_every
+        self._checkpoint_every = checkpoint_every
+        self._file = None
+        self._edits = 0
+        self._unsynced = 0
+
+    def checkpoint_path(self, generation: int) -> str:
+        """
+        This method returns the path of the checkpoint of a generation.
+        """
+        return f"{self.file_path}.{generation}.s2b"
+
+    def start(self, generation: int) -> None:
+        """
+        This method starts an empty journal on top of a new checkpoint, which must have been written
+        already, and removes the previous checkpoint.
+
+        Keyword arguments:
+        generation -- the generation of the new checkpoint (int)
+        """
+        self.close()
+        with open(self.checkpoint_path(generation), "rb") as checkpoint_file:
+            os.fsync(checkpoint_file.fileno())  # The checkpoint must be on the disk before the journal refers to it
+        temporary_path = self.file_path + ".tmp"
+        with open(temporary_path, "wb") as journal_file:
+            journal_file.write(self.HEADER.pack(self.MAGIC, self.VERSION, generation))
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        os.replace(temporary_path, self.file_path)
+        if 0 < self.generation != generation and os.path.exists(self.checkpoint_path(self.generation)):
+            os.remove(self.checkpoint_path(self.generation))
+        self.generation = generation
+        self._file = open(self.file_path, "ab")
+        self._edits = 0
+        self._unsynced = 0
+
+    def resume(self):
+        """
+        This method reads an existing journal and keeps appending to it. An incomplete or damaged record
+        at its end is cut off, with the rest of the journal after it.
+
+        Keyword arguments:
+        return -- the edits of the journal (list of tuples (str, str))
+        """
+        self.close()
+        with open(self.file_path, "rb") as journal_file:
+            data = journal_file.read()
+        try:
+            magic, version, generation = self.HEADER.unpack_from(data, 0)
+        except struct.error:
+            raise ValueError("The journal is not valid.")
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError("The journal is not a journal of a known version.")
+        edits = []
+        offset = self.HEADER.size
+        while offset + self.RECORD.size <= len(data):
+            length, checksum = self.RECORD.unpack_from(data, offset)
+            payload = data[offset + self.RECORD.size:offset + self.RECORD.size + length]
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                break
+            try:
+                edits.extend(self._decode(payload))
+            except (ValueError, struct.error):
+                break
+            offset += self.RECORD.size + length
+        self.generation = generation
+        self._file = open(self.file_path, "r+b")
+        self._file.truncate(offset)
+        self._file.seek(offset)
+        self._edits = len(edits)
+        self._unsynced = 0
+        return edits
+
+    def append(self, cell_identifier: str, content: str) -> bool:
+        """
+        This method appends an edit to the journal. The edits are written to the disk once every few
+        edits, or when sync is called.
+
+        Keyword arguments:
+        cell_identifier -- the identifier of the cell (str)
+        content -- the new content of the cell (str)
+        return -- True if a checkpoint is due, False otherwise (bool)
+        """
+        return self.append_batch([(cell_identifier, content)])
+
+    def append_batch(self, edits: list) -> bool:
+        """
+        This method appends the edits of a batch to the journal as a single record, so they are
+        replayed either all or none.
+
+        Keyword arguments:
+        edits -- the identifiers of the cells and their new contents, in the order they were made
+                 (list of tuples (str, str))
+        return -- True if a checkpoint is due, False otherwise (bool)
+        """
+        if self._file is None:
+            raise ValueError("The journal is not open.")
+        payload = self._encode(edits)
+        self._file.write(self.RECORD.pack(len(payload), zlib.crc32(payload)) + payload)
+        self._edits += len(edits)
+        self._unsynced += len(edits)
+        if self._unsynced >= self._sync_every:
+            self.sync()
+        return self._edits >= self._checkpoint_every
+
+    @staticmethod
+    def _encode(edits: list) -> bytes:
+        """
+        This method encodes the edits of a record: every identifier and content in UTF-8, preceded by its length.
+
+        Keyword arguments:
+        edits -- the identifiers of the cells and their new contents (list of tuples (str, str))
+        return -- the payload of the record (bytes)
+        """
+        parts = []
+        for cell_identifier, content in edits:
+            for field in (cell_identifier, content):
+                data = field.encode("utf-8")
+                parts.append(EditJournal.FIELD.pack(len(data)))
+                parts.append(data)
+        return b"".join(parts)
+
+    @staticmethod
+    def _decode(payload: bytes) -> list:
+        """
+        This method decodes the edits of a record, as encoded by _encode.
+
+        Keyword arguments:
+        payload -- the payload of the record (bytes)
+        return -- the identifiers of the cells and their new contents (list of tuples (str, str))
+        """
+        fields = []
+        offset = 0
+        while offset < len(payload):
+            length, = EditJournal.FIELD.unpack_from(payload, offset)
+            offset += EditJournal.FIELD.size
+            if offset + length > len(payload):
+                raise ValueError("The record is not valid.")
+            fields.append(payload[offset:offset + length].decode("utf-8"))
+            offset += length
+        if len(fields) % 2:
+            raise ValueError("The record is not valid.")
+        return list(zip(fields[0::2], fields[1::2]))
+
+    def sync(self) -> None:
+        """
+        This method writes the edits appended so far to the disk.
+        """
+        if self._file is not None and self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def close(self) -> None:
+        """
+        This method writes the pending edits to the disk and closes the journal.
+        """
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
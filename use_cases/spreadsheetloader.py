@@ -4,9 +4,25 @@ It also contains the SpreadsheetLoaderS2V concrete class.
 This class loads a spreadsheet from a file.
 """
 import abc
+import bisect
+import hashlib
+import io
+import locale
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from domain.entities.spreadsheet import Spreadsheet
-from domain.utils.utils import int_to_base26
-from domain.entities.content import Formula
+from domain.entities.formula_evaluator import FormulaEvaluatorPostfix, ENGINE_VERSION
+
+_CHUNK_SIZE = 1 << 18  # The number of characters read at once, which bounds the size of every batch of rows
+_DIGEST_CHUNK_SIZE = 1 << 20  # The number of bytes hashed at once
+_RANGE_SIZE = 1 << 22  # The number of bytes of the file parsed by every task of a parallel load
+_NEWLINE_RE = re.compile(rb"\r\n?|\n")
 
 
 class SpreadsheetLoader(abc.ABC):
@@ -15,13 +31,13 @@ class SpreadsheetLoader(abc.ABC):
     """
 
     @abc.abstractmethod
-    def load_spreadsheet(self, file_path: str) -> Spreadsheet:
+    def load_spreadsheet(self, file_path: str):
         """
         This method loads the spreadsheet from a file.
 
         Keyword arguments:
         file_path -- the path of the file (str)
-        return -- the spreadsheet (Spreadsheet)
+        return -- the contents of the spreadsheet
         """
         pass
 
@@ -29,50 +45,701 @@ class SpreadsheetLoader(abc.ABC):
 class SpreadsheetLoaderS2V(SpreadsheetLoader):
     """
     This class represents a spreadsheet loader.
+    The file is read by a pipeline of generators: the lines are read in chunks, every line is split
+    in its fields, and the fields are classified, so the rows come out in batches while the rest of
+    the file has not been read yet. Only one chunk of the file is in memory at a time.
     """
 
-    def load_spreadsheet(self, file_path: str) -> list:
+    def load_spreadsheet(self, file_path: str, chunk_size: int = _CHUNK_SIZE):
         """
-        This method parses the file and returns the list of cells to be loaded to the spreadsheet.
+        This method checks the file and returns the batches of rows to be loaded to the spreadsheet.
+        Every row is a tuple with its number, starting at 1, and the values of its fields, where the
+        column of a value is its index: numbers are floats, and texts and formulas are strings.
+        Formulas keep their "=" and have their commas replaced by semicolons.
 
         Keyword arguments:
         file_path -- the path of the file (str)
-        return -- the spreadsheet_to_load (lis)
+        chunk_size -- the approximate number of characters read for every batch (int)
+        return -- the batches of rows (iterator of lists of tuples (int, list))
+        """
+        file_path = self.check_path(file_path)
+        spreadsheet_file = open(file_path)  # Opened now, so a missing file is reported at once
+        return self.classify_rows(self.split_lines(self.read_chunks(spreadsheet_file, chunk_size)))
+
+    @staticmethod
+    def check_path(file_path: str) -> str:
+        """
+        This method checks the path of a file.
+
+        Keyword arguments:
+        file_path -- the path of the file (str)
+        return -- the path without surrounding whitespace (str)
         """
-        cells_to_load = []
-        file_path = file_path.strip()
         if not isinstance(file_path, str):
             raise ValueError("The file path must be a string.")
+        file_path = file_path.strip()
         if not file_path.endswith(".s2v"):
             raise ValueError("The file must be a .s2v file.")
-        spreadsheet_to_load = Spreadsheet()
-        with open(file_path) as spreadsheet_file:
-            row_number = 1
-            for line in spreadsheet_file:
+        return file_path
+
+    @staticmethod
+    def read_chunks(spreadsheet_file, chunk_size: int):
+        """
+        This method reads the lines of a file in chunks. The file is closed when it has been read.
+
+        Keyword arguments:
+        spreadsheet_file -- the open file (file object)
+        chunk_size -- the approximate number of characters of every chunk (int)
+        return -- the chunks (iterator of lists of str)
+        """
+        with spreadsheet_file:
+            while True:
+                lines = spreadsheet_file.readlines(chunk_size)
+                if not lines:
+                    return
+                yield lines
+
+    @staticmethod
+    def split_lines(chunks, first_row: int = 0):
+        """
+        This method splits the lines of every chunk in their fields, skipping the empty lines.
+
+        Keyword arguments:
+        chunks -- the chunks of lines (iterator of lists of str)
+        first_row -- the number of lines of the file before the first chunk (int)
+        return -- the rows of every chunk (iterator of lists of tuples (int, list of str))
+        """
+        row_number = first_row
+        for lines in chunks:
+            rows = []
+            for line in lines:
+                row_number += 1
                 line = line.strip()
-                if line != "":
-                    row_cells = line.split(";")
-                    for column in range(len(row_cells)):
-                        string_value = row_cells[column]
-                        if row_cells[column] == "":
-                            pass
-                        elif row_cells[column][0] == "=" and "," in row_cells[column]:
-                            # If there is a comma in a formula, replace it with a semicolon
-                            row_cells[column] = row_cells[column].replace(",", ";")
-                        elif "," in row_cells[column]:
+                if line == "":
+                    continue
+                fields = line.split(";")
+                for column, field in enumerate(fields):
+                    if "," in field:
+                        if field[0] != "=":
                             raise ValueError("The file is not valid.")
-                        cells_to_load.append((int_to_base26(column) + str(row_number), row_cells[column]))
-                row_number += 1
-        return cells_to_load
+                        # If there is a comma in a formula, replace it with a semicolon
+                        fields[column] = field.replace(",", ";")
+                rows.append((row_number, fields))
+            yield rows
+
+    @staticmethod
+    def classify_rows(batches):
+        """
+        This method classifies the fields of every row: the numbers are converted to floats once here,
+        so the consumer does not have to parse them again, the texts and formulas are kept as strings,
+        and the empty fields become None, because they hold no cell.
+
+        Keyword arguments:
+        batches -- the rows of every chunk (iterator of lists of tuples (int, list of str))
+        return -- the classified rows of every chunk (iterator of lists of tuples (int, list))
+        """
+        for rows in batches:
+            for row_number, fields in rows:
+                for column, field in enumerate(fields):
+                    if not field.strip():
+                        fields[column] = None
+                        continue
+                    try:
+                        fields[column] = float(field)
+                    except ValueError:
+                        pass
+            yield rows
+
+
+
+_worker_evaluator = None  # The formula evaluator of a worker process of a parallel load
+
+
+def _start_worker() -> None:
+    """
+    This function prepares a worker process of a parallel load. Every worker keeps its own parse
+    cache, so the formulas with the same relative form are parsed once per worker.
+    """
+    global _worker_evaluator
+    _worker_evaluator = FormulaEvaluatorPostfix(Spreadsheet())
+
+
+def _read_range(file_path: str, start: int, end: int) -> bytes:
+    """
+    This function reads a range of bytes of a file.
+    """
+    with open(file_path, "rb") as spreadsheet_file:
+        spreadsheet_file.seek(start)
+        return spreadsheet_file.read(end - start)
+
+
+def _count_lines(file_path: str, start: int, end: int) -> int:
+    """
+    This function counts the lines of a range of bytes of a file, as text mode splits them:
+    a line ends with "\n", "\r\n" or a lone "\r". The range must start at the beginning of a line.
+    """
+    data = _read_range(file_path, start, end)
+    lines = data.count(b"\n") + data.count(b"\r") - data.count(b"\r\n")
+    return lines + (1 if data and data[-1:] not in (b"\n", b"\r") else 0)
+
+
+def _parse_range(file_path: str, start: int, end: int, first_row: int) -> list:
+    """
+    This function reads the rows of a range of bytes of a file and parses their formulas.
+    Every formula is replaced by a tuple with its text, its shape and its template. The formulas
+    with the same relative form share their shape and template objects, so they are sent back to
+    the parent process once per range. The formulas that can not be parsed are kept as text, so the
+    parent process reports their errors as it would without workers.
+
+    Keyword arguments:
+    file_path -- the path of the file (str)
+    start, end -- the range of bytes, starting and ending at the beginning of a line (int)
+    first_row -- the number of lines of the file before the range (int)
+    return -- the rows of the range, as returned by SpreadsheetLoaderS2V (list of tuples (int, list))
+    """
+    lines = io.TextIOWrapper(io.BytesIO(_read_range(file_path, start, end))).readlines()
+    rows = next(SpreadsheetLoaderS2V.classify_rows(SpreadsheetLoaderS2V.split_lines([lines], first_row)))
+    for row_number, values in rows:
+        for column, value in enumerate(values):
+            if isinstance(value, str):
+                text = value.strip()
+                if text.startswith("="):
+                    try:
+                        values[column] = (text, ) + _worker_evaluator.parse_template(text[1:], row_number, column)
+                    except Exception:
+                        pass
+    return rows
+
+
+class ParallelSpreadsheetLoaderS2V(SpreadsheetLoaderS2V):
+    """
+    This class represents a spreadsheet loader that uses a pool of processes.
+    The file is split at line boundaries into ranges of bytes. The workers first count the lines of
+    every range, so every range knows the number of its first row, and then they split, classify and
+    parse the rows of the ranges, formulas included. The batches of rows come out in the order of the
+    file, one per range, with a bounded number of ranges in flight, so the parent process builds the
+    cells while the workers parse the next ranges.
+    Files smaller than a range are loaded without workers.
+    """
+
+    def __init__(self, processes: int = None, range_size: int = _RANGE_SIZE) -> None:
+        """
+        This method initializes the loader.
+
+        Keyword arguments:
+        processes -- the number of worker processes, or None to use one per core (int)
+        range_size -- the approximate number of bytes of every range (int)
+
+        Attributes:
+        _processes -- the number of worker processes (int)
+        _range_size -- the approximate number of bytes of every range (int)
+        """
+        if processes is not None and (not isinstance(processes, int) or processes < 1):
+            raise ValueError("The number of processes must be a positive integer.")
+        if not isinstance(range_size, int) or range_size < 1:
+            raise ValueError("The range size must be a positive integer.")
+        self._processes = processes if processes is not None else os.cpu_count() or 1
+        self._range_size = range_size
+
+    def load_spreadsheet(self, file_path: str, chunk_size: int = _CHUNK_SIZE):
+        """
+        This method checks the file and returns the batches of rows to be loaded to the spreadsheet.
+        The rows are the ones of SpreadsheetLoaderS2V, except that the formulas parsed by the workers
+        are tuples with their text, their shape and their template.
+
+        Keyword arguments:
+        file_path -- the path of the file (str)
+        chunk_size -- the approximate number of characters of every batch if the file is loaded without workers (int)
+        return -- the batches of rows (iterator of lists of tuples (int, list))
+        """
+        file_path = self.check_path(file_path)
+        ranges = self.split_ranges(file_path, self._range_size)
+        if len(ranges) < 2:
+            return super().load_spreadsheet(file_path, chunk_size)
+        return self._load_ranges(file_path, ranges)
+
+    @staticmethod
+    def split_ranges(file_path: str, range_size: int) -> list:
+        """
+        This method splits a file into ranges of bytes that start at the beginning of a line.
+
+        Keyword arguments:
+        file_path -- the path of the file (str)
+        range_size -- the approximate number of bytes of every range (int)
+        return -- the ranges (list of tuples (start, end))
+        """
+        ranges = []
+        with open(file_path, "rb") as spreadsheet_file:
+            size = os.fstat(spreadsheet_file.fileno()).st_size
+            start = 0
+            while start < size:
+                spreadsheet_file.seek(start + range_size)
+                spreadsheet_file.readline()  # Move to the beginning of the next line
+                end = min(spreadsheet_file.tell(), size)
+                ranges.append((start, end))
+                start = end
+        return ranges
+
+    def _load_ranges(self, file_path: str, ranges: list):
+        """
+        This method parses the ranges of a file in the worker processes.
+
+        Keyword arguments:
+        file_path -- the path of the file (str)
+        ranges -- the ranges of bytes (list of tuples (start, end))
+        return -- the rows of every range (iterator of lists of tuples (int, list))
+        """
+        with ProcessPoolExecutor(self._processes, initializer=_start_worker) as pool:
+            counts = pool.map(_count_lines, [file_path] * len(ranges), *zip(*ranges))
+            first_rows = [0]
+            for count in counts:
+                first_rows.append(first_rows[-1] + count)
+            pending = deque()
+            for (start, end), first_row in zip(ranges, first_rows):
+                pending.append(pool.submit(_parse_range, file_path, start, end, first_row))
+                if len(pending) >= 2 * self._processes:  # Bounds the parsed rows waiting for the parent
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+
+
+class MappedS2VFile:
+    """
+    This class represents a S2V file mapped in memory. Opening it only finds where every line starts,
+    the rows that may hold formulas and the rows that have commas, which are checked at once. The
+    fields are decoded when they are read, one row or one field at a time, so the cells of the rows
+    that are never read are never created.
+    Lines end with "\n", "\r\n" or a lone "\r", as in text mode. The file must not be changed while it is mapped.
+    """
+
+    def __init__(self, file_path: str) -> None:
+        """
+        This method maps a file and indexes its lines.
+
+        Keyword arguments:
+        file_path -- the path of the file (str)
+
+        Attributes:
+        _file -- the open file (file object)
+        _map -- the contents of the file (mmap or bytes if the file is empty)
+        _encoding -- the encoding of the file, the one used by text mode (str)
+        _starts -- the offset where every line starts, followed by the size of the file (array of ints)
+        _formula_rows -- the rows with an equal sign, which may hold formulas, sorted (list of ints)
+        """
+        self._file = open(file_path, "rb")
+        self._map = b""
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size:  # Empty files can not be mapped
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._encoding = locale.getpreferredencoding(False)
+            self._starts = array('q', [0])
+            for newline in _NEWLINE_RE.finditer(self._map):
+                self._starts.append(newline.end())
+            if self._starts[-1] != size:
+                self._starts.append(size)
+            self._formula_rows = self._rows_with(b"=")
+            for row in self._rows_with(b","):
+                self.read_row(row)  # Raises if a comma is outside a formula
+        except BaseException:
+            self.close()
+            raise
+
+    def _rows_with(self, character: bytes) -> list:
+        """
+        This method finds the rows that have a character.
+
+        Keyword arguments:
+        character -- the character (bytes)
+        return -- the rows, starting at 1 (list of ints)
+        """
+        rows = []
+        position = self._map.find(character)
+        while position != -1:
+            row = bisect.bisect_right(self._starts, position)
+            rows.append(row)
+            position = self._map.find(character, self._starts[row])
+        return rows
+
+    @property
+    def row_count(self):
+        """
+        Getter for the number of lines of the file.
+        """
+        return len(self._starts) - 1
+
+    @property
+    def formula_rows(self):
+        """
+        Getter for the rows with an equal sign, which may hold formulas.
+        """
+        return self._formula_rows
+
+    def _line(self, row: int) -> bytes:
+        """
+        This method returns a line without its surrounding whitespace, or an empty line for the rows out of the file.
+        """
+        if row < 1 or row >= len(self._starts):
+            return b""
+        return self._map[self._starts[row - 1]:self._starts[row]].strip()
+
+    def read_row(self, row: int) -> list:
+        """
+        This method decodes the fields of a row, as SpreadsheetLoaderS2V.split_lines does.
+
+        Keyword arguments:
+        row -- the row, starting at 1 (int)
+        return -- the fields of the row, empty for an empty line (list of str)
+        """
+        line = self._line(row)
+        if not line:
+            return []
+        fields = line.decode(self._encoding).split(";")
+        for column, field in enumerate(fields):
+            if "," in field:
+                if field[0] != "=":
+                    raise ValueError("The file is not valid.")
+                fields[column] = field.replace(",", ";")
+        return fields
+
+    def read_field(self, row: int, column: int) -> bytes:
+        """
+        This method returns a field of a row without decoding it nor the rest of the row.
+
+        Keyword arguments:
+        row -- the row, starting at 1 (int)
+        column -- the column, starting at 0 (int)
+        return -- the field (bytes) or None if the row has no such field
+        """
+        line = self._line(row)
+        if not line:
+            return None
+        fields = line.split(b";", column + 1)
+        return fields[column] if column < len(fields) else None
+
+    def decode(self, field: bytes) -> str:
+        """
+        This method decodes a field returned by read_field.
+        """
+        return field.decode(self._encoding)
+
+    def close(self) -> None:
+        """
+        This method unmaps the file and closes it.
+        """
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._map = b""
+        self._file.close()
+
+
+class MappedSpreadsheetLoaderS2V(SpreadsheetLoaderS2V):
+    """
+    This class represents a spreadsheet loader that maps the file in memory instead of reading it.
+    It returns the mapped file, so the spreadsheet can be kept in a MappedCellStorage that creates the
+    cells of every row the first time the row is read or changed.
+    """
+
+    def load_spreadsheet(self, file_path: str, chunk_size: int = _CHUNK_SIZE):
+        """
+        This method checks the file and maps it.
+
+        Keyword arguments:
+        file_path -- the path of the file (str)
+        chunk_size -- not used, the file is not read in chunks (int)
+        return -- the mapped file (MappedS2VFile)
+        """
+        return MappedS2VFile(self.check_path(file_path))
+
+
+
+class SnapshotS2B:
+    """
+    This class represents a S2B file, a binary snapshot of a spreadsheet, mapped in memory.
+    The file starts with a header and a directory of sections, so opening it reads a few bytes and
+    every section is found without reading the rest. All the numbers are little-endian and every
+    array starts at a multiple of 8 bytes, so the arrays are copied from the map in one block each:
+    - "NUMS": the plain numbers of every column, in chunks of consecutive rows, as raw doubles and a byte
+      mask of the rows that hold a number.
+    - "STRS": the table of texts, formulas and shapes, every distinct string once, in UTF-8.
+    - "CELL": the rest of the cells: their rows, columns, kinds, strings and numbers.
+    - "GRPH": optional, for the formula cells in the order of "CELL": their shapes, the kinds of their
+      computed values, their computed values and their topological order.
+    """
+    MAGIC = b"S2B1"
+    VERSION = 3
+    NUMBER, TEXT, FORMULA, EMPTY = range(4)  # The kinds of the cells of the "CELL" section
+    NO_VALUE, FLOAT_VALUE, INTEGER_VALUE = range(3)  # The kinds of the computed values of the "GRPH" section
+    HEADER = struct.Struct("<4sII4x")  # Magic, version and number of sections
+    SECTION = struct.Struct("<4s4xQQ")  # Name, offset and length of a section
+    COLUMN = struct.Struct("<IIQQQ")  # Column, number of rows, first row, offsets of the mask and the values
+    COUNT = struct.Struct("<Q")
+
+    def __init__(self, file_path: str) -> None:
+        """
+        This method maps a file and reads its header.
+
+        Keyword arguments:
+        file_path -- the path of the file (str)
+
+        Attributes:
+        _file -- the open file (file object)
+        _map -- the contents of the file (mmap)
+        _sections -- where every section starts and its length (dict of bytes -> tuple (int, int))
+        """
+        self._file = open(file_path, "rb")
+        self._map = None
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, count = self.HEADER.unpack_from(self._map, 0)
+            if magic != self.MAGIC or version != self.VERSION:
+                raise ValueError("The file is not a S2B file of a known version.")
+            self._sections = {}
+            for index in range(count):
+                name, offset, length = self.SECTION.unpack_from(self._map, self.HEADER.size + index * self.SECTION.size)
+                if offset + length > len(self._map):
+                    raise ValueError("The file is truncated.")
+                self._sections[name] = (offset, length)
+            if not {b"NUMS", b"STRS", b"CELL"} <= self._sections.keys():
+                raise ValueError("The file is not valid.")
+        except (ValueError, struct.error):
+            self.close()
+            raise ValueError("The file is not valid.")
+
+    @staticmethod
+    def align(size: int) -> int:
+        """
+        This method rounds a size up to a multiple of 8 bytes.
+        """
+        return (size + 7) & ~7
+
+    @staticmethod
+    def value_kind(value) -> int:
+        """
+        This method returns the kind of a computed value, which is stored next to it as a double.
+
+        Keyword arguments:
+        value -- the computed value (int, float) or None if there is none
+        return -- NO_VALUE, FLOAT_VALUE or INTEGER_VALUE (int)
+        """
+        if value is None:
+            return SnapshotS2B.NO_VALUE
+        return SnapshotS2B.INTEGER_VALUE if isinstance(value, int) else SnapshotS2B.FLOAT_VALUE
+
+    @staticmethod
+    def typed_value(kind: int, number: float):
+        """
+        This method returns a computed value with the type it had when it was stored, so an integer
+        result, such as the 0 of a division by zero, is not read back as a float.
+
+        Keyword arguments:
+        kind -- the kind of the computed value, as given by value_kind (int)
+        number -- the computed value, stored as a double (float)
+        return -- the computed value (int, float) or None if there is none
+        """
+        if kind == SnapshotS2B.NO_VALUE:
+            return None
+        return int(number) if kind == SnapshotS2B.INTEGER_VALUE else number
+
+    def _array(self, typecode: str, section: bytes, offset: int, count: int) -> array:
+        """
+        This method copies an array out of a section.
+
+        Keyword arguments:
+        typecode -- the type of the items, "d", "I", "Q" or "B" (str)
+        section -- the name of the section (bytes)
+        offset -- where the array starts in the section (int)
+        count -- the number of items (int)
+        return -- the array (array)
+        """
+        start, length = self._sections[section]
+        items = array(typecode)
+        end = offset + count * items.itemsize
+        if end > length:
+            raise ValueError("The file is not valid.")
+        items.frombytes(self._map[start + offset:start + end])
+        if sys.byteorder == "big":
+            items.byteswap()
+        return items
+
+    def _count(self, section: bytes) -> int:
+        """
+        This method reads the number of items of a section, stored at its start.
+        """
+        return self.COUNT.unpack_from(self._map, self._sections[section][0])[0]
+
+    def number_columns(self):
+        """
+        This method returns the plain numbers of every column, in chunks of consecutive rows.
+
+        Keyword arguments:
+        return -- the numbers (iterator of tuples (column, first row, array of doubles, bytearray))
+        """
+        start = self._sections[b"NUMS"][0]
+        for index in range(self._count(b"NUMS")):
+            column, rows, first_row, mask_offset, values_offset = self.COLUMN.unpack_from(
+                self._map, start + self.COUNT.size + index * self.COLUMN.size)
+            mask = bytearray(self._array("B", b"NUMS", mask_offset, rows))
+            yield column, first_row, self._array("d", b"NUMS", values_offset, rows), mask
+
+    def strings(self) -> list:
+        """
+        This method decodes the table of strings.
+
+        Keyword arguments:
+        return -- the strings (list of str)
+        """
+        count = self._count(b"STRS")
+        offsets = self._array("Q", b"STRS", self.COUNT.size, count + 1)
+        start = self._sections[b"STRS"][0] + self.align(self.COUNT.size + 8 * (count + 1))
+        return [self._map[start + offsets[index]:start + offsets[index + 1]].decode("utf-8", "surrogatepass")
+                for index in range(count)]
+
+    def cells(self) -> tuple:
+        """
+        This method returns the cells that are not plain numbers, as parallel arrays.
+
+        Keyword arguments:
+        return -- the rows, the columns, the kinds, the strings (an index of the table of strings) and
+                  the numbers of the cells (tuple of arrays)
+        """
+        count = self._count(b"CELL")
+        offset = self.COUNT.size
+        arrays = []
+        for typecode, size in (("I", 4), ("I", 4), ("B", 1), ("I", 4), ("d", 8)):
+            arrays.append(self._array(typecode, b"CELL", offset, count))
+            offset += self.align(size * count)
+        return tuple(arrays)
+
+    def graph(self) -> tuple:
+        """
+        This method returns the shapes, the computed values and the topological order of the formulas.
+
+        Keyword arguments:
+        return -- the shape of every formula (an index of the table of strings), the kind of its
+                  computed value, its computed value, and the formulas in topological order
+                  (tuple of arrays), or None if the file does not have them
+        """
+        if b"GRPH" not in self._sections:
+            return None
+        count = self._count(b"GRPH")
+        offset = self.COUNT.size
+        arrays = []
+        for typecode, size in (("I", 4), ("B", 1), ("d", 8), ("I", 4)):
+            arrays.append(self._array(typecode, b"GRPH", offset, count))
+            offset += self.align(size * count)
+        return tuple(arrays)
+
+    def close(self) -> None:
+        """
+        This method unmaps the file and closes it.
+        """
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+class SpreadsheetLoaderS2B(SpreadsheetLoader):
+    """
+    This class represents a loader of S2B snapshots.
+    """
+
+    def load_spreadsheet(self, file_path: str):
+        """
+        This method checks the file and maps it.
+
+        Keyword arguments:
+        file_path -- the path of the file (str)
+        return -- the mapped snapshot (SnapshotS2B)
+        """
+        if not isinstance(file_path, str):
+            raise ValueError("The file path must be a string.")
+        file_path = file_path.strip()
+        if not file_path.endswith(".s2b"):
+            raise ValueError("The file must be a .s2b file.")
+        return SnapshotS2B(file_path)
+
+
+class ComputedValuesLoader:
+    """
+    This class represents a loader of the computed values of the formulas of a S2V file, kept in a
+    sidecar file next to it, the path of the S2V file followed by ".values". The sidecar is stamped
+    with a hash of the contents of the S2V file and the version of the formula engine, so the values
+    are only trusted while both match. All the numbers are little-endian:
+    - A header: the magic, the version of the format, the version of the engine, the SHA-256 of the
+      S2V file and the number of formulas.
+    - The rows, the columns, the kinds of the computed values, as in the "GRPH" section of SnapshotS2B,
+      and the computed values of the formulas, as arrays.
+    """
+    MAGIC = b"S2VV"
+    VERSION = 2
+    SUFFIX = ".values"
+    HEADER = struct.Struct("<4sII32sQ")  # Magic, version, engine version, hash of the S2V file and number of formulas
+
+    @staticmethod
+    def sidecar_path(file_path: str) -> str:
+        """
+        This method returns the path of the sidecar of a S2V file.
+        """
+        return file_path + ComputedValuesLoader.SUFFIX
+
+    @staticmethod
+    def digest(file_path: str) -> bytes:
+        """
+        This method computes the hash of the contents of a file.
+
+        Keyword arguments:
+        file_path -- the path of the file (str)
+        return -- the SHA-256 of the file (bytes)
+        """
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as hashed_file:
+            for chunk in iter(lambda: hashed_file.read(_DIGEST_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.digest()
+
+    def load_values(self, file_path: str) -> dict:
+        """
+        This method reads the computed values of the formulas of a S2V file from its sidecar.
+
+        Keyword arguments:
+        file_path -- the path of the S2V file (str)
+        return -- the computed value of every formula, or None if it has none (dict of (row, column) ->
+                  int or float), or None if there is no sidecar or it does not match the file or the engine
+        """
+        file_path = SpreadsheetLoaderS2V.check_path(file_path)
+        try:
+            with open(self.sidecar_path(file_path), "rb") as sidecar_file:
+                data = sidecar_file.read()
+            magic, version, engine_version, digest, count = self.HEADER.unpack_from(data, 0)
+        except (OSError, struct.error):
+            return None
+        if magic != self.MAGIC or version != self.VERSION or engine_version != ENGINE_VERSION:
+            return None
+        arrays = []
+        offset = self.HEADER.size
+        for typecode in ("I", "I", "B", "d"):
+            items = array(typecode)
+            end = offset + count * items.itemsize
+            if end > len(data):
+                return None
+            items.frombytes(data[offset:end])
+            if sys.byteorder == "big":
+                items.byteswap()
+            arrays.append(items)
+            offset = end
+        if digest != self.digest(file_path):  # The file has changed since the values were computed
+            return None
+        rows, columns, kinds, values = arrays
+        return {(row, column): SnapshotS2B.typed_value(kind, value)
+                for row, column, kind, value in zip(rows, columns, kinds, values)}
 
 
 if __name__ == "__main__":
     loader = SpreadsheetLoaderS2V()
     # WARNING: the path of the file IS HARDCODED
-    spreadsheet = loader.load_spreadsheet("/home/marc/PycharmProjects/spreadsheet/tests/spreadsheet_test.s2v")
-    for cell_id in spreadsheet:
-        cell = spreadsheet.get_cell(cell_id)
-        if isinstance(cell.content, Formula):
-            print(cell.identifier.coordinate, cell.content.textual_representation)
-        else:
-            print(cell.identifier.coordinate, cell.content.value.value)
+    for batch in loader.load_spreadsheet("/home/marc/PycharmProjects/spreadsheet/tests/spreadsheet_test.s2v"):
+        for row_number, values in batch:
+            print(row_number, values)
@@ -4,10 +4,19 @@ It also contains the SpreadsheetSaverS2V concrete class.
 This class saves a spreadsheet to a file.
 """
 import abc
-from domain.utils.utils import base26_to_int
+import itertools
+import locale
+import os
+import sys
+import weakref
+from array import array
 from domain.entities.content import Formula, NumericalContent, TextualContent
 from domain.entities.spreadsheet import Spreadsheet
 from use_cases.spreadsheetloader import SpreadsheetLoaderS2V  # Only for testing
+from use_cases.spreadsheetloader import SnapshotS2B, ComputedValuesLoader
+from domain.entities.formula_evaluator import ENGINE_VERSION
+
+_BLOCK_SIZE = 1 << 20  # The number of characters encoded and written at once
 
 
 class SpreadsheetSaver(abc.ABC):
@@ -29,6 +38,8 @@ class SpreadsheetSaver(abc.ABC):
 class SpreadsheetSaverS2V(SpreadsheetSaver):
     """
     This class represents a spreadsheet saver.
+    The cells are visited once in row-major order: the fields of every row are joined once, and
+    the rows are encoded and written in large blocks, so the file is written with a few calls.
     """
     def save_spreadsheet(self, spreadsheet: Spreadsheet, file_path: str) -> None:
         """
@@ -38,8 +49,6 @@ class SpreadsheetSaverS2V(SpreadsheetSaver):
         spreadsheet -- the spreadsheet (Spreadsheet)
         file_path -- the path of the file (str)
         """
-        column_counter = 0
-        row_counter = 1
         if not isinstance(spreadsheet, Spreadsheet):
             raise ValueError("The spreadsheet must be a Spreadsheet.")
         if not isinstance(file_path, str):
@@ -47,39 +56,445 @@ class SpreadsheetSaverS2V(SpreadsheetSaver):
         if not file_path.endswith(".s2v"):
             raise ValueError("The file must be a .s2v file.")
 
-        with open(file_path, 'w') as spreadsheet_file:
-            cell_list = spreadsheet.get_cells()
-            cell_list = self.sort_cells(cell_list)
-            for cell in cell_list:
-                while int(cell.identifier.row) != row_counter:
-                    row_counter += 1
-                    column_counter = 0
-                    spreadsheet_file.write("\n")
-                while base26_to_int(cell.identifier.column) != column_counter:
-                    column_counter += 1
-                    spreadsheet_file.write(";")
-                else:
-                    if isinstance(cell.content, Formula):  # If the content is a formula
-                        spreadsheet_file.write("=" + cell.content.textual_representation.replace(";", ","))
-                    # If the content is numerical or textual
-                    elif isinstance(cell.content, NumericalContent) or isinstance(cell.content, TextualContent):
-                        spreadsheet_file.write(cell.content.value.get_value_string())
-                    else:
-                        raise ValueError("Unexpected content type.")
-            spreadsheet_file.close()
+        with open(file_path, 'wb') as spreadsheet_file:
+            self.write_spreadsheet(spreadsheet, spreadsheet_file)
+
+    def write_spreadsheet(self, spreadsheet: Spreadsheet, stream, block_size: int = _BLOCK_SIZE) -> None:
+        """
+        This method writes the spreadsheet in S2V format to a binary stream, such as a file, a pipe
+        or sys.stdout.buffer. The stream is not closed.
+
+        Keyword arguments:
+        spreadsheet -- the spreadsheet (Spreadsheet)
+        stream -- the binary stream, with a write method that takes bytes (file object)
+        block_size -- the approximate number of characters written at once (int)
+        """
+        if not isinstance(spreadsheet, Spreadsheet):
+            raise ValueError("The spreadsheet must be a Spreadsheet.")
+        encoding = locale.getpreferredencoding(False)  # The one text mode would use
+        block = []
+        block_length = 0
+        for line in self.lines(spreadsheet):
+            block.append(line)
+            block_length += len(line)
+            if block_length >= block_size:
+                stream.write("".join(block).encode(encoding))
+                block = []
+                block_length = 0
+        if block:
+            stream.write("".join(block).encode(encoding))
+
+    @staticmethod
+    def lines(spreadsheet: Spreadsheet, first_row: int = 0):
+        """
+        This method writes the rows of the spreadsheet in S2V format. Every line but the first one
+        starts with the line breaks that separate it from the previous row, so the file has no line
+        break at the end, and the rows without cells are empty lines.
+
+        Keyword arguments:
+        spreadsheet -- the spreadsheet (Spreadsheet)
+        first_row -- the first row written; if it is not the first row of the file, the lines continue
+                     the end of the previous row (int)
+        return -- the lines (iterator of str)
+        """
+        previous_row = max(first_row - 1, 1)
+        row_text = SpreadsheetSaverS2V.row_text
+        for row, contents in spreadsheet.get_rows(first_row):
+            yield "\n" * (row - previous_row) + row_text(contents)
+            previous_row = row
+
+    @staticmethod
+    def row_text(contents: list) -> str:
+        """
+        This method writes the contents of a row in S2V format.
+
+        Keyword arguments:
+        contents -- the contents of the cells of the row by column, as given by Spreadsheet.get_rows
+                    (list of tuples (column, Content or float))
+        return -- the line of the row, without its line break (str)
+        """
+        fields = []
+        for column, content in contents:
+            if column > len(fields):
+                fields.extend([""] * (column - len(fields)))
+            if content.__class__ is float:  # A plain number without a content, as NumericalValue writes it
+                fields.append(str(int(content)) if content.is_integer() else repr(content))
+            elif isinstance(content, Formula):
+                fields.append("=" + content.textual_representation.replace(";", ","))
+            elif isinstance(content, NumericalContent) or isinstance(content, TextualContent):
+                fields.append(content.value.get_value_string())
+            else:
+                raise ValueError("Unexpected content type.")
+        return ";".join(fields)
+
+
+
+class IncrementalSpreadsheetSaverS2V(SpreadsheetSaverS2V):
+    """
+    This class represents a spreadsheet saver that remembers the S2V file it has saved last: the
+    offset where every row starts, and the size and modification time of the file. When the same
+    spreadsheet is saved again to the same file, and the file has not been changed since, only the
+    rows edited in between are written: in place if they keep their length in bytes, or else the file
+    is rewritten from the first row whose length changes to its end. Otherwise the whole file is saved.
+    """
+    def __init__(self) -> None:
+        """
+        This method initializes the saver.
+
+        Attributes:
+        _file_path -- the absolute path of the file saved last, or None (str)
+        _spreadsheet -- the spreadsheet saved last (weakref to Spreadsheet)
+        _encoding -- the encoding of the file saved last (str)
+        _starts -- the offset where every row of the file starts, from row 1 (array of unsigned long longs)
+        _size -- the size of the file (int)
+        _modified -- the modification time of the file, in nanoseconds (int)
+        """
+        self._file_path = None
+        self._spreadsheet = None
+        self._encoding = None
+        self._starts = array('Q')
+        self._size = 0
+        self._modified = 0
+
+    def save_spreadsheet(self, spreadsheet: Spreadsheet, file_path: str) -> None:
+        """
+        This method saves the spreadsheet to a S2V file, writing only the edited rows if it can.
+
+        Keyword arguments:
+        spreadsheet -- the spreadsheet (Spreadsheet)
+        file_path -- the path of the file (str)
+        """
+        if not isinstance(spreadsheet, Spreadsheet):
+            raise ValueError("The spreadsheet must be a Spreadsheet.")
+        if not isinstance(file_path, str):
+            raise ValueError("The file path must be a string.")
+        if not file_path.endswith(".s2v"):
+            raise ValueError("The file must be a .s2v file.")
+
+        encoding = locale.getpreferredencoding(False)
+        edited_rows = spreadsheet.edited_rows
+        incremental = self._file_path == os.path.abspath(file_path) and self._spreadsheet() is spreadsheet \
+            and self._encoding == encoding and edited_rows is not None and min(edited_rows, default=1) >= 1
+        if incremental:
+            status = os.stat(file_path)
+            incremental = status.st_size == self._size and status.st_mtime_ns == self._modified
+        self._file_path = None  # Nothing is known about the file until it has been saved
+        if incremental:
+            with open(file_path, 'r+b') as spreadsheet_file:
+                self._save_edited_rows(spreadsheet, spreadsheet_file, sorted(edited_rows), encoding)
+                self._remember(spreadsheet, spreadsheet_file, encoding)
+        else:
+            with open(file_path, 'wb') as spreadsheet_file:
+                self._starts = array('Q', [0])
+                indexed = self._write_rows(spreadsheet.get_rows(), 1, spreadsheet_file, 0, encoding)
+                if indexed:
+                    self._remember(spreadsheet, spreadsheet_file, encoding)
+
+    def _remember(self, spreadsheet: Spreadsheet, spreadsheet_file, encoding: str) -> None:
+        """
+        This method remembers the file that has just been saved, and starts tracking the edits of the
+        spreadsheet from now on.
+
+        Keyword arguments:
+        spreadsheet -- the spreadsheet (Spreadsheet)
+        spreadsheet_file -- the open file (file object)
+        encoding -- the encoding of the file (str)
+        """
+        spreadsheet_file.flush()
+        status = os.fstat(spreadsheet_file.fileno())
+        self._file_path = os.path.abspath(spreadsheet_file.name)
+        self._spreadsheet = weakref.ref(spreadsheet)
+        self._encoding = encoding
+        self._size = status.st_size
+        self._modified = status.st_mtime_ns
+        spreadsheet.start_tracking_edits()
+
+    def _line_end(self, row: int) -> int:
+        """
+        This method returns where the line of a row of the file ends, before its line break.
+        """
+        return self._starts[row] - 1 if row < len(self._starts) else self._size
+
+    def _save_edited_rows(self, spreadsheet: Spreadsheet, spreadsheet_file, edited_rows: list, encoding: str) -> None:
+        """
+        This method writes the edited rows of the spreadsheet over the file saved last.
+
+        Keyword arguments:
+        spreadsheet -- the spreadsheet (Spreadsheet)
+        spreadsheet_file -- the file, open for reading and writing (file object)
+        edited_rows -- the edited rows, in ascending order (list of ints)
+        encoding -- the encoding of the file (str)
+        """
+        starts = self._starts
+        line_count = len(starts)
+        first_row = None  # The first row whose line changes its length
+        for row in edited_rows:
+            cells = next(spreadsheet.get_rows(row), None)
+            text = self.row_text(cells[1]) if cells is not None and cells[0] == row else ""
+            line = text.encode(encoding)
+            if row > line_count or len(line) != self._line_end(row) - starts[row - 1]:
+                if row <= line_count or line:
+                    first_row = min(row, line_count + 1)
+                    break
+                continue  # A row after the end of the file that is still empty
+            spreadsheet_file.seek(starts[row - 1])
+            spreadsheet_file.write(line)
+        if first_row is None:
+            return
+
+        rows = spreadsheet.get_rows(first_row)
+        first = next(rows, None)
+        if first is None:  # The file ends before the row, without the empty lines before it
+            while first_row > 1 and self._line_end(first_row - 1) == starts[first_row - 2]:
+                first_row -= 1
+        position = self._line_end(first_row - 1) if first_row > 1 else 0
+        del starts[max(first_row - 1, 1):]
+        spreadsheet_file.seek(position)
+        spreadsheet_file.truncate()
+        if first is not None:
+            self._write_rows(itertools.chain([first], rows), max(first_row - 1, 1), spreadsheet_file, position, encoding)
+
+    def _write_rows(self, rows, previous_row: int, stream, position: int, encoding: str) -> bool:
+        """
+        This method writes rows of the spreadsheet in S2V format to a binary stream, in large blocks,
+        and adds where every line starts to the offsets of the rows.
+
+        Keyword arguments:
+        rows -- the rows, as given by Spreadsheet.get_rows (iterator of tuples (row, list))
+        previous_row -- the row whose line the stream ends with (int)
+        stream -- the binary stream (file object)
+        position -- the offset where the stream ends (int)
+        encoding -- the encoding of the file (str)
+        return -- True if the offsets of the rows are right, False if the spreadsheet has rows that
+                  can not be indexed (bool)
+        """
+        starts = self._starts
+        row_text = self.row_text
+        indexed = "\n".encode(encoding) == b"\n"  # Only encodings where ASCII takes one byte per character
+        block = []
+        block_length = 0
+        for row, contents in rows:
+            if row < previous_row:  # A row 0 does not have a line of its own
+                indexed = False
+            text = row_text(contents)
+            gap = max(row - previous_row, 0)
+            if indexed:
+                starts.extend(range(position + 1, position + gap + 1))
+                position += gap + (len(text) if text.isascii() else len(text.encode(encoding)))
+            block.append("\n" * gap + text)
+            block_length += gap + len(text)
+            previous_row = row
+            if block_length >= _BLOCK_SIZE:
+                stream.write("".join(block).encode(encoding))
+                block = []
+                block_length = 0
+        if block:
+            stream.write("".join(block).encode(encoding))
+        return indexed
+
+
+class SpreadsheetSaverS2B(SpreadsheetSaver):
+    """
+    This class represents a saver of S2B snapshots, the binary format described in SnapshotS2B.
+    The plain numbers are written as the raw arrays the spreadsheet keeps them in, and every text,
+    formula and shape is written once, so saving does not convert any number to text.
+    """
+    def save_spreadsheet(self, spreadsheet: Spreadsheet, file_path: str, dependency_manager=None) -> None:
+        """
+        This method saves the spreadsheet to a S2B file.
+
+        Keyword arguments:
+        spreadsheet -- the spreadsheet (Spreadsheet)
+        file_path -- the path of the file (str)
+        dependency_manager -- the dependency manager of the spreadsheet, to save the shapes, the
+                              computed values and the topological order of the formulas (DependencyManager)
+        """
+        if not isinstance(spreadsheet, Spreadsheet):
+            raise ValueError("The spreadsheet must be a Spreadsheet.")
+        if not isinstance(file_path, str):
+            raise ValueError("The file path must be a string.")
+        if not file_path.endswith(".s2b"):
+            raise ValueError("The file must be a .s2b file.")
+
+        spreadsheet.cells.load_all()
+        strings = {}
+        sections = [(b"NUMS", self._numbers_section(spreadsheet))]
+        cells_section, formulas = self._cells_section(spreadsheet, strings)
+        sections.append((b"CELL", cells_section))
+        graph_section = None
+        if dependency_manager is not None:
+            graph_section = self._graph_section(formulas, dependency_manager, strings)
+        if graph_section is not None:
+            sections.append((b"GRPH", graph_section))
+        sections.append((b"STRS", self._strings_section(strings)))
+
+        offset = SnapshotS2B.align(SnapshotS2B.HEADER.size + len(sections) * SnapshotS2B.SECTION.size)
+        directory = [SnapshotS2B.HEADER.pack(SnapshotS2B.MAGIC, SnapshotS2B.VERSION, len(sections))]
+        for name, parts in sections:
+            length = sum(len(part) for part in parts)
+            directory.append(SnapshotS2B.SECTION.pack(name, offset, length))
+            offset += SnapshotS2B.align(length)
+        with open(file_path, 'wb') as snapshot_file:
+            snapshot_file.write(self._pad(b"".join(directory)))
+            for name, parts in sections:
+                length = 0
+                for part in parts:
+                    snapshot_file.write(part)
+                    length += len(part)
+                snapshot_file.write(bytes(SnapshotS2B.align(length) - length))
 
     @staticmethod
-    def sort_cells(cell_list: list) -> list:
+    def _pad(data: bytes) -> bytes:
+        """
+        This method pads some bytes with zeros up to a multiple of 8 bytes.
+        """
+        return data + bytes(SnapshotS2B.align(len(data)) - len(data))
+
+    @staticmethod
+    def _little_endian(items: array) -> bytes:
+        """
+        This method returns the bytes of an array in little-endian order.
+        """
+        if sys.byteorder == "big":
+            items = array(items.typecode, items)
+            items.byteswap()
+        return items.tobytes()
+
+    def _numbers_section(self, spreadsheet: Spreadsheet) -> list:
         """
-        This method sorts the cells of a spreadsheet by row and column.
-        Row and column can be more than one character.
+        This method writes the plain numbers of every column.
 
         Keyword arguments:
-        cell_list -- the list of cells (list)
+        spreadsheet -- the spreadsheet (Spreadsheet)
+        return -- the parts of the section (list of bytes)
+        """
+        chunks = [(column, first_row, values, mask)
+                  for column, column_chunks in sorted(spreadsheet.get_number_columns().items())
+                  for first_row, (values, mask) in sorted(column_chunks.items())]
+        offset = SnapshotS2B.align(SnapshotS2B.COUNT.size + len(chunks) * SnapshotS2B.COLUMN.size)
+        entries = [SnapshotS2B.COUNT.pack(len(chunks))]
+        data = []
+        for column, first_row, values, mask in chunks:
+            rows = len(mask)
+            mask_offset = offset
+            values_offset = mask_offset + SnapshotS2B.align(rows)
+            offset = values_offset + 8 * rows
+            entries.append(SnapshotS2B.COLUMN.pack(column, rows, first_row, mask_offset, values_offset))
+            data.append(self._pad(bytes(mask)))
+            data.append(self._little_endian(values[:rows]))
+        return [self._pad(b"".join(entries))] + data
+
+    def _cells_section(self, spreadsheet: Spreadsheet, strings: dict) -> tuple:
+        """
+        This method writes the cells kept as Cell objects.
+
+        Keyword arguments:
+        spreadsheet -- the spreadsheet (Spreadsheet)
+        strings -- the table of strings, where the texts and formulas are added (dict of str -> int)
+        return -- the parts of the section (list of bytes) and the formula cells in the order of the section (list)
         """
-        if not isinstance(cell_list, list):
-            raise ValueError("The cell list must be a list.")
-        return sorted(cell_list, key=lambda cell: (int(cell.identifier.row), base26_to_int(cell.identifier.column)))
+        rows, columns, kinds, references, numbers = array('I'), array('I'), array('B'), array('I'), array('d')
+        formulas = []
+        for cell in spreadsheet.get_object_cells():
+            content = cell.content
+            reference, number = 0, 0.0
+            if isinstance(content, Formula):
+                kind = SnapshotS2B.FORMULA
+                reference = strings.setdefault(content.textual_representation, len(strings))
+                formulas.append(cell)
+            elif isinstance(content, TextualContent):
+                kind = SnapshotS2B.TEXT
+                reference = strings.setdefault(content.value.value, len(strings))
+            elif isinstance(content, NumericalContent) and content.value.value is not None:
+                kind = SnapshotS2B.NUMBER
+                number = content.value.value
+            elif isinstance(content, NumericalContent):
+                kind = SnapshotS2B.EMPTY
+            else:
+                raise ValueError("Unexpected content type.")
+            rows.append(cell.identifier.row_number)
+            columns.append(cell.identifier.column_number)
+            kinds.append(kind)
+            references.append(reference)
+            numbers.append(number)
+        parts = [SnapshotS2B.COUNT.pack(len(rows))]
+        parts.extend(self._pad(self._little_endian(items)) for items in (rows, columns, kinds, references, numbers))
+        return parts, formulas
+
+    def _graph_section(self, formulas: list, dependency_manager, strings: dict) -> list:
+        """
+        This method writes the shapes, the computed values and the topological order of the formulas.
+
+        Keyword arguments:
+        formulas -- the formula cells in the order of the "CELL" section (list of Cells)
+        dependency_manager -- the dependency manager of the spreadsheet (DependencyManager)
+        strings -- the table of strings, where the shapes are added (dict of str -> int)
+        return -- the parts of the section (list of bytes) or None if some formula is not in the graph
+        """
+        shapes, kinds, values = array('I'), array('B'), array('d')
+        for cell in formulas:
+            shapes.append(strings.setdefault(cell.content.shape or "", len(strings)))
+            value = cell.content.value.value
+            kinds.append(SnapshotS2B.value_kind(value))
+            values.append(value if value is not None else 0.0)
+        positions = [dependency_manager.order.position(cell.identifier) for cell in formulas]
+        if None in positions:  # A formula out of the graph: the order can not be trusted
+            return None
+        ranking = sorted(range(len(formulas)), key=positions.__getitem__)
+        parts = [SnapshotS2B.COUNT.pack(len(formulas))]
+        parts.extend(self._pad(self._little_endian(items)) for items in (shapes, kinds, values, array('I', ranking)))
+        return parts
+
+    def _strings_section(self, strings: dict) -> list:
+        """
+        This method writes the table of strings.
+
+        Keyword arguments:
+        strings -- the strings and their indexes, in the order of the indexes (dict of str -> int)
+        return -- the parts of the section (list of bytes)
+        """
+        encoded = [string.encode("utf-8", "surrogatepass") for string in strings]
+        offsets = array('Q', [0])
+        for data in encoded:
+            offsets.append(offsets[-1] + len(data))
+        return [SnapshotS2B.COUNT.pack(len(encoded)), self._little_endian(offsets), b"".join(encoded)]
+
+
+class ComputedValuesSaver:
+    """
+    This class represents a saver of the computed values of the formulas of a S2V file, in the sidecar
+    described in ComputedValuesLoader.
+    """
+    def save_values(self, spreadsheet: Spreadsheet, file_path: str) -> None:
+        """
+        This method saves the computed values of the formulas of a spreadsheet that has just been saved
+        to a S2V file. The sidecar is written to a temporary file that then replaces the old one, so a
+        sidecar is never left half written.
+
+        Keyword arguments:
+        spreadsheet -- the spreadsheet (Spreadsheet)
+        file_path -- the path of the S2V file the spreadsheet has been saved to (str)
+        """
+        if not isinstance(spreadsheet, Spreadsheet):
+            raise ValueError("The spreadsheet must be a Spreadsheet.")
+        file_path = SpreadsheetLoaderS2V.check_path(file_path)
+
+        rows, columns, kinds, values = array('I'), array('I'), array('B'), array('d')
+        for cell in spreadsheet.get_formula_cells():
+            rows.append(cell.identifier.row_number)
+            columns.append(cell.identifier.column_number)
+            value = cell.content.value.value
+            kinds.append(SnapshotS2B.value_kind(value))
+            values.append(value if value is not None else 0.0)
+        header = ComputedValuesLoader.HEADER.pack(ComputedValuesLoader.MAGIC, ComputedValuesLoader.VERSION,
+                                                  ENGINE_VERSION, ComputedValuesLoader.digest(file_path), len(rows))
+        sidecar_path = ComputedValuesLoader.sidecar_path(file_path)
+        temporary_path = sidecar_path + ".tmp"
+        with open(temporary_path, 'wb') as sidecar_file:
+            sidecar_file.write(header)
+            for items in (rows, columns, kinds, values):
+                sidecar_file.write(SpreadsheetSaverS2B._little_endian(items))
+        os.replace(temporary_path, sidecar_path)
 
 
 if __name__ == "__main__":